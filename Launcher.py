@@ -11,6 +11,9 @@ def start_backend():
     server.run()
     
 def on_close():
+    # os._exit skips atexit, so persist pending graph edits explicitly
+    from backend.src.modules.graph_store import graph_store
+    graph_store.flush_all()
     os._exit(0)  # force exit safely
 
 if __name__ == "__main__":
@@ -2,6 +2,13 @@ from fastapi import APIRouter, Body, HTTPException, WebSocket, WebSocketDisconne
 from typing import Dict, Any, List
 import asyncio
 import json
+import time
+from functools import partial
+
+from .handlers import get_active_graph
+from .modules.dispatch_pool import DispatchPool
+from .modules.engine_state_manager import engine_state, frontend_status
+from .modules.graph_store import graph_store
 
 
 # ── WebSocket Connection Manager ──────────────────────────────────────────────
@@ -46,6 +53,13 @@ class _ConnectionManager:
 # Module-level singleton
 ws_manager = _ConnectionManager()
 
+# Sync handlers run here, never on the event loop
+dispatch_pool = DispatchPool(max_workers=8)
+
+# Every edit targets the active project (state.json), so commands that change
+# or read project data share one lane and apply in arrival order
+ACTIVE_PROJECT_LANE = "project:active"
+
 # Guard: wire signal_hub → WS exactly once
 _ws_registered = False
 
@@ -76,12 +90,31 @@ def _register_ws_listeners(signal_hub):
         ws_manager.broadcast({"type": "engine_status", "status": "idle",
                                "message": f"Engine error: {err}"})
 
+    def _on_engine_state(state):
+        # Pushed on every transition; engine_state_request is only needed on connect
+        message = {"type": "engine_status", "status": frontend_status(state["status"]),
+                   "engineState": state["status"], "error": state.get("error"),
+                   "timestamp": state.get("timestamp")}
+        if state.get("error"):
+            message["message"] = f"Engine error: {state['error'].get('message', 'Unknown error')}"
+        ws_manager.broadcast(message)
+
+    engine_state.subscribe(_on_engine_state)
+
     signal_hub.on("execution_started",  _on_started)
     signal_hub.on("execution_output",   _on_output)
     signal_hub.on("execution_finished", _on_finished)
     signal_hub.on("execution_error",    _on_error)
 
 
+class _BatchAborted(Exception):
+    """Raised inside a batch transaction to roll it back."""
+
+    def __init__(self, index: int):
+        super().__init__(index)
+        self.index = index
+
+
 # ── Router Factory ────────────────────────────────────────────────────────────
 
 def create_dispatcher(signal_hub, project_backend, log_manager=None):
@@ -98,6 +131,8 @@ def create_dispatcher(signal_hub, project_backend, log_manager=None):
         "project_edit": "project_update_request",
         "project_delete": "project_delete_request",
         "project_load": "project_load_request",
+        "project_snapshot": "project_snapshot_request",
+        "project_restore": "project_snapshot_restore_request",
         "load_graph": "load_graph_request",
 
         "graph_node_add": "project_node_add",
@@ -107,6 +142,9 @@ def create_dispatcher(signal_hub, project_backend, log_manager=None):
 
         "connection_create": "connection_create_request",
         "connection_delete": "connection_delete_request",
+        "graph_subgraph_paste": "graph_subgraph_paste_request",
+        "graph_undo": "graph_undo_request",
+        "graph_redo": "graph_redo_request",
 
         "node_add": "node_create_request",
         "node_edit": "node_update_request",
@@ -121,24 +159,34 @@ def create_dispatcher(signal_hub, project_backend, log_manager=None):
         "engine_get_logs": "engine_logs_request",
     }
 
+    # Commands that run unordered; everything else goes through ACTIVE_PROJECT_LANE
+    UNORDERED_COMMANDS = {
+        "reload_nodes", "node_add", "node_edit", "node_delete", "node_move",
+        "stop", "force_stop", "engine_get_state", "engine_get_logs",
+    }
+
+    # Commands that only edit the active graph and may run inside /dispatch/batch
+    BATCH_COMMANDS = {
+        "graph_node_add", "graph_node_delete", "graph_node_update_input", "graph_node_edit",
+        "graph_subgraph_paste", "connection_create", "connection_delete",
+    }
+
     SYNC_MAP = {
         "startup": "startup_request",
         "load_graph": "load_graph_request",
+        "graph_delta": "graph_delta_request",
+        "graph_analysis": "graph_analysis_request",
+        "viewport": "viewport_request",
+        "snapshots": "project_snapshot_list_request",
         "node_index": "node_index_request",
+        "node_search": "node_search_request",
+        "node_usage": "node_usage_request",
+        "projects": "project_list_request",
         "logs": "get_logs"
     }
 
-    @router.post("/dispatch")
-    async def dispatch(payload: Dict[str, Any] = Body(...)):
-        cmd = payload.get("cmd")
-        signal_name = COMMAND_MAP.get(cmd)
-        print("CMD RECEIVED:", cmd)
-
-        if not signal_name:
-            return {"status": "error", "message": f"Unknown action: {cmd}"}
-
-        results = signal_hub.emit(signal_name, payload)
-
+    def _normalize(cmd, results):
+        """Turn handler results into the dispatch response shape."""
         if not results or len(results) == 0:
             return {"status": "error", "message": f"No handlers registered for {cmd}"}
 
@@ -157,23 +205,127 @@ def create_dispatcher(signal_hub, project_backend, log_manager=None):
 
         return {"status": "success", "command": cmd, "result": result}
 
+    def _run_command_sync(cmd, payload):
+        """Emit one command's signal on the calling thread (used inside batches)."""
+        signal_name = COMMAND_MAP.get(cmd)
+
+        if not signal_name:
+            return {"status": "error", "message": f"Unknown action: {cmd}"}
+
+        return _normalize(cmd, signal_hub.emit(signal_name, payload))
+
+    async def _emit(name, signal_name, payload, lane=None):
+        """Sync handlers on the worker pool, async handlers awaited on the loop."""
+        results = []
+        if signal_hub.has_sync_handlers(signal_name):
+            results = await dispatch_pool.run(name, signal_hub.emit, signal_name, payload, lane=lane)
+        if signal_hub.has_async_handlers(signal_name):
+            started = time.perf_counter()
+            results = results + await signal_hub.call_async(signal_name, payload)
+            dispatch_pool.record(name + ":async", (time.perf_counter() - started) * 1000)
+        return results
+
+    @router.post("/dispatch")
+    async def dispatch(payload: Dict[str, Any] = Body(...)):
+        cmd = payload.get("cmd")
+        print("CMD RECEIVED:", cmd)
+
+        signal_name = COMMAND_MAP.get(cmd)
+        if not signal_name:
+            return {"status": "error", "message": f"Unknown action: {cmd}"}
+
+        lane = None if cmd in UNORDERED_COMMANDS else ACTIVE_PROJECT_LANE
+        return _normalize(cmd, await _emit(cmd, signal_name, payload, lane))
+
+    @router.post("/dispatch/batch")
+    async def dispatch_batch(payload: Dict[str, Any] = Body(...)):
+        """
+        Apply an ordered list of graph commands as one transaction.
+
+        Body: {"commands": [{"cmd": ..., ...}, ...]}. Commands run in order
+        against the active graph; if one fails, everything before it is
+        rolled back. On success the graph is persisted once.
+        """
+        commands = payload.get("commands")
+        if not isinstance(commands, list) or not commands:
+            return {"status": "error", "message": "No commands provided"}
+
+        for i, command in enumerate(commands):
+            cmd = command.get("cmd") if isinstance(command, dict) else None
+            if cmd not in BATCH_COMMANDS:
+                return {"status": "error", "message": f"Command {i} ({cmd}) cannot be batched",
+                        "failedIndex": i}
+
+        print(f"BATCH RECEIVED: {len(commands)} commands")
+
+        # One worker runs the whole transaction: the document lock is per thread
+        return await dispatch_pool.run("batch", _run_batch, commands, lane=ACTIVE_PROJECT_LANE)
+
+    def _run_batch(commands):
+        doc = get_active_graph()
+        if not doc:
+            return {"status": "error", "message": "Failed to load project graph"}
+
+        results = []
+        try:
+            with graph_store.transaction(doc):
+                for i, command in enumerate(commands):
+                    result = _run_command_sync(command["cmd"], command)
+                    results.append(result)
+                    if result.get("status") == "error":
+                        raise _BatchAborted(i)
+        except _BatchAborted as e:
+            failed = results[e.index]
+            return {
+                "status": "error",
+                "message": f"Command {e.index} ({commands[e.index]['cmd']}) failed: "
+                           f"{failed.get('message')}; batch rolled back",
+                "failedIndex": e.index,
+                "results": results
+            }
+
+        return {"status": "success", "command": "batch", "results": results}
+
     @router.get("/sync/{target}")
-    async def sync_data(target: str, since: str = None):
+    async def sync_data(target: str, since: str = None, limit: int = None,
+                        level: str = None, nodeId: str = None, offset: int = None,
+                        sort: str = None, order: str = None, q: str = None,
+                        scriptPath: str = None, entryFunction: str = None, name: str = None,
+                        x0: float = None, y0: float = None, x1: float = None, y1: float = None,
+                        cursor: str = None):
         """Data-fetching requests"""
         if target == "logs" and log_manager:
-            logs = log_manager.get_logs(since_timestamp=since)
-            return {"status": "ok", "logs": logs}
+            # Active project; cursor/since/limit/level/nodeId seek through the log index
+            get_logs = partial(log_manager.get_logs_page, cursor=cursor, since=since, limit=limit,
+                               level=level, node_id=nodeId)
+            logs, next_cursor = await dispatch_pool.run("sync:logs", get_logs)
+            return {"status": "ok", "logs": logs, "cursor": next_cursor}
 
         signal_name = SYNC_MAP.get(target)
 
         if not signal_name:
             raise HTTPException(status_code=404, detail=f"Sync target '{target}' not mapped")
 
-        results = signal_hub.emit(signal_name, {})
+        # Query parameters are passed through to the handler
+        params = {"since": since, "limit": limit, "level": level, "nodeId": nodeId,
+                  "offset": offset, "sort": sort, "order": order, "q": q,
+                  "scriptPath": scriptPath, "entryFunction": entryFunction, "name": name,
+                  "x0": x0, "y0": y0, "x1": x1, "y1": y1}
+        results = await _emit(f"sync:{target}", signal_name, {k: v for k, v in params.items() if v is not None})
 
         if results and results[0] is not None:
             return results[0]
 
         return {"status": "error", "message": "No data returned from handler"}
 
+    @router.get("/metrics/dispatch")
+    async def dispatch_metrics():
+        """Latency percentiles (ms) per command and lane queue depths."""
+        return {"status": "ok", **dispatch_pool.metrics()}
+
+    @router.get("/metrics/writes")
+    async def write_metrics():
+        """Project write queue depth, edits coalesced per flush and flush latency (ms)."""
+        return {"status": "ok", **graph_store.metrics()}
+
     return router
\ No newline at end of file
@@ -11,23 +11,33 @@ This module contains all signal handlers for backend operations including:
 import sys
 import json
 import os
-import re
 import subprocess
+import copy
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, Any, Optional
 
 from .config import ROOT_DIR, USERDATA_PATH, NODE_INDEX_PATH
+from .modules.log_manager import LogManager
+from .modules.graph_store import graph_store, GraphDocument
+from .modules.graph_analysis import graph_analyzer
+from .modules.graph_model import connection_key
+from .modules.spatial_index import spatial_indexes
+from .modules.storage_manager import StorageManager
+from .modules.project_catalog import project_catalog, SORT_COLUMNS
+from .modules.node_registry import node_registry
+from .modules.node_usage import node_usage
 
 
 # ============================================================================
 # Path Constants
 # ============================================================================
 
-PROJECT_INDEX_PATH = USERDATA_PATH / "projectindex.json"
-STATE_PATH = USERDATA_PATH / "state.json"
 NODE_INDEX_PATH = ROOT_DIR / "nodebank" / "nodeindex.json"
 
+# Shared so each project's log store (and its index cache) survives between polls
+_log_manager = LogManager(project_base_path=USERDATA_PATH)
+
 
 # ============================================================================
 # Helper Functions - File I/O
@@ -57,9 +67,28 @@ def save_json_file(file_path: Path, data: Dict) -> bool:
         return False
 
 
+def load_state() -> Optional[Dict]:
+    """Active project state (state.json), served from StorageManager's cache."""
+    try:
+        return StorageManager.get_state()
+    except Exception as e:
+        print(f"Error loading state: {e}")
+        return None
+
+
+def save_state(data: Dict) -> bool:
+    """Replace the active project state; written through atomically."""
+    try:
+        StorageManager.save_state(data)
+        return True
+    except Exception as e:
+        print(f"Error saving state: {e}")
+        return False
+
+
 def get_project_path_from_state() -> Optional[Path]:
     """Load project path from state.json."""
-    state_data = load_json_file(STATE_PATH)
+    state_data = load_state()
     if not state_data:
         return None
     
@@ -70,39 +99,63 @@ def get_project_path_from_state() -> Optional[Path]:
     return Path(project_path_str)
 
 
-def load_graph_from_state() -> Optional[Dict]:
-    """Load graph content from current project in state.json."""
+def get_active_graph() -> Optional[GraphDocument]:
+    """Cached graph document of the current project in state.json."""
     project_path = get_project_path_from_state()
-    if not project_path or not project_path.exists():
+    if not project_path:
         return None
     
-    return load_json_file(project_path)
+    return graph_store.get(project_path)
 
 
 # ============================================================================
-# Helper Functions - Node ID Management
+# Helper Functions - Node Templates
 # ============================================================================
 
-def get_next_node_id(nodes: list) -> tuple[str, str]:
-    """
-    Generate next sequential node ID and position ID.
+def find_node_template(node_type_name: str) -> Optional[Dict]:
+    """Find a node template by (case-insensitive) name or nodeId, from memory."""
+    node_registry.ensure_loaded(NODE_INDEX_PATH)
+    return node_registry.find(node_type_name)
+
+
+def build_node_from_template(template: Dict, node_id: str, position_id: str,
+                             x: Optional[float] = None, y: Optional[float] = None) -> Dict:
+    """Create a graph node from a node template with empty inputs."""
+    dynamic = template.get("dynamic", {})
+    input_types = dynamic.get("inputTypes") or []
+    defaults = dynamic.get("defaults") or {}
+    dynamic_inputs = []
+    for i, inp in enumerate(dynamic.get("inputs", [])):
+        port = {"var": inp}
+        # Declared type and default let the engine compile a converter per port
+        if i < len(input_types) and input_types[i]:
+            port["type"] = input_types[i]
+        if inp in defaults:
+            port["default"] = copy.deepcopy(defaults[inp])
+        dynamic_inputs.append(port)
+    # Templates are shared by the registry; the node gets its own lists
+    dynamic_outputs = list(dynamic.get("outputs", []))
     
-    Args:
-        nodes: List of existing nodes
-        
-    Returns:
-        Tuple of (node_id, position_id) e.g. ("node_5", "pos_5")
-    """
-    max_id = 0
-    for node in nodes:
-        match = re.search(r'node_(\d+)', node.get("nodeId", "0"))
-        if match:
-            num = int(match.group(1))
-            if num > max_id:
-                max_id = num
+    pos_x = x if x is not None else 100 * int(node_id.split("_")[1])
+    pos_y = y if y is not None else 100
     
-    next_num = max_id + 1
-    return f"node_{next_num}", f"pos_{next_num}"
+    node = {
+        "nodeId": node_id,
+        "positionId": position_id,
+        "name": f"{template['name'].lower()}_node",
+        "position": {"x": pos_x, "y": pos_y},
+        "input": dynamic_inputs,
+        "output": dynamic_outputs,
+        "ref": template.get("type", "builtin"),
+        "scriptPath": template.get("scriptPath"),
+        "entryFunction": template.get("entryFunction"),
+        "metadata": {"operation": template['name'].lower()}
+    }
+    # Nodes from a .zip node archive are imported from it by the engine
+    if template.get("archive"):
+        node["archive"] = template["archive"]
+        node["archiveMember"] = template["archiveMember"]
+    return node
 
 
 # ============================================================================
@@ -116,13 +169,15 @@ def launch_engine(payload: Dict) -> Dict:
     engine_path = ROOT_DIR / "executor" / "engine" / "main_engine.py"
 
     try:
-        from .modules.engine_state_manager import EngineStateManager
-        engine_state_mgr = EngineStateManager()
+        from .modules.engine_state_manager import engine_state
 
-        state = load_json_file(STATE_PATH)
+        state = load_state()
         project_id = state.get("projectId") if state else None
 
-        engine_state_mgr.set_engine_state("initializing", project_id=project_id)
+        engine_state.set_engine_state("initializing", project_id=project_id)
+
+        # The engine reads the savefile from disk; write pending edits first
+        graph_store.flush_all()
 
         # Pipe stdout/stderr so engine [ENGINE] prints appear in the backend terminal
         process = subprocess.Popen(
@@ -131,15 +186,15 @@ def launch_engine(payload: Dict) -> Dict:
             stderr=sys.stderr,
         )
 
-        engine_state_mgr.set_engine_state("running", project_id=project_id, process_id=process.pid)
+        engine_state.set_engine_state("running", project_id=project_id, process_id=process.pid)
 
         return {"status": "ok", "message": "Engine started", "process_id": process.pid}
     except Exception as e:
         print(f"[BACKEND ERROR] Failed to launch engine: {e}")
         sys.stdout.flush()
         try:
-            engine_state_mgr = EngineStateManager()
-            engine_state_mgr.set_engine_state(
+            from .modules.engine_state_manager import engine_state
+            engine_state.set_engine_state(
                 "error",
                 project_id=project_id if 'project_id' in locals() else None,
                 error={"message": str(e), "timestamp": datetime.utcnow().isoformat() + "Z"}
@@ -183,28 +238,113 @@ def get_startup_payload() -> Dict:
     files = {
         "setting": USERDATA_PATH / "setting.json",
         "current": USERDATA_PATH / "current.json",
-        "project_index": PROJECT_INDEX_PATH,
-        "node_index": NODE_INDEX_PATH
     }
     
     result = {}
     for key, path in files.items():
         result[key] = load_json_file(path)
     
+    node_registry.ensure_loaded(NODE_INDEX_PATH)
+    result["node_index"] = node_registry.all()
+    
+    project_catalog.ensure_built(USERDATA_PATH)
+    result["project_index"] = project_catalog.list()
+    
     return result
 
 
+def handle_node_index_request(payload: Optional[Dict] = None) -> Dict:
+    """Node templates for the library, served from the in-memory registry."""
+    node_registry.ensure_loaded(NODE_INDEX_PATH)
+    return {"status": "ok", "version": node_registry.version, "node_index": node_registry.all()}
+
+
+def handle_node_search(payload: Optional[Dict] = None) -> Dict:
+    """
+    Ranked node library search.
+    
+    Args:
+        payload: 'q' (query text), optional 'limit' (default 20) and 'offset'
+    """
+    payload = payload or {}
+    node_registry.ensure_loaded(NODE_INDEX_PATH)
+    limit = payload.get("limit")
+    results, total = node_registry.search(
+        payload.get("q") or "",
+        limit=int(limit) if limit is not None else 20,
+        offset=int(payload.get("offset") or 0),
+    )
+    return {"status": "ok", "total": total, "results": results}
+
+
+def handle_node_usage(payload: Optional[Dict] = None) -> Dict:
+    """
+    Projects and nodes that run a node script.
+    
+    Args:
+        payload: Any of 'scriptPath' (a script or node archive), 'entryFunction', 'name'
+    """
+    payload = payload or {}
+    try:
+        projects = node_usage.users(
+            script_path=payload.get("scriptPath"),
+            entry_function=payload.get("entryFunction"),
+            name=payload.get("name"),
+        )
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "ok", "projects": projects}
+
+
+def handle_graph_analysis(payload: Optional[Dict] = None) -> Dict:
+    """
+    Static checks of the active project graph: cycles, port indexes, missing
+    scripts, template arity and dead nodes, plus the run order.
+    
+    Returns:
+        {"status": "ok", "version", "ok", "issues": [...], "order": [...]};
+        cached per graph version
+    """
+    doc = get_active_graph()
+    if not doc:
+        return {"status": "error", "message": "Failed to load project graph"}
+    return {"status": "ok", **graph_analyzer.analyze(doc)}
+
+
+def handle_project_list(payload: Optional[Dict] = None) -> Dict:
+    """
+    One page of the project catalog.
+    
+    Args:
+        payload: Optional 'sort' (projectName, lastModified, createdAt, author),
+            'order' ('asc'/'desc'), 'limit', 'offset'
+    """
+    payload = payload or {}
+    sort = payload.get("sort") or "projectName"
+    if sort not in SORT_COLUMNS:
+        return {"status": "error", "message": f"Cannot sort projects by '{sort}'"}
+    
+    limit = payload.get("limit")
+    projects = project_catalog.list(
+        sort=sort,
+        descending=str(payload.get("order", "asc")).lower() == "desc",
+        limit=int(limit) if limit is not None else None,
+        offset=int(payload.get("offset") or 0),
+    )
+    return {"status": "ok", "total": project_catalog.count(), "projects": projects}
+
+
 def handle_engine_state_request(payload: Dict) -> Dict:
     """
     Get current engine state for frontend.
     
     Returns simplified frontend state (idle/running) plus any error info.
     """
-    from .modules.engine_state_manager import EngineStateManager
+    from .modules.engine_state_manager import engine_state, frontend_status
     
-    engine_state_mgr = EngineStateManager()
-    backend_state = engine_state_mgr.get_engine_state()
-    frontend_state = engine_state_mgr.get_frontend_state()
+    # In memory; no file read
+    backend_state = engine_state.get_engine_state()
+    frontend_state = frontend_status(backend_state.get("status", "idle"))
     
     return {
         "status": "ok",
@@ -219,34 +359,37 @@ def handle_engine_logs_request(payload: Dict) -> Dict:
     Get logs for specified project.
     
     Args:
-        payload: Must contain 'project_id' or uses current project from state
+        payload: Must contain 'project_id' or uses current project from state.
+            Optional filters: 'since' (ISO timestamp), 'limit', 'level', 'nodeId';
+            'cursor' (from the previous response) to poll for what is new
     
     Returns:
-        Log array from project's logs.json file
+        Log array from the project's log store, and the cursor for the next poll
     """
     project_id = payload.get("project_id")
     
     # If no project_id provided, try to get from current state
     if not project_id:
-        state = load_json_file(STATE_PATH)
+        state = load_state()
         project_id = state.get("projectId") if state else None
     
     if not project_id:
         return {"status": "error", "message": "No project specified"}
     
-    # Find project path from state or index
-    state = load_json_file(STATE_PATH)
-    if state and state.get("projectId") == project_id:
-        project_path_str = state.get("projectPath")
-        if project_path_str:
-            project_folder = Path(project_path_str).parent
-            log_file = project_folder / "logs.json"
-            
-            if log_file.exists():
-                logs = load_json_file(log_file, default=[])
-                return {"status": "ok", "logs": logs}
-            else:
-                return {"status": "ok", "logs": []}  # No logs yet
+    # Only the active project's logs are resolvable
+    state = load_state()
+    if state and state.get("projectId") == project_id and state.get("projectPath"):
+        limit = payload.get("limit")
+        logs, cursor = _log_manager.get_logs_page(
+            project_id,
+            cursor=payload.get("cursor"),
+            since=payload.get("since"),
+            limit=int(limit) if limit is not None else None,
+            level=payload.get("level"),
+            node_id=payload.get("nodeId"),
+        )
+        # Empty list when no logs yet
+        return {"status": "ok", "logs": logs, "cursor": cursor}
     
     return {"status": "error", "message": "Project not found"}
 
@@ -262,11 +405,8 @@ def handle_load_graph(payload: Optional[Dict] = None) -> Dict:
     Returns:
         Dictionary containing metadata and graph content, or error
     """
-    if not STATE_PATH.exists():
-        return {"status": "error", "message": "state.json missing"}
-    
     try:
-        state_data = load_json_file(STATE_PATH)
+        state_data = load_state()
         if not state_data:
             return {"status": "error", "message": "Failed to load state.json"}
         
@@ -277,19 +417,115 @@ def handle_load_graph(payload: Optional[Dict] = None) -> Dict:
         if not project_path.exists():
             return {"status": "error", "message": "Graph file not found"}
         
-        graph_content = load_json_file(project_path)
-        if not graph_content:
+        doc = graph_store.get(project_path)
+        if not doc:
             return {"status": "error", "message": "Failed to load graph file"}
         
+        # Snapshot under the lock so the response never sees a half-applied edit
+        with doc.lock:
+            graph_content = copy.deepcopy(doc.to_json())
+            version = doc.version
+        
         return {
             "metadata": state_data,
-            "graph": graph_content
+            "graph": graph_content,
+            "version": version
         }
         
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
 
+def handle_viewport(payload: Optional[Dict] = None) -> Dict:
+    """
+    The part of the active project graph inside a canvas rectangle.
+    
+    Args:
+        payload: 'x0', 'y0', 'x1', 'y1' - the viewport in canvas units;
+            optional 'limit' (default 2000) - most nodes to return in full
+    
+    Returns:
+        {"status": "ok", "version", "total", "visible", "lod": False,
+        "nodes": [...], "connections": [...]} with the nodes overlapping the
+        rectangle and every connection touching one of them; when more than
+        'limit' nodes are visible, "lod": True with "clusters" (count,
+        bounds and center per grid cell, "cellSize" wide) instead
+    """
+    try:
+        payload = payload or {}
+        try:
+            x0, y0, x1, y1 = (float(payload[k]) for k in ("x0", "y0", "x1", "y1"))
+        except (KeyError, TypeError, ValueError):
+            return {"status": "error", "message": "Viewport needs numeric x0, y0, x1 and y1"}
+        x0, x1 = min(x0, x1), max(x0, x1)
+        y0, y1 = min(y0, y1), max(y0, y1)
+        limit = payload.get("limit")
+        limit = int(limit) if limit is not None else 2000
+        
+        doc = get_active_graph()
+        if not doc:
+            return {"status": "error", "message": "Failed to load project graph"}
+        
+        with doc.lock:
+            index = spatial_indexes.get(doc)
+            visible = index.query(x0, y0, x1, y1)
+            result = {"status": "ok", "version": doc.version, "total": len(doc.graph), "visible": len(visible)}
+            
+            if len(visible) > limit:
+                cell_size, clusters = index.clusters(visible, limit)
+                return {**result, "lod": True, "cellSize": cell_size, "clusters": clusters}
+            
+            connections = {}
+            for node_id in visible:
+                for conn in doc.graph.outgoing(node_id) + doc.graph.incoming(node_id):
+                    connections.setdefault(connection_key(conn), conn)
+            return {
+                **result,
+                "lod": False,
+                "nodes": copy.deepcopy([doc.graph.nodes[node_id] for node_id in visible]),
+                "connections": copy.deepcopy(list(connections.values())),
+            }
+        
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+def handle_graph_delta(payload: Optional[Dict] = None) -> Dict:
+    """
+    Changes to the active project graph after a known version.
+    
+    Args:
+        payload: 'since' - the version the client already has
+        
+    Returns:
+        {"status": "ok", "version": V, "deltas": [...]} with each delta
+        {"version": v, "ops": [...]}, or a full load_graph snapshot with
+        "full": True when 'since' is missing or older than the delta ring
+    """
+    try:
+        since = (payload or {}).get("since")
+        doc = get_active_graph()
+        if not doc:
+            return {"status": "error", "message": "Failed to load project graph"}
+        
+        if since is not None:
+            with doc.lock:
+                deltas = doc.deltas_since(int(since))
+                version = doc.version
+            if deltas is not None:
+                return {"status": "ok", "version": version, "deltas": deltas}
+        
+        snapshot = handle_load_graph()
+        if "graph" not in snapshot:
+            return snapshot
+        return {"status": "ok", "full": True, **snapshot}
+        
+    except (TypeError, ValueError):
+        return {"status": "error", "message": f"Invalid version: {since}"}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
 def project_load_request(payload: Dict) -> Dict:
     """
     Load a project by ID and update state.json.
@@ -305,21 +541,14 @@ def project_load_request(payload: Dict) -> Dict:
         if not project_id:
             return {"status": "error", "message": "No projectId provided"}
         
-        project_index = load_json_file(PROJECT_INDEX_PATH)
-        if not project_index:
-            return {"status": "error", "message": "Project index not found"}
-        
         # Find the project
-        project = next(
-            (p for p in project_index if p.get("projectId") == project_id),
-            None
-        )
+        project = project_catalog.get(project_id)
         
         if not project:
             return {"status": "error", "message": f"Project '{project_id}' not found"}
         
         # Update state
-        if not save_json_file(STATE_PATH, project):
+        if not save_state(project):
             return {"status": "error", "message": "Failed to update state"}
         
         return {"status": "ok", "projectId": project_id}
@@ -345,68 +574,154 @@ def graph_node_add(payload: Dict) -> Dict:
     """
     try:
         # Load current graph
-        graph_content = load_graph_from_state()
-        if not graph_content:
+        doc = get_active_graph()
+        if not doc:
             return {"status": "error", "message": "Failed to load project graph"}
         
-        project_path = get_project_path_from_state()
-        if not project_path:
-            return {"status": "error", "message": "No active project"}
-        
-        nodes = graph_content.get("nodes", [])
-        
-        # Generate unique node ID
-        node_id, position_id = get_next_node_id(nodes)
-        
-        # Load node template
-        node_index = load_json_file(NODE_INDEX_PATH)
-        if not node_index:
-            return {"status": "error", "message": "Node index not found"}
-        
         node_type_name = payload.get("type")
         if not node_type_name:
             return {"status": "error", "message": "No node type provided"}
         
         # Find template
-        template = next(
-            (n for n in node_index if n["name"].lower() == node_type_name.lower()),
-            None
-        )
+        template = find_node_template(node_type_name)
         
         if not template:
             return {"status": "error", "message": f"Node type '{node_type_name}' not found"}
         
-        # Build node from template
-        dynamic_inputs = [{"var": inp} for inp in template.get("dynamic", {}).get("inputs", [])]
-        dynamic_outputs = template.get("dynamic", {}).get("outputs", [])
+        with graph_store.edit(doc):
+            # Generate unique node ID
+            node_id, position_id = doc.graph.allocate_node_id()
+            
+            # Build node from template
+            new_node = build_node_from_template(
+                template, node_id, position_id, payload.get("x"), payload.get("y")
+            )
+            
+            # Add to graph; persisted by the write-behind writer
+            doc.graph.add_node(new_node)
         
-        pos_x = payload.get("x", 100 * int(node_id.split("_")[1]))
-        pos_y = payload.get("y", 100)
+        return {"status": "ok", "node": new_node}
         
-        new_node = {
-            "nodeId": node_id,
-            "positionId": position_id,
-            "name": f"{template['name'].lower()}_node",
-            "position": {"x": pos_x, "y": pos_y},
-            "input": dynamic_inputs,
-            "output": dynamic_outputs,
-            "ref": template.get("type", "builtin"),
-            "scriptPath": template.get("scriptPath"),
-            "entryFunction": template.get("entryFunction"),
-            "metadata": {"operation": template['name'].lower()}
+    except Exception as e:
+        print(f"ERROR in graph_node_add: {e}")
+        return {"status": "error", "message": str(e)}
+
+
+def graph_subgraph_paste(payload: Dict) -> Dict:
+    """
+    Add a group of nodes and the connections between them in one step.
+    
+    Fresh node IDs are allocated in bulk; connections refer to pasted nodes
+    by the IDs given in the payload and are remapped. Connections to nodes
+    outside the pasted group are dropped.
+    
+    Args:
+        payload: 'nodes' - list of {nodeId, type, x, y, optional input values}
+                 'connections' - list of {sourceNodeId, sourcePort, targetNodeId, targetPort}
+                 optional 'offset' {x, y} added to every position
+        
+    Returns:
+        Status dictionary with created nodes, connections and the ID map
+    """
+    try:
+        doc = get_active_graph()
+        if not doc:
+            return {"status": "error", "message": "Failed to load project graph"}
+        
+        pasted = payload.get("nodes") or []
+        if not pasted:
+            return {"status": "error", "message": "No nodes provided"}
+        
+        # Resolve every template before touching the graph
+        templates = []
+        for item in pasted:
+            template = find_node_template(item.get("type") or "")
+            if not template:
+                return {"status": "error", "message": f"Node type '{item.get('type')}' not found"}
+            templates.append(template)
+        
+        offset = payload.get("offset") or {}
+        dx, dy = offset.get("x", 0), offset.get("y", 0)
+        
+        with graph_store.transaction(doc):
+            ids = doc.graph.allocate_node_ids(len(pasted))
+            id_map = {}
+            new_nodes = []
+            for item, template, (node_id, position_id) in zip(pasted, templates, ids):
+                new_node = build_node_from_template(
+                    template, node_id, position_id,
+                    item.get("x", 0) + dx, item.get("y", 0) + dy
+                )
+                # Carry over literal input values by index
+                for inp, value in zip(new_node["input"], item.get("input") or []):
+                    if isinstance(value, dict) and "value" in value:
+                        inp["value"] = value["value"]
+                doc.graph.add_node(new_node)
+                new_nodes.append(new_node)
+                if item.get("nodeId") is not None:
+                    id_map[item["nodeId"]] = node_id
+            
+            new_connections = []
+            for conn in payload.get("connections") or []:
+                source = id_map.get(conn.get("sourceNodeId"))
+                target = id_map.get(conn.get("targetNodeId"))
+                if source is None or target is None:
+                    continue
+                new_connection = {
+                    "sourceNodeId": source,
+                    "sourcePort": conn.get("sourcePort"),
+                    "targetNodeId": target,
+                    "targetPort": conn.get("targetPort")
+                }
+                if doc.graph.add_connection(new_connection):
+                    new_connections.append(new_connection)
+        
+        return {
+            "status": "ok",
+            "nodes": new_nodes,
+            "connections": new_connections,
+            "idMap": id_map
         }
         
-        # Add to graph and save
-        nodes.append(new_node)
-        graph_content["nodes"] = nodes
+    except Exception as e:
+        print(f"ERROR in graph_subgraph_paste: {e}")
+        return {"status": "error", "message": str(e)}
+
+
+def graph_undo(payload: Optional[Dict] = None) -> Dict:
+    """
+    Revert the latest edit to the active project graph.
+    
+    Returns:
+        Status dictionary with the new version and the ops that were applied
+    """
+    return _history_step(graph_store.undo, "Nothing to undo")
+
+
+def graph_redo(payload: Optional[Dict] = None) -> Dict:
+    """
+    Re-apply the latest undone edit to the active project graph.
+    
+    Returns:
+        Status dictionary with the new version and the ops that were applied
+    """
+    return _history_step(graph_store.redo, "Nothing to redo")
+
+
+def _history_step(step, empty_message: str) -> Dict:
+    try:
+        doc = get_active_graph()
+        if not doc:
+            return {"status": "error", "message": "Failed to load project graph"}
         
-        if not save_json_file(project_path, graph_content):
-            return {"status": "error", "message": "Failed to save graph"}
+        delta = step(doc)
+        if delta is None:
+            return {"status": "error", "message": empty_message}
         
-        return {"status": "ok", "node": new_node}
+        return {"status": "ok", "version": delta["version"], "ops": delta["ops"]}
         
     except Exception as e:
-        print(f"ERROR in graph_node_add: {e}")
+        print(f"ERROR in graph history: {e}")
         return {"status": "error", "message": str(e)}
 
 
@@ -421,38 +736,18 @@ def graph_node_delete(payload: Dict) -> Dict:
         Status dictionary
     """
     try:
-        graph_content = load_graph_from_state()
-        if not graph_content:
+        doc = get_active_graph()
+        if not doc:
             return {"status": "error", "message": "Failed to load project graph"}
         
-        project_path = get_project_path_from_state()
-        if not project_path:
-            return {"status": "error", "message": "No active project"}
-        
         target_id = payload.get("nodeId")
         if not target_id:
             return {"status": "error", "message": "No nodeId provided"}
         
-        # Remove the node
-        original_count = len(graph_content.get("nodes", []))
-        graph_content["nodes"] = [
-            n for n in graph_content.get("nodes", [])
-            if n.get("nodeId") != target_id
-        ]
-        
-        if len(graph_content["nodes"]) == original_count:
-            return {"status": "error", "message": f"Node '{target_id}' not found"}
-        
-        # Remove associated connections
-        if "connections" in graph_content:
-            graph_content["connections"] = [
-                c for c in graph_content.get("connections", [])
-                if c.get("sourceNodeId") != target_id and c.get("targetNodeId") != target_id
-            ]
-        
-        # Save
-        if not save_json_file(project_path, graph_content):
-            return {"status": "error", "message": "Failed to save graph"}
+        with graph_store.edit(doc):
+            # Remove the node and its connections
+            if doc.graph.remove_node(target_id) is None:
+                return {"status": "error", "message": f"Node '{target_id}' not found"}
         
         return {"status": "ok", "deletedNodeId": target_id}
         
@@ -475,14 +770,10 @@ def graph_node_update_input(payload: Dict) -> Dict:
         Status dictionary
     """
     try:
-        graph_content = load_graph_from_state()
-        if not graph_content:
+        doc = get_active_graph()
+        if not doc:
             return {"status": "error", "message": "Failed to load project graph"}
         
-        project_path = get_project_path_from_state()
-        if not project_path:
-            return {"status": "error", "message": "No active project"}
-        
         node_id = payload.get("nodeId")
         input_index = payload.get("inputIndex")
         value = payload.get("value")
@@ -490,27 +781,20 @@ def graph_node_update_input(payload: Dict) -> Dict:
         if node_id is None or input_index is None:
             return {"status": "error", "message": "Missing nodeId or inputIndex"}
         
-        # Find the node
-        nodes = graph_content.get("nodes", [])
-        target_node = next(
-            (n for n in nodes if n.get("nodeId") == node_id),
-            None
-        )
-        
-        if not target_node:
-            return {"status": "error", "message": f"Node '{node_id}' not found"}
-        
-        # Update the input value
-        inputs = target_node.get("input", [])
-        if input_index >= len(inputs):
-            return {"status": "error", "message": f"Input index {input_index} out of range"}
-        
-        # Preserve value even if connection exists
-        inputs[input_index]["value"] = value
-        
-        # Save
-        if not save_json_file(project_path, graph_content):
-            return {"status": "error", "message": "Failed to save graph"}
+        with graph_store.edit(doc):
+            # Validate before edit_node, which marks the node changed
+            target_node = doc.graph.get_node(node_id)
+
+            if not target_node:
+                return {"status": "error", "message": f"Node '{node_id}' not found"}
+
+            inputs = target_node.get("input", [])
+            if not isinstance(input_index, int) or isinstance(input_index, bool) \
+                    or not 0 <= input_index < len(inputs):
+                return {"status": "error", "message": f"Input index {input_index} out of range"}
+
+            # Preserve value even if connection exists
+            doc.graph.edit_node(node_id)["input"][input_index]["value"] = value
         
         return {
             "status": "ok",
@@ -528,6 +812,9 @@ def graph_node_move(payload: Dict) -> Dict:
     """
     Update node position in the project graph.
     
+    Fired once per frame while dragging; writes are coalesced by the graph store
+    and only touch the project's layout.json.
+    
     Args:
         payload: Must contain 'nodeId' and 'updates' with 'position' {x, y}
         
@@ -535,14 +822,10 @@ def graph_node_move(payload: Dict) -> Dict:
         Status dictionary
     """
     try:
-        graph_content = load_graph_from_state()
-        if not graph_content:
+        doc = get_active_graph()
+        if not doc:
             return {"status": "error", "message": "Failed to load project graph"}
         
-        project_path = get_project_path_from_state()
-        if not project_path:
-            return {"status": "error", "message": "No active project"}
-        
         node_id = payload.get("nodeId")
         position = payload.get("updates", {}).get("position", {})
         x = position.get("x")
@@ -551,21 +834,14 @@ def graph_node_move(payload: Dict) -> Dict:
         if node_id is None or x is None or y is None:
             return {"status": "error", "message": "Missing nodeId, x, or y"}
         
-        # Find and update node
-        nodes = graph_content.get("nodes", [])
-        target_node = next(
-            (n for n in nodes if n.get("nodeId") == node_id),
-            None
-        )
-        
-        if not target_node:
-            return {"status": "error", "message": f"Node '{node_id}' not found"}
-        
-        target_node["position"] = {"x": x, "y": y}
-        
-        # Save
-        if not save_json_file(project_path, graph_content):
-            return {"status": "error", "message": "Failed to save graph"}
+        with graph_store.edit(doc):
+            # Find and update node
+            target_node = doc.graph.edit_node(node_id, layout_only=True)
+            
+            if not target_node:
+                return {"status": "error", "message": f"Node '{node_id}' not found"}
+            
+            target_node["position"] = {"x": x, "y": y}
         
         return {
             "status": "ok",
@@ -593,14 +869,10 @@ def connection_create(payload: Dict) -> Dict:
         Status dictionary with connection data
     """
     try:
-        graph_content = load_graph_from_state()
-        if not graph_content:
+        doc = get_active_graph()
+        if not doc:
             return {"status": "error", "message": "Failed to load project graph"}
         
-        project_path = get_project_path_from_state()
-        if not project_path:
-            return {"status": "error", "message": "No active project"}
-        
         # Extract parameters
         source_node_id = payload.get("sourceNodeId")
         source_port = payload.get("sourcePort")
@@ -610,41 +882,22 @@ def connection_create(payload: Dict) -> Dict:
         if None in [source_node_id, source_port, target_node_id, target_port]:
             return {"status": "error", "message": "Missing connection parameters"}
         
-        # Validate nodes exist
-        nodes = graph_content.get("nodes", [])
-        source_exists = any(n.get("nodeId") == source_node_id for n in nodes)
-        target_exists = any(n.get("nodeId") == target_node_id for n in nodes)
-        
-        if not source_exists or not target_exists:
-            return {"status": "error", "message": "Source or target node not found"}
-        
-        # Create connection
-        new_connection = {
-            "sourceNodeId": source_node_id,
-            "sourcePort": source_port,
-            "targetNodeId": target_node_id,
-            "targetPort": target_port
-        }
-        
-        # Check for duplicate
-        connections = graph_content.get("connections", [])
-        duplicate = any(
-            c.get("sourceNodeId") == source_node_id and
-            c.get("sourcePort") == source_port and
-            c.get("targetNodeId") == target_node_id and
-            c.get("targetPort") == target_port
-            for c in connections
-        )
-        
-        if duplicate:
-            return {"status": "error", "message": "Connection already exists"}
-        
-        # Add and save
-        connections.append(new_connection)
-        graph_content["connections"] = connections
-        
-        if not save_json_file(project_path, graph_content):
-            return {"status": "error", "message": "Failed to save graph"}
+        with graph_store.edit(doc):
+            # Validate nodes exist
+            if not doc.graph.has_node(source_node_id) or not doc.graph.has_node(target_node_id):
+                return {"status": "error", "message": "Source or target node not found"}
+            
+            # Create connection
+            new_connection = {
+                "sourceNodeId": source_node_id,
+                "sourcePort": source_port,
+                "targetNodeId": target_node_id,
+                "targetPort": target_port
+            }
+            
+            # Add unless duplicate; persisted by the write-behind writer
+            if not doc.graph.add_connection(new_connection):
+                return {"status": "error", "message": "Connection already exists"}
         
         return {"status": "ok", "connection": new_connection}
         
@@ -664,14 +917,10 @@ def connection_delete(payload: Dict) -> Dict:
         Status dictionary
     """
     try:
-        graph_content = load_graph_from_state()
-        if not graph_content:
+        doc = get_active_graph()
+        if not doc:
             return {"status": "error", "message": "Failed to load project graph"}
         
-        project_path = get_project_path_from_state()
-        if not project_path:
-            return {"status": "error", "message": "No active project"}
-        
         # Extract parameters
         source_node_id = payload.get("sourceNodeId")
         source_port = payload.get("sourcePort")
@@ -681,26 +930,11 @@ def connection_delete(payload: Dict) -> Dict:
         if None in [source_node_id, source_port, target_node_id, target_port]:
             return {"status": "error", "message": "Missing connection parameters"}
         
-        # Remove connection
-        connections = graph_content.get("connections", [])
-        original_count = len(connections)
-        
-        graph_content["connections"] = [
-            c for c in connections
-            if not (
-                c.get("sourceNodeId") == source_node_id and
-                c.get("sourcePort") == source_port and
-                c.get("targetNodeId") == target_node_id and
-                c.get("targetPort") == target_port
-            )
-        ]
-        
-        if len(graph_content["connections"]) == original_count:
-            return {"status": "error", "message": "Connection not found"}
-        
-        # Save
-        if not save_json_file(project_path, graph_content):
-            return {"status": "error", "message": "Failed to save graph"}
+        with graph_store.edit(doc):
+            # Remove connection
+            key = (source_node_id, source_port, target_node_id, target_port)
+            if doc.graph.remove_connection(key) is None:
+                return {"status": "error", "message": "Connection not found"}
         
         return {
             "status": "ok",
@@ -714,4 +948,4 @@ def connection_delete(payload: Dict) -> Dict:
         
     except Exception as e:
         print(f"ERROR in connection_delete: {e}")
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
@@ -12,10 +12,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from .config import USERDATA_PATH, NODEBANK_PATH, init_directories
 from .handlers import (
     log_signal, handle_engine_output, on_finished,
-    launch_engine, get_startup_payload, handle_load_graph, project_load_request,
+    launch_engine, get_startup_payload, handle_load_graph, handle_graph_delta, project_load_request,
     graph_node_add, graph_node_delete, connection_create, connection_delete,
-    graph_node_update_input, graph_node_move,
-    handle_engine_state_request, handle_engine_logs_request,
+    graph_node_update_input, graph_node_move, graph_subgraph_paste, graph_undo, graph_redo,
+    handle_engine_state_request, handle_engine_logs_request, handle_project_list,
+    handle_node_index_request, handle_node_search, handle_node_usage, handle_graph_analysis,
+    handle_viewport,
 )
 
 # Core Module Imports
@@ -24,8 +26,10 @@ from .modules.node_manager import NodeManager
 from .modules.signal_hub import SignalHub
 from .modules.execution_manager import ExecutionManager
 from .modules.log_manager import LogManager
-from .api_router import create_dispatcher, ws_manager
+from .api_router import create_dispatcher, ws_manager, dispatch_pool
 from .modules.index_service import IndexService
+from .modules.graph_store import graph_store
+from .modules.engine_state_manager import engine_state
 
 
 # ── Initialize Folders ────────────────────────────────────────────────────────
@@ -48,14 +52,24 @@ index_service = IndexService(
 )
 
 signal_hub.on("load_graph_request", handle_load_graph)
+signal_hub.on("graph_delta_request", handle_graph_delta)
 signal_hub.on("startup_request", handle_startup_request)
 signal_hub.on("project_load_request", project_load_request)
+signal_hub.on("project_list_request", handle_project_list)
+signal_hub.on("node_index_request", handle_node_index_request)
+signal_hub.on("node_search_request", handle_node_search)
+signal_hub.on("node_usage_request", handle_node_usage)
+signal_hub.on("graph_analysis_request", handle_graph_analysis)
+signal_hub.on("viewport_request", handle_viewport)
 signal_hub.on("project_node_add", graph_node_add)
 signal_hub.on("project_node_delete", graph_node_delete)
 signal_hub.on("connection_create_request", connection_create)
 signal_hub.on("connection_delete_request", connection_delete)
 signal_hub.on("graph_node_update_input_request", graph_node_update_input)
 signal_hub.on("graph_node_move_request", graph_node_move)
+signal_hub.on("graph_subgraph_paste_request", graph_subgraph_paste)
+signal_hub.on("graph_undo_request", graph_undo)
+signal_hub.on("graph_redo_request", graph_redo)
 signal_hub.on("project_delete_request", lambda p: project_backend.delete_project(
     p.get("projectId", {}).get("projectName")
 ))
@@ -91,6 +105,23 @@ app.add_middleware(_WSPassthroughCORS, allow_origins=["*"], allow_methods=["*"],
 # API routes
 app.include_router(create_dispatcher(signal_hub, project_backend, log_manager))
 
+
+@app.on_event("startup")
+async def bind_event_loop():
+    """Let worker-thread handlers reach the loop (async signals, WS broadcasts)."""
+    loop = asyncio.get_running_loop()
+    signal_hub.bind_loop(loop)
+    ws_manager._loop = loop
+    index_service.start_watching()
+
+
+@app.on_event("shutdown")
+def flush_graphs():
+    """Persist graph edits and engine state still waiting to be written."""
+    dispatch_pool.shutdown()
+    graph_store.flush_all()
+    engine_state.flush()
+
 # Static assets (production build only)
 if getattr(sys, "frozen", False):
     PROJECT_ROOT = sys._MEIPASS
@@ -110,8 +141,7 @@ async def ws_engine(websocket: WebSocket):
     ws_manager._loop = asyncio.get_running_loop()
     await ws_manager.connect(websocket)
     try:
-        results = signal_hub.emit("engine_state_request", {})
-        s = results[0].get("state", "idle") if (results and results[0]) else "idle"
+        s = engine_state.get_frontend_state()
         await websocket.send_text(
             json.dumps({"type": "engine_status", "status": s,
                         "message": "Connected to Loom engine"})
@@ -1,65 +1,333 @@
-import shutil
+import os
 import json
+import queue
+import threading
+import time
 from pathlib import Path
+from typing import Dict, Any, Optional, Callable
+from executor.utils.venv_layout import VENV_KEY_FILE, remove_venv
 from .storage_manager import StorageManager
 
+DEFAULT_VENV_BUDGET_BYTES = 2 * 1024 ** 3  # 2 GiB
+
+# Pending touches for venvs that never appear are dropped after this long
+PENDING_TTL_SECONDS = 24 * 3600
+
+
+def _dir_size(path: Path) -> int:
+    """Total bytes under path. Symlinks are not followed; hardlinks count once."""
+    total = 0
+    seen = set()
+    stack = [str(path)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            continue
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if st.st_nlink > 1:
+                        if (st.st_dev, st.st_ino) in seen:
+                            continue
+                        seen.add((st.st_dev, st.st_ino))
+                    total += st.st_size
+        except OSError:
+            continue
+    return total
+
+
+class VenvRegistry:
+    """
+    Tracks every real venv directory under userdata with its last use and size.
+
+    Entries are keyed by the real directory (a shared cache build or a legacy
+    per-project venv); project folders that link to it are kept in 'links'
+    so eviction can drop them together. A hardlink clone of a cache build
+    shares its files, so it is a link of that build and costs nothing.
+
+    Registry file: userdata/venv_registry.json
+    """
+
+    def __init__(self, userdata_dir: Path):
+        self.userdata_dir = Path(userdata_dir)
+        self.cache_dir = self.userdata_dir / "venv_cache"
+        self.registry_path = self.userdata_dir / "venv_registry.json"
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # project venv path -> last use, for venvs the engine has not built yet
+        self._pending: Dict[str, float] = {}
+        self._load()
+
+    def _load(self):
+        if not self.registry_path.exists():
+            return
+        try:
+            with open(self.registry_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._entries = data.get("entries", {})
+            self._pending = data.get("pending", {})
+        except Exception as e:
+            print(f"[CLEANER] Failed to read venv registry: {e}")
+
+    def save(self):
+        with self._lock:
+            data = {"entries": self._entries, "pending": self._pending}
+        tmp = self.registry_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp, self.registry_path)
+
+    def touch(self, project_venv: Path):
+        """Record a use. Cheap: no filesystem access, resolved later by reconcile()."""
+        with self._lock:
+            self._pending[str(project_venv)] = time.time()
+
+    def _owner(self, venv: Path) -> Path:
+        """The real venv behind a project venv: its symlink target, the cache build it was hardlink-cloned from, or itself."""
+        if venv.is_symlink():
+            return venv.resolve()
+        marker = venv / VENV_KEY_FILE
+        try:
+            key = marker.read_text(encoding="utf-8").strip()
+            cached = self.cache_dir / key
+            ours, theirs = marker.stat(), (cached / VENV_KEY_FILE).stat()
+        except OSError:
+            return venv
+        # Same inode: the clone's files are links, not copies (copy2 fallback)
+        if key and (ours.st_dev, ours.st_ino) == (theirs.st_dev, theirs.st_ino):
+            return cached
+        return venv
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {k: dict(v) for k, v in self._entries.items()}
+
+    def reconcile(self):
+        """
+        Resolve pending touches, pick up untracked venvs and measure sizes.
+
+        Only looks one level deep (userdata/venv_cache/* and userdata/*/venv),
+        never into site-packages.
+        """
+        now = time.time()
+        with self._lock:
+            pending = dict(self._pending)
+
+        resolved = {}
+        for project_venv, used_at in pending.items():
+            link = Path(project_venv)
+            if link.is_symlink() or link.is_dir():
+                real = self._owner(link)
+            else:
+                if now - used_at > PENDING_TTL_SECONDS:
+                    resolved[project_venv] = None
+                continue
+            resolved[project_venv] = (str(real), used_at)
+
+        found = {}
+        # hardlink clone -> cache build it shares files with
+        clones = {}
+        if self.cache_dir.is_dir():
+            for cached in self.cache_dir.iterdir():
+                if cached.is_dir():
+                    found[str(cached)] = cached
+        for folder in self.userdata_dir.iterdir():
+            candidate = folder / "venv"
+            if folder.is_dir() and folder != self.cache_dir and candidate.is_dir() and not candidate.is_symlink():
+                owner = self._owner(candidate)
+                if owner == candidate:
+                    found[str(candidate)] = candidate
+                else:
+                    clones[str(candidate)] = str(owner)
+
+        with self._lock:
+            for project_venv, target in resolved.items():
+                self._pending.pop(project_venv, None)
+                if target is None:
+                    continue
+                real, used_at = target
+                entry = self._entries.setdefault(real, {"lastUsed": used_at, "size": None, "links": []})
+                entry["lastUsed"] = max(entry.get("lastUsed") or 0, used_at)
+                if project_venv != real and project_venv not in entry["links"]:
+                    entry["links"].append(project_venv)
+
+            for real in list(self._entries):
+                if real not in found:
+                    del self._entries[real]
+
+            for real, path in found.items():
+                if real not in self._entries:
+                    try:
+                        mtime = path.stat().st_mtime
+                    except OSError:
+                        continue
+                    self._entries[real] = {"lastUsed": mtime, "size": None, "links": []}
+
+            for clone, real in clones.items():
+                entry = self._entries.get(real)
+                if entry is not None and clone not in entry["links"]:
+                    entry["links"].append(clone)
+
+            to_measure = [real for real, e in self._entries.items() if e.get("size") is None]
+
+        # Measure outside the lock; a venv only changes size while it is being built
+        for real in to_measure:
+            path = Path(real)
+            if path.parent == self.cache_dir and not (path / VENV_KEY_FILE).exists():
+                continue  # build in progress
+            size = _dir_size(path)
+            with self._lock:
+                if real in self._entries:
+                    self._entries[real]["size"] = size
+
+    def evict_to_budget(self, budget: int, pinned: Optional[set] = None) -> int:
+        """Delete least-recently-used venvs until the measured total fits in budget."""
+        pinned = pinned or set()
+        with self._lock:
+            entries = {k: dict(v) for k, v in self._entries.items()}
+
+        total = sum(e.get("size") or 0 for e in entries.values())
+        if total <= budget:
+            return 0
+
+        evicted = 0
+        for real, entry in sorted(entries.items(), key=lambda kv: kv[1].get("lastUsed") or 0):
+            if total <= budget:
+                break
+            path = Path(real)
+            if real in pinned or any(link in pinned for link in entry.get("links", [])):
+                continue
+            if entry.get("size") is None:
+                continue  # unmeasured (still building)
+
+            print(f"[CLEANER] LRU: Deleting venv at {path} ({entry['size'] // (1024 * 1024)} MiB)")
+            for link in entry.get("links", []):
+                link_path = Path(link)
+                # Symlinks and hardlink clones of this build; anything since rebuilt stays
+                if link_path.exists() and self._owner(link_path) == path:
+                    remove_venv(link_path)
+            remove_venv(path)
+
+            with self._lock:
+                self._entries.pop(real, None)
+            total -= entry["size"]
+            evicted += 1
+
+        if evicted:
+            self.drop_dangling_links()
+        return evicted
+
+    def drop_dangling_links(self):
+        """Remove project venv symlinks whose cached target is gone."""
+        for folder in self.userdata_dir.iterdir():
+            candidate = folder / "venv"
+            if candidate.is_symlink() and not candidate.exists():
+                candidate.unlink()
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._pending = {}
+
+
 class VenvCleaner:
+    """
+    Background venv housekeeping.
+
+    Request handlers only record usage and enqueue work; reconciling, sizing
+    and every rmtree happen on a single daemon worker thread.
+    """
+
+    _registry: Optional[VenvRegistry] = None
+    _jobs: "queue.Queue" = queue.Queue()
+    _worker: Optional[threading.Thread] = None
+    _pinned: set = set()
+    _start_lock = threading.Lock()
+
+    @staticmethod
+    def registry() -> VenvRegistry:
+        if VenvCleaner._registry is None:
+            VenvCleaner._registry = VenvRegistry(StorageManager.USERDATA_DIR)
+        return VenvCleaner._registry
+
     @staticmethod
-    def run_fifo_clean(project_id: str, project_path_str: str):
+    def _ensure_worker():
+        with VenvCleaner._start_lock:
+            if VenvCleaner._worker is None or not VenvCleaner._worker.is_alive():
+                VenvCleaner._worker = threading.Thread(
+                    target=VenvCleaner._run_worker, name="venv-cleaner", daemon=True
+                )
+                VenvCleaner._worker.start()
+
+    @staticmethod
+    def _run_worker():
+        while True:
+            job, callback = VenvCleaner._jobs.get()
+            try:
+                result = job()
+                if callback:
+                    callback(result, None)
+            except Exception as e:
+                print(f"[CLEANER ERROR] {e}")
+                if callback:
+                    callback(None, e)
+
+    @staticmethod
+    def _submit(job: Callable, callback: Optional[Callable] = None):
+        VenvCleaner._ensure_worker()
+        VenvCleaner._jobs.put((job, callback))
+
+    @staticmethod
+    def mark_used(project_id: str, project_path_str: str):
         """
-        Triggered before execution. 
-        Deletes the oldest venv if history > limit, then adds current project to history.
+        Triggered before execution. Records the project's venv as most recently
+        used and schedules a background LRU pass; never blocks on disk.
         """
-        state = StorageManager.get_state()
+        # projectPath is 'userdata/folder/file.json', venv is 'userdata/folder/venv'
+        project_venv = Path(project_path_str).parent / "venv"
+        VenvCleaner.registry().touch(project_venv)
+        VenvCleaner._pinned = {str(project_venv)}
+        VenvCleaner._submit(VenvCleaner.maintain)
+
+    @staticmethod
+    def maintain() -> int:
+        """Reconcile the registry and evict LRU venvs over the byte budget."""
         settings = StorageManager.get_settings()
-        
-        limit = settings.get("max_venv_count", 3)
-        history = state.get("history", [])
-
-        # 1. Remove if exists to move to end of FIFO (freshest)
-        history = [p for p in history if p["projectId"] != project_id]
-
-        # 2. Check limit
-        if len(history) >= limit:
-            # Pop oldest (index 0)
-            oldest = history.pop(0)
-            # projectPath is 'userdata/folder/file.json', venv is 'userdata/folder/venv'
-            oldest_dir = Path(oldest["projectPath"]).parent
-            venv_to_del = oldest_dir / "venv"
-            
-            if venv_to_del.exists() and venv_to_del.is_dir():
-                print(f"[CLEANER] FIFO: Deleting oldest venv at {venv_to_del}")
-                shutil.rmtree(venv_to_del, ignore_errors=True)
-
-        # 3. Add current project to history
-        history.append({
-            "projectId": project_id,
-            "projectPath": project_path_str
-        })
-
-        # 4. Save state
-        state["history"] = history
-        StorageManager.save_state(state)
+        budget = settings.get("venv_budget_bytes", DEFAULT_VENV_BUDGET_BYTES)
+
+        registry = VenvCleaner.registry()
+        registry.reconcile()
+        evicted = registry.evict_to_budget(budget, pinned=VenvCleaner._pinned)
+        registry.save()
+        return evicted
+
+    @staticmethod
+    def clean_all_venvs_async(callback: Optional[Callable] = None):
+        """Queue a full wipe; callback(count, error) runs on the worker thread."""
+        VenvCleaner._submit(VenvCleaner.clean_all_venvs, callback)
 
     @staticmethod
     def clean_all_venvs() -> int:
         """
-        Full Wipe: Deletes all 'venv' folders in userdata and clears history.
+        Full Wipe: Deletes every tracked or discoverable venv in userdata,
+        including the shared venv cache, and clears the registry.
         """
-        base_path = StorageManager.USERDATA_DIR
-        # glob find all folders named venv
-        venvs_found = list(base_path.glob("**/venv"))
-        
+        registry = VenvCleaner.registry()
+        registry.reconcile()
+
         count = 0
-        for venv_path in venvs_found:
-            if venv_path.is_dir():
-                print(f"[CLEANER] Nuclear: Removing {venv_path}")
-                shutil.rmtree(venv_path, ignore_errors=True)
+        for real, entry in registry.entries().items():
+            for link in entry.get("links", []):
+                remove_venv(Path(link))
+            print(f"[CLEANER] Nuclear: Removing {real}")
+            if remove_venv(Path(real)):
                 count += 1
-        
-        # Reset history in state
-        state = StorageManager.get_state()
-        state["history"] = []
-        StorageManager.save_state(state)
-        
-        return count
\ No newline at end of file
+
+        registry.drop_dangling_links()
+        registry.clear()
+        registry.save()
+        return count
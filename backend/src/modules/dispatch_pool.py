@@ -0,0 +1,149 @@
+"""
+Loom Dispatch Pool
+
+Runs synchronous signal handlers off the FastAPI event loop.
+
+Handlers read and write files, launch subprocesses and delete venvs; run
+on the loop, one slow call stalls every HTTP and WebSocket client. The
+dispatcher hands them to a bounded thread pool instead. Calls that share a
+lane (e.g. every edit to the active project) run one at a time in arrival
+order; calls without a lane run concurrently.
+
+Per-command latency (queue wait + handler time) is sampled into bounded
+rings so percentiles can be read at /metrics/dispatch.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Samples kept per command for percentiles
+LATENCY_SAMPLES = 2048
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100.0 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+class LatencyStats:
+    """Recent latency samples (milliseconds) per command."""
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._total: Dict[str, deque] = {}
+        self._wait: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+
+    def record(self, name: str, total_ms: float, wait_ms: float) -> None:
+        with self._lock:
+            if name not in self._total:
+                self._total[name] = deque(maxlen=self.samples)
+                self._wait[name] = deque(maxlen=self.samples)
+                self._counts[name] = 0
+            self._total[name].append(total_ms)
+            self._wait[name].append(wait_ms)
+            self._counts[name] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            data = {name: (sorted(self._total[name]), sorted(self._wait[name]), self._counts[name])
+                    for name in self._total}
+        result = {}
+        for name, (total, wait, count) in data.items():
+            result[name] = {
+                "count": count,
+                "p50": round(percentile(total, 50), 3),
+                "p90": round(percentile(total, 90), 3),
+                "p99": round(percentile(total, 99), 3),
+                "max": round(total[-1], 3) if total else 0.0,
+                "waitP50": round(percentile(wait, 50), 3),
+                "waitP99": round(percentile(wait, 99), 3),
+            }
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._total.clear()
+            self._wait.clear()
+            self._counts.clear()
+
+
+class DispatchPool:
+    """
+    Bounded worker pool with optional per-lane ordering.
+
+    Args:
+        max_workers: Threads available to sync handlers
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dispatch")
+        # Lane locks belong to the event loop; asyncio.Lock wakes waiters in FIFO order
+        self._lanes: Dict[str, asyncio.Lock] = {}
+        self._waiting: Dict[str, int] = {}
+        self.stats = LatencyStats()
+
+    def _lane_lock(self, lane: str) -> asyncio.Lock:
+        lock = self._lanes.get(lane)
+        if lock is None:
+            lock = self._lanes[lane] = asyncio.Lock()
+        return lock
+
+    async def run(self, name: str, fn: Callable, *args, lane: Optional[str] = None) -> Any:
+        """Run fn(*args) on the pool, after earlier calls in the same lane."""
+        loop = asyncio.get_running_loop()
+        received = time.perf_counter()
+
+        if lane is None:
+            started = [received]
+            result = await loop.run_in_executor(self._executor, self._timed(fn, started), *args)
+        else:
+            lock = self._lane_lock(lane)
+            self._waiting[lane] = self._waiting.get(lane, 0) + 1
+            try:
+                await lock.acquire()
+            finally:
+                self._waiting[lane] -= 1
+                if not self._waiting[lane]:
+                    del self._waiting[lane]
+            started = [time.perf_counter()]
+            future = loop.run_in_executor(self._executor, self._timed(fn, started), *args)
+            # Release when the work really ends, even if this request is cancelled meanwhile
+            future.add_done_callback(lambda _: lock.release())
+            result = await asyncio.shield(future)
+
+        done = time.perf_counter()
+        self.stats.record(name, (done - received) * 1000, (started[0] - received) * 1000)
+        return result
+
+    @staticmethod
+    def _timed(fn: Callable, started: list) -> Callable:
+        """Wrap fn so started[0] is when a worker actually picked it up."""
+        def call(*args):
+            started[0] = time.perf_counter()
+            return fn(*args)
+        return call
+
+    def record(self, name: str, total_ms: float, wait_ms: float = 0.0) -> None:
+        """Add a sample for work that did not go through run() (e.g. async handlers)."""
+        self.stats.record(name, total_ms, wait_ms)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "workers": self.max_workers,
+            "lanes": {lane: {"waiting": n} for lane, n in self._waiting.items()},
+            "commands": self.stats.snapshot(),
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
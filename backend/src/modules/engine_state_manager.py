@@ -3,84 +3,175 @@ Engine State Manager
 
 Manages engine execution state separately from project state.
 Provides simplified frontend states (idle/running) while maintaining detailed backend states.
+
+The backend process owns the state: it lives in memory, reads are free,
+and every change is pushed to subscribers (the WebSocket broadcaster) as
+it happens. engine_state.json is only a write-behind copy for crash
+recovery. The engine subprocess never touches that file; it reports its
+transitions with report_engine_state(), which prints a marker line on
+stdout that the backend's ExecutionManager already reads.
 """
 
 import json
+import os
+import sys
+import threading
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Callable, List, Optional, Dict, Any
+
+# Prefix of the stdout lines the engine uses to report state changes
+ENGINE_STATE_MARKER = "[ENGINE_STATE] "
+
+VALID_STATUSES = ["idle", "initializing", "running", "stopping", "stopped", "error"]
+ACTIVE_STATUSES = ["initializing", "running", "stopping"]
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _idle_state() -> Dict[str, Any]:
+    return {
+        "status": "idle",
+        "timestamp": _now(),
+        "project_id": None,
+        "error": None,
+        "process_id": None
+    }
+
+
+def frontend_status(status: str) -> str:
+    """Map a backend status to 'idle' or 'running'."""
+    return "running" if status in ACTIVE_STATUSES else "idle"
+
+
+def report_engine_state(status: str, project_id: Optional[str] = None,
+                        error: Optional[Dict[str, str]] = None) -> None:
+    """Engine side: announce a state change to the backend over stdout."""
+    line = json.dumps({"status": status, "project_id": project_id, "error": error})
+    print(ENGINE_STATE_MARKER + line)
+    sys.stdout.flush()
+
+
+def parse_engine_state_line(line: str) -> Optional[Dict[str, Any]]:
+    """Backend side: the reported state if line is a marker line, else None."""
+    if not line.startswith(ENGINE_STATE_MARKER):
+        return None
+    try:
+        report = json.loads(line[len(ENGINE_STATE_MARKER):])
+    except ValueError:
+        return None
+    return report if isinstance(report, dict) else None
 
 
 class EngineStateManager:
     """
     Manages engine execution state with frontend/backend state separation.
-    
+
     Backend States: idle, initializing, running, stopping, stopped, error
     Frontend States: idle, running
-    
+
     Mapping:
     - Backend idle|stopped|error → Frontend idle
     - Backend initializing|running|stopping → Frontend running
+
+    Args:
+        userdata_path: Folder holding the engine_state.json recovery copy
+        persist_delay: Seconds a change may wait before the copy is rewritten
     """
-    
-    def __init__(self, userdata_path: str = "userdata"):
-        base_path = Path(userdata_path)
-        base_path.mkdir(parents=True, exist_ok=True)
-        self.state_file = base_path / "engine_state.json"
-        
-        # Initialize if doesn't exist
-        if not self.state_file.exists():
-            self._write_state({
-                "status": "idle",
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "project_id": None,
-                "error": None,
-                "process_id": None
-            })
-    
-    def _read_state(self) -> Dict[str, Any]:
-        """Read current state from file."""
+
+    def __init__(self, userdata_path: str = "userdata", persist_delay: float = 0.5):
+        self.state_file = Path(userdata_path) / "engine_state.json"
+        self.persist_delay = persist_delay
+        self._lock = threading.Lock()
+        self._state: Optional[Dict[str, Any]] = None
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._persist_timer: Optional[threading.Timer] = None
+
+    def _current(self) -> Dict[str, Any]:
+        """The in-memory state, recovered from disk on first use. Call under lock."""
+        if self._state is None:
+            self._state = self._recover()
+        return self._state
+
+    def _recover(self) -> Dict[str, Any]:
         try:
             with open(self.state_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+                state = {**_idle_state(), **json.load(f)}
+        except FileNotFoundError:
+            return _idle_state()
         except Exception as e:
             print(f"[EngineStateManager] Error reading state: {e}")
-            return {
-                "status": "idle",
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "project_id": None,
-                "error": None,
-                "process_id": None
-            }
-    
+            return _idle_state()
+
+        # No engine survives a backend restart; a run left active was cut short
+        if state.get("status") in ACTIVE_STATUSES:
+            state.update(status="idle", process_id=None, timestamp=_now())
+        return state
+
+    # -------------------------
+    # PERSISTENCE (write-behind)
+    # -------------------------
+    def _schedule_persist(self) -> None:
+        """Call under lock."""
+        if self._persist_timer is None:
+            self._persist_timer = threading.Timer(self.persist_delay, self.flush)
+            self._persist_timer.daemon = True
+            self._persist_timer.start()
+
+    def flush(self) -> None:
+        """Write the recovery copy now."""
+        with self._lock:
+            if self._persist_timer is not None:
+                self._persist_timer.cancel()
+                self._persist_timer = None
+            state = dict(self._current())
+        self._write_state(state)
+
     def _write_state(self, state: Dict[str, Any]):
-        """Write state to file."""
+        """Write state to file (temp file and rename)."""
         try:
-            with open(self.state_file, "w", encoding="utf-8") as f:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.state_file.with_name(self.state_file.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
                 json.dump(state, f, indent=4)
+            os.replace(tmp, self.state_file)
         except Exception as e:
             print(f"[EngineStateManager] Error writing state: {e}")
-    
+
+    # -------------------------
+    # SUBSCRIPTIONS
+    # -------------------------
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]) -> None:
+        """Call callback(state) after every change, on the thread that made it."""
+        self._subscribers.append(callback)
+
+    def _publish(self, state: Dict[str, Any]) -> None:
+        for callback in list(self._subscribers):
+            try:
+                callback(dict(state))
+            except Exception as e:
+                print(f"[EngineStateManager] Subscriber failed: {e}")
+
+    # -------------------------
+    # READ / UPDATE
+    # -------------------------
     def get_engine_state(self) -> Dict[str, Any]:
         """Get full backend engine state."""
-        return self._read_state()
-    
+        with self._lock:
+            return dict(self._current())
+
     def get_frontend_state(self) -> str:
         """
         Get simplified state for frontend UI.
-        
+
         Returns:
             'idle' or 'running'
         """
-        state = self._read_state()
-        status = state.get("status", "idle")
-        
-        # Map backend states to frontend states
-        if status in ["initializing", "running", "stopping"]:
-            return "running"
-        else:  # idle, stopped, error
-            return "idle"
-    
+        with self._lock:
+            return frontend_status(self._current().get("status", "idle"))
+
     def set_engine_state(
         self,
         status: str,
@@ -90,43 +181,51 @@ class EngineStateManager:
     ):
         """
         Update engine state.
-        
+
         Args:
             status: One of: idle, initializing, running, stopping, stopped, error
             project_id: Active project ID
             error: Error dict with 'message' and 'timestamp' if status is 'error'
             process_id: Process ID of running engine subprocess
         """
-        valid_statuses = ["idle", "initializing", "running", "stopping", "stopped", "error"]
-        if status not in valid_statuses:
+        if status not in VALID_STATUSES:
             print(f"[EngineStateManager] Invalid status: {status}")
             return
-        
+
         state = {
             "status": status,
-            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "timestamp": _now(),
             "project_id": project_id,
             "error": error,
             "process_id": process_id
         }
-        
-        self._write_state(state)
-    
+
+        with self._lock:
+            self._state = state
+            self._schedule_persist()
+        self._publish(state)
+
     def is_running(self) -> bool:
         """
         Check if engine is currently running.
-        
+
         Returns:
             True if status is initializing, running, or stopping
         """
-        state = self._read_state()
-        status = state.get("status", "idle")
-        return status in ["initializing", "running", "stopping"]
-    
+        with self._lock:
+            return self._current().get("status", "idle") in ACTIVE_STATUSES
+
     def clear_error(self):
         """Clear error state and return to idle."""
-        state = self._read_state()
-        state["status"] = "idle"
-        state["error"] = None
-        state["timestamp"] = datetime.utcnow().isoformat() + "Z"
-        self._write_state(state)
+        with self._lock:
+            state = dict(self._current())
+            state["status"] = "idle"
+            state["error"] = None
+            state["timestamp"] = _now()
+            self._state = state
+            self._schedule_persist()
+        self._publish(state)
+
+
+# Module-level singleton: the backend's single source of engine state
+engine_state = EngineStateManager()
@@ -1,9 +1,12 @@
 import subprocess
 import sys
 import threading
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 from .signal_hub import SignalHub
+from .engine_state_manager import engine_state, parse_engine_state_line
+from .graph_analysis import graph_analyzer
 from backend.src.modules.project_manager import ProjectManager
 
 
@@ -13,6 +16,7 @@ class ExecutionManager:
 
     Spawns engine process per request and streams stdout/stderr.
     Uses current.json to determine the active project automatically.
+    State lines the engine prints on stdout update engine_state.
     """
 
     def __init__(self, signal_hub: SignalHub):
@@ -20,6 +24,7 @@ class ExecutionManager:
         self.process: Optional[subprocess.Popen] = None
         self.running = False
         self.current_run_id = None
+        self._stdout_thread: Optional[threading.Thread] = None
 
         # Signals
         signal_hub.on("engine_run_request", self.on_run_request)
@@ -33,14 +38,19 @@ class ExecutionManager:
             return
 
         from backend.src.modules.cleaner import VenvCleaner
-        try:
-            count = VenvCleaner.clean_all_venvs()
+
+        def _done(count, error):
+            if error:
+                self.signal_hub.emit("cleaner_error", {"error": str(error)})
+                return
             self.signal_hub.emit("cleaner_success", {
                 "message": f"Successfully wiped {count} virtual environments.",
                 "count": count
             })
-        except Exception as e:
-            self.signal_hub.emit("cleaner_error", {"error": str(e)})
+
+        # rmtree runs on the cleaner thread; result arrives via signals
+        VenvCleaner.clean_all_venvs_async(_done)
+        return {"status": "ok", "message": "Venv wipe scheduled"}
 
     def on_run_request(self, payload=None):
         if self.running:
@@ -54,18 +64,34 @@ class ExecutionManager:
             self.signal_hub.emit("execution_error", {"error": "No current project selected"})
             return {"status": "error", "message": "No current project selected"}
 
-        # 2. TRIGGER FIFO CLEANING (Golden Rule)
+        # 2. Mark venv as used; LRU eviction runs in the background (Golden Rule)
         from backend.src.modules.cleaner import VenvCleaner
-        VenvCleaner.run_fifo_clean(current["projectId"], current["projectPath"])
+        VenvCleaner.mark_used(current["projectId"], current["projectPath"])
 
         # 3. Launch Process logic starts here...
         graph_path = Path(current["projectPath"])
+        # The engine reads the savefile from disk; write pending edits first
+        from backend.src.modules.graph_store import graph_store
+        graph_store.flush(graph_path)
         if not graph_path.exists():
             self.signal_hub.emit("execution_error", {"error": f"Graph not found: {graph_path}"})
             return {"status": "error", "message": f"Graph not found: {graph_path}"}
 
+        # Analysis is kept current as the graph is edited, so this is a cache hit
+        doc = graph_store.get(graph_path)
+        if doc is not None:
+            analysis = graph_analyzer.analyze(doc)
+            if not analysis["ok"]:
+                errors = [i for i in analysis["issues"] if i["severity"] == "error"]
+                message = f"Graph has {len(errors)} error(s): {errors[0]['message']}"
+                print(f"[BACKEND] Run refused. {message}")
+                sys.stdout.flush()
+                self.signal_hub.emit("execution_rejected", {"reason": "invalid_graph", "issues": errors})
+                return {"status": "error", "message": message, "issues": errors}
+
         self.running = True
         self.current_run_id = current.get("projectId")
+        engine_state.set_engine_state("initializing", project_id=self.current_run_id)
         self.signal_hub.emit("execution_started", {"projectId": self.current_run_id})
         print("[BACKEND] " + "─" * 60)
         print(f"[BACKEND] Engine process starting...")
@@ -77,6 +103,7 @@ class ExecutionManager:
 
         if not engine_file.exists():
             self.signal_hub.emit("execution_error", {"error": f"Engine file not found: {engine_file}"})
+            self._set_error(f"Engine file not found: {engine_file}")
             self.running = False
             return {"status": "error", "message": f"Engine file not found: {engine_file}"}
 
@@ -104,12 +131,15 @@ class ExecutionManager:
                 )
         except Exception as e:
             self.signal_hub.emit("execution_error", {"error": str(e)})
+            self._set_error(str(e))
             self.running = False
             return {"status": "error", "message": str(e)}
 
+        engine_state.set_engine_state("running", project_id=self.current_run_id, process_id=self.process.pid)
 
         # Start threads to handle output
-        threading.Thread(target=self._read_stdout, daemon=True).start()
+        self._stdout_thread = threading.Thread(target=self._read_stdout, daemon=True)
+        self._stdout_thread.start()
         threading.Thread(target=self._read_stderr, daemon=True).start()
         threading.Thread(target=self._wait_for_completion, daemon=True).start()
 
@@ -131,7 +161,9 @@ class ExecutionManager:
             else:  # Unix
                 # On Unix, kill the entire process group
                 os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
-                
+
+            engine_state.set_engine_state("stopping", project_id=self.current_run_id,
+                                          process_id=self.process.pid)
             return {"status": "ok", "message": "Engine stop requested"}
         except Exception as e:
             return {"status": "error", "message": str(e)}
@@ -160,12 +192,28 @@ class ExecutionManager:
     def _read_stdout(self):
         if not self.process or not self.process.stdout:
             return
-        for line in self.process.stdout:
+        process = self.process
+        for line in process.stdout:
             line = line.rstrip()
-            if line:
+            report = parse_engine_state_line(line)
+            if report is not None:
+                engine_state.set_engine_state(
+                    report.get("status", "idle"),
+                    project_id=report.get("project_id"),
+                    error=report.get("error"),
+                    process_id=process.pid
+                )
+            elif line:
                 print(line)
                 sys.stdout.flush()
 
+    def _set_error(self, message: str):
+        engine_state.set_engine_state(
+            "error",
+            project_id=self.current_run_id,
+            error={"message": message, "timestamp": datetime.utcnow().isoformat() + "Z"}
+        )
+
     def _read_stderr(self):
         if not self.process or not self.process.stderr:
             return
@@ -180,6 +228,15 @@ class ExecutionManager:
             return
         self.process.wait()
         exit_code = self.process.returncode
+        # Let the reader apply the engine's last state lines first
+        self._stdout_thread.join(timeout=5)
+        # The engine reports its own outcome; cover exits that never got to
+        state = engine_state.get_engine_state()
+        if state.get("status") in ("initializing", "running", "stopping"):
+            if exit_code == 0 or state.get("status") == "stopping":
+                engine_state.set_engine_state("idle", project_id=self.current_run_id)
+            else:
+                self._set_error(f"Engine exited with code {exit_code}")
         self.running = False
         self.current_run_id = None
         self.process = None
@@ -0,0 +1,380 @@
+"""
+Loom Graph Analysis
+
+Static checks of a project graph, kept up to date as edits are applied, so
+a run starts on a graph that is already validated.
+
+GraphAnalyzer listens to the graph store. Each document gets a
+GraphAnalysis that applies every delta as it is committed:
+
+    order    an incremental topological order (Pearce-Kelly): adding a
+             connection only reorders the nodes between its endpoints, and
+             a connection that would close a cycle is kept out of the order
+             and reported, until a removal lets it back in
+    ports    connections to input/output indexes a node does not have
+    scripts  nodes whose script is neither indexed nor on disk, and nodes
+             whose port count no longer matches their template in
+             nodeindex.json
+
+Issues are assembled once per logic change (or node index version) and
+cached with the graph version; moving nodes reuses them. Dead nodes, those
+that can never run because they sit in or downstream of a cycle or a
+missing script, are found then.
+"""
+
+import os
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set
+
+from .graph_model import ConnectionKey, GraphModel, connection_key
+from .graph_store import GraphDocument
+from .node_registry import NodeRegistry, node_registry
+
+ERROR = "error"
+WARNING = "warning"
+
+# How a connection takes part in the order
+_ORDERED = "ordered"
+_CYCLE = "cycle"        # would close a cycle; left out of the order
+_DANGLING = "dangling"  # an endpoint node does not exist
+
+
+def _key_payload(key: ConnectionKey) -> Dict:
+    source, source_port, target, target_port = key
+    return {"sourceNodeId": source, "sourcePort": source_port,
+            "targetNodeId": target, "targetPort": target_port}
+
+
+class GraphAnalysis:
+    """
+    Incremental analysis of one graph; every method runs under the document lock.
+
+    Args:
+        graph: The document's GraphModel (read, never modified)
+        registry: Node templates for script and arity checks
+    """
+
+    def __init__(self, graph: GraphModel, registry: NodeRegistry):
+        self.graph = graph
+        self.registry = registry
+        # nodeId -> position in the topological order (gaps allowed)
+        self.rank: Dict[str, int] = {}
+        self._next_rank = 0
+        # Ordered connections only, counted per node pair
+        self.succ: Dict[str, Counter] = defaultdict(Counter)
+        self.pred: Dict[str, Counter] = defaultdict(Counter)
+        # connection key -> _ORDERED / _CYCLE / _DANGLING
+        self.edges: Dict[ConnectionKey, str] = {}
+        # Cycle-closing connection -> nodes on the cycle
+        self.cycles: Dict[ConnectionKey, List[str]] = {}
+        self.node_issues: Dict[str, List[Dict]] = {}
+        self.port_issues: Dict[ConnectionKey, Dict] = {}
+        # nodeId -> what its checks depended on, to skip re-checks on moves
+        self._node_sigs: Dict[str, tuple] = {}
+        self.registry_version = registry.version
+
+        # Bumped by every change that can affect the result; moves do not count
+        self._changes = 0
+        self._result: Optional[Dict] = None
+        self._result_key = None
+
+        for node_id in graph.nodes:
+            self._add_node(node_id)
+        for key in graph.connections:
+            self._add_connection(key)
+
+    # -------------------------
+    # DELTAS
+    # -------------------------
+    def apply(self, ops: List[Dict]) -> None:
+        """Apply one delta's ops (see GraphModel.take_changes)."""
+        for op in ops:
+            kind = op.get("op")
+            if kind == "node_put":
+                node_id = op["node"].get("nodeId")
+                if node_id in self.rank:
+                    self._check_node(node_id)
+                else:
+                    self._add_node(node_id)
+            elif kind == "node_remove":
+                self._remove_node(op.get("nodeId"))
+            elif kind == "connection_add":
+                self._add_connection(connection_key(op["connection"]))
+            elif kind == "connection_remove":
+                self._remove_connection(connection_key(op["connection"]))
+
+    def _add_node(self, node_id: str) -> None:
+        if node_id is None or node_id not in self.graph.nodes:
+            return
+        self._changes += 1
+        self.rank[node_id] = self._next_rank
+        self._next_rank += 1
+        self._check_node(node_id)
+        # Connections that arrived before this node can join the order now
+        for conn in self.graph.incoming(node_id) + self.graph.outgoing(node_id):
+            key = connection_key(conn)
+            if self.edges.get(key) == _DANGLING:
+                del self.edges[key]
+                self._add_connection(key)
+
+    def _remove_node(self, node_id: str) -> None:
+        self._changes += 1
+        self.rank.pop(node_id, None)
+        self.node_issues.pop(node_id, None)
+        self._node_sigs.pop(node_id, None)
+        # Its connection_remove ops follow; unlink now so no walk reaches it meanwhile
+        for nxt in self.succ.pop(node_id, {}):
+            self.pred.get(nxt, {}).pop(node_id, None)
+        for prv in self.pred.pop(node_id, {}):
+            self.succ.get(prv, {}).pop(node_id, None)
+
+    def _add_connection(self, key: ConnectionKey) -> None:
+        if key not in self.graph.connections or key in self.edges:
+            return
+        self._changes += 1
+        source, _, target, _ = key
+        self._check_ports(key)
+        if source not in self.rank or target not in self.rank:
+            self.edges[key] = _DANGLING
+            return
+        cycle = self._insert_edge(source, target)
+        if cycle is None:
+            self.edges[key] = _ORDERED
+            self.succ[source][target] += 1
+            self.pred[target][source] += 1
+        else:
+            self.edges[key] = _CYCLE
+            self.cycles[key] = cycle
+
+    def _remove_connection(self, key: ConnectionKey) -> None:
+        self._changes += 1
+        state = self.edges.pop(key, None)
+        self.port_issues.pop(key, None)
+        if state == _CYCLE:
+            del self.cycles[key]
+        elif state == _ORDERED:
+            source, _, target, _ = key
+            for index, a, b in ((self.succ, source, target), (self.pred, target, source)):
+                counts = index.get(a)
+                if counts is not None:
+                    counts[b] -= 1
+                    if counts[b] <= 0:
+                        del counts[b]
+            # Removing an edge may have broken a cycle: let those edges retry
+            for cyclic in list(self.cycles):
+                del self.cycles[cyclic]
+                del self.edges[cyclic]
+                self._add_connection(cyclic)
+
+    # -------------------------
+    # TOPOLOGICAL ORDER
+    # -------------------------
+    def _insert_edge(self, source: str, target: str) -> Optional[List[str]]:
+        """
+        Make room for source -> target in the order (Pearce-Kelly).
+
+        Returns None on success, or the nodes of the cycle the edge would close.
+        """
+        if source == target:
+            return [source]
+        lower, upper = self.rank[target], self.rank[source]
+        if lower > upper:
+            return None
+
+        # Nodes reachable from target that sit at or before source
+        forward, parent = [], {target: None}
+        stack = [target]
+        while stack:
+            node = stack.pop()
+            forward.append(node)
+            for nxt in self.succ.get(node, ()):
+                if nxt == source:
+                    path = [source, node]
+                    while parent[path[-1]] is not None:
+                        path.append(parent[path[-1]])
+                    return list(reversed(path[1:])) + [source]
+                if nxt not in parent and self.rank[nxt] <= upper:
+                    parent[nxt] = node
+                    stack.append(nxt)
+
+        # Nodes reaching source that sit at or after target
+        backward, seen = [], {source}
+        stack = [source]
+        while stack:
+            node = stack.pop()
+            backward.append(node)
+            for prv in self.pred.get(node, ()):
+                if prv not in seen and self.rank[prv] >= lower:
+                    seen.add(prv)
+                    stack.append(prv)
+
+        # Reuse the affected slots: everything reaching source, then everything after target
+        backward.sort(key=self.rank.__getitem__)
+        forward.sort(key=self.rank.__getitem__)
+        slots = sorted(self.rank[n] for n in backward + forward)
+        for node, slot in zip(backward + forward, slots):
+            self.rank[node] = slot
+        return None
+
+    def order(self) -> List[str]:
+        return sorted(self.rank, key=self.rank.__getitem__)
+
+    # -------------------------
+    # NODE / PORT CHECKS
+    # -------------------------
+    def _check_node(self, node_id: str) -> None:
+        node = self.graph.nodes.get(node_id)
+        if node is None:
+            return
+        inputs, outputs = node.get("input") or [], node.get("output") or []
+        signature = (node.get("scriptPath"), node.get("archive"), node.get("entryFunction"),
+                     len(inputs), len(outputs))
+        if self._node_sigs.get(node_id) == signature:
+            return
+        ports_changed = self._node_sigs.get(node_id, signature)[3:] != signature[3:]
+        self._node_sigs[node_id] = signature
+        self._changes += 1
+
+        issues = []
+        script_path = node.get("scriptPath")
+        if script_path:
+            template = self.registry.find_script(script_path, node.get("entryFunction"))
+            if template is None:
+                on_disk = node.get("archive") or script_path
+                if not os.path.exists(on_disk):
+                    issues.append({"type": "missing_script", "severity": ERROR, "nodeId": node_id,
+                                   "message": f"Node script not found: {script_path}"})
+            else:
+                dynamic = template.get("dynamic") or {}
+                expected = (len(dynamic.get("inputs") or []), len(dynamic.get("outputs") or []))
+                if expected != (len(inputs), len(outputs)):
+                    issues.append({
+                        "type": "arity_mismatch", "severity": WARNING, "nodeId": node_id,
+                        "message": f"Node has {len(inputs)} inputs / {len(outputs)} outputs, "
+                                   f"its script declares {expected[0]} / {expected[1]}",
+                    })
+        if issues:
+            self.node_issues[node_id] = issues
+        else:
+            self.node_issues.pop(node_id, None)
+
+        if ports_changed:
+            for conn in self.graph.incoming(node_id) + self.graph.outgoing(node_id):
+                self._check_ports(connection_key(conn))
+
+    def _check_ports(self, key: ConnectionKey) -> None:
+        source, source_port, target, target_port = key
+        problems = []
+        for node_id, port, side in ((source, source_port, "output"), (target, target_port, "input")):
+            node = self.graph.nodes.get(node_id)
+            if node is None:
+                problems.append(f"{side} node '{node_id}' does not exist")
+                continue
+            count = len(node.get(side) or [])
+            index = port or 0
+            if not isinstance(index, int) or not 0 <= index < count:
+                problems.append(f"'{node_id}' has no {side} {port} ({count} {side}s)")
+        if problems:
+            self.port_issues[key] = {"type": "port_out_of_range", "severity": ERROR,
+                                     "connection": _key_payload(key), "message": "; ".join(problems)}
+        else:
+            self.port_issues.pop(key, None)
+
+    def _recheck_templates(self) -> None:
+        """The node index changed: template-based checks are stale."""
+        self._node_sigs.clear()
+        for node_id in list(self.rank):
+            self._check_node(node_id)
+        self.registry_version = self.registry.version
+
+    # -------------------------
+    # RESULT
+    # -------------------------
+    def result(self, version: int) -> Dict:
+        """Issues and run order for the graph at version; recomputed only after logic changes."""
+        if self.registry_version != self.registry.version:
+            self._recheck_templates()
+        cache_key = (self._changes, self.registry_version)
+        if self._result is not None and self._result_key == cache_key:
+            if self._result["version"] != version:
+                # Layout-only edits: same findings, newer version
+                self._result = {**self._result, "version": version}
+            return self._result
+
+        issues = []
+        blocked: Dict[str, str] = {}
+        for key, nodes in self.cycles.items():
+            issues.append({"type": "cycle", "severity": ERROR, "connection": _key_payload(key),
+                           "nodes": nodes, "message": "Connection closes a cycle: " + " -> ".join(nodes + nodes[:1])})
+            for node_id in nodes:
+                blocked.setdefault(node_id, "cycle")
+        for node_id, node_issues in self.node_issues.items():
+            issues.extend(node_issues)
+            if any(i["type"] == "missing_script" for i in node_issues):
+                blocked.setdefault(node_id, "missing_script")
+        issues.extend(self.port_issues.values())
+        issues.extend(self._dead_nodes(blocked))
+
+        self._result = {
+            "version": version,
+            "ok": not any(i["severity"] == ERROR for i in issues),
+            "issues": issues,
+            "order": self.order(),
+        }
+        self._result_key = cache_key
+        return self._result
+
+    def _dead_nodes(self, blocked: Dict[str, str]) -> List[Dict]:
+        """Nodes downstream of a cycle or missing script; the engine never reaches them."""
+        dead: Set[str] = set()
+        stack = list(blocked)
+        while stack:
+            node_id = stack.pop()
+            for conn in self.graph.outgoing(node_id):
+                target = conn.get("targetNodeId")
+                if target in self.rank and target not in blocked and target not in dead:
+                    dead.add(target)
+                    stack.append(target)
+        return [{"type": "dead_node", "severity": WARNING, "nodeId": node_id,
+                 "message": "Node can never run: an upstream node is in a cycle or has no script"}
+                for node_id in sorted(dead, key=self.rank.__getitem__)]
+
+
+class GraphAnalyzer:
+    """GraphAnalysis per document, fed by the graph store's change events."""
+
+    def __init__(self, registry: NodeRegistry):
+        self.registry = registry
+        self._lock = threading.Lock()
+        # str(savefile path) -> analysis of the cached document
+        self._analyses: Dict[str, GraphAnalysis] = {}
+
+    def on_graph_change(self, doc: GraphDocument, delta: Optional[dict]) -> None:
+        """GraphStore listener; called under doc.lock."""
+        key = str(doc.path)
+        with self._lock:
+            analysis = self._analyses.get(key)
+        if delta is None or analysis is None or analysis.graph is not doc.graph:
+            self._build(doc)
+        else:
+            analysis.apply(delta.get("ops", []))
+
+    def _build(self, doc: GraphDocument) -> GraphAnalysis:
+        analysis = GraphAnalysis(doc.graph, self.registry)
+        with self._lock:
+            self._analyses[str(doc.path)] = analysis
+        return analysis
+
+    def analyze(self, doc: GraphDocument) -> Dict:
+        """Cached analysis of doc at its current version."""
+        with doc.lock:
+            with self._lock:
+                analysis = self._analyses.get(str(doc.path))
+            if analysis is None or analysis.graph is not doc.graph:
+                analysis = self._build(doc)
+            return analysis.result(doc.version)
+
+
+# Module-level singleton; IndexService subscribes it to the graph store
+graph_analyzer = GraphAnalyzer(node_registry)
@@ -0,0 +1,317 @@
+"""
+Loom Graph Model
+
+Indexed in-memory form of a project's nodes and connections.
+
+Nodes are kept in a dict keyed by nodeId and connections in a dict keyed by
+their endpoints, both in insertion order so the JSON written back keeps the
+original ordering. Every node has incoming and outgoing adjacency keyed by
+port, so lookups, duplicate checks, adds and deletes (including removing a
+node's connections) cost O(1) or O(degree) rather than O(graph).
+
+Between begin() and commit()/rollback() every change is journaled with the
+previous value of what it touched, so a failed batch of edits is undone in
+O(edits). Nodes edited in place must be fetched with edit_node() so their
+old contents are recorded.
+
+Changes are also collected for delta sync and history: take_changes()
+returns the ops since its last call (node puts/removes, connection
+adds/removes) together with the ops that undo them; apply_ops() replays
+either list.
+"""
+
+import copy
+import re
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+NODE_ID_RE = re.compile(r"node_(\d+)")
+
+# (sourceNodeId, sourcePort, targetNodeId, targetPort)
+ConnectionKey = Tuple[Any, Any, Any, Any]
+
+
+def connection_key(conn: Dict) -> ConnectionKey:
+    return (
+        conn.get("sourceNodeId"),
+        conn.get("sourcePort"),
+        conn.get("targetNodeId"),
+        conn.get("targetPort"),
+    )
+
+
+class GraphModel:
+    def __init__(self):
+        self.nodes: Dict[str, Dict] = {}
+        self.connections: Dict[ConnectionKey, Dict] = {}
+        # nodeId -> port -> connection keys
+        self._out: Dict[str, Dict[Any, Set[ConnectionKey]]] = defaultdict(lambda: defaultdict(set))
+        self._in: Dict[str, Dict[Any, Set[ConnectionKey]]] = defaultdict(lambda: defaultdict(set))
+        # Never reused, even after the highest node is deleted
+        self._next_id = 1
+        # (kind, key, previous value or None) while a transaction is open
+        self._journal: Optional[List[Tuple[str, Any, Optional[Dict]]]] = None
+        # Changes not yet taken: touched node IDs (ordered) with their contents
+        # before the first touch (None if new), and connection ops
+        self._touched: Dict[str, Optional[Dict]] = {}
+        self._conn_ops: List[Tuple[str, Dict]] = []
+        self._changes_at_begin: Optional[Tuple[Dict[str, Optional[Dict]], int]] = None
+        # Set by any change beyond node layout (position); cleared by the owner
+        self.logic_changed = False
+
+    # -------------------------
+    # SERIALIZATION
+    # -------------------------
+    @classmethod
+    def from_json(cls, data: Dict) -> "GraphModel":
+        """Build from the savefile schema ({"nodes": [...], "connections": [...]})."""
+        graph = cls()
+        for node in data.get("nodes", []) or []:
+            graph.add_node(node)
+        # Duplicate connections collapse into one
+        for conn in data.get("connections", []) or []:
+            graph.add_connection(conn)
+        graph.take_changes()
+        graph.logic_changed = False
+        return graph
+
+    def to_json(self) -> Dict[str, List[Dict]]:
+        """Nodes and connections in the savefile schema. Items are shared, not copied."""
+        return {
+            "nodes": list(self.nodes.values()),
+            "connections": list(self.connections.values()),
+        }
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    # -------------------------
+    # TRANSACTIONS
+    # -------------------------
+    @property
+    def in_transaction(self) -> bool:
+        return self._journal is not None
+
+    def begin(self) -> None:
+        if self._journal is not None:
+            raise RuntimeError("Graph transaction already open")
+        self._journal = []
+        self._changes_at_begin = (dict(self._touched), len(self._conn_ops))
+
+    def commit(self) -> bool:
+        """Close the transaction; True if anything changed."""
+        changed = bool(self._journal)
+        self._journal = None
+        self._changes_at_begin = None
+        return changed
+
+    def rollback(self) -> None:
+        """Undo every change since begin(). Allocated IDs stay consumed."""
+        journal, self._journal = self._journal or [], None
+        for kind, key, previous in reversed(journal):
+            if kind == "node":
+                if previous is None:
+                    self.nodes.pop(key, None)
+                elif key in self.nodes:
+                    # Restore contents in place; the dict may be referenced elsewhere
+                    node = self.nodes[key]
+                    node.clear()
+                    node.update(previous)
+                else:
+                    self.nodes[key] = previous
+            else:
+                if previous is None:
+                    self.remove_connection(key)
+                else:
+                    self.add_connection(previous)
+
+        if self._changes_at_begin is not None:
+            touched, conn_ops = self._changes_at_begin
+            self._touched = touched
+            del self._conn_ops[conn_ops:]
+            self._changes_at_begin = None
+
+    def _record(self, kind: str, key: Any, previous: Optional[Dict]) -> None:
+        if self._journal is not None:
+            self._journal.append((kind, key, previous))
+
+    # -------------------------
+    # CHANGE TRACKING
+    # -------------------------
+    def take_changes(self) -> Tuple[List[Dict], List[Dict]]:
+        """
+        (ops, undo_ops) for every change since the last call, then forget them.
+
+        Touched nodes come first as their current contents (or a removal),
+        followed by connection adds/removes in the order they happened.
+        undo_ops restore the state before the first change.
+        """
+        ops, undo_nodes, undo_conns = [], [], []
+        for node_id, previous in self._touched.items():
+            node = self.nodes.get(node_id)
+            if node is None:
+                if previous is not None:
+                    ops.append({"op": "node_remove", "nodeId": node_id})
+                    undo_nodes.append({"op": "node_put", "node": previous})
+            else:
+                ops.append({"op": "node_put", "node": copy.deepcopy(node)})
+                if previous is None:
+                    undo_nodes.append({"op": "node_remove", "nodeId": node_id})
+                else:
+                    undo_nodes.append({"op": "node_put", "node": previous})
+        for kind, conn in self._conn_ops:
+            # Recorded as copies, so the op and its undo can share one snapshot
+            ops.append({"op": kind, "connection": dict(conn)})
+            inverse = "connection_remove" if kind == "connection_add" else "connection_add"
+            undo_conns.append({"op": inverse, "connection": dict(conn)})
+        undo_conns.reverse()
+        self._touched = {}
+        self._conn_ops = []
+        return ops, undo_conns + undo_nodes
+
+    def apply_ops(self, ops: List[Dict]) -> None:
+        """Apply ops from take_changes() (or a journal/delta) through the normal paths."""
+        for op in ops:
+            kind = op.get("op")
+            if kind == "node_put":
+                node = copy.deepcopy(op["node"])
+                current = self.edit_node(node.get("nodeId"))
+                if current is None:
+                    self.add_node(node)
+                else:
+                    current.clear()
+                    current.update(node)
+            elif kind == "node_remove":
+                self.remove_node(op.get("nodeId"))
+            elif kind == "connection_add":
+                self.add_connection(dict(op["connection"]))
+            elif kind == "connection_remove":
+                self.remove_connection(connection_key(op["connection"]))
+
+    # -------------------------
+    # NODES
+    # -------------------------
+    def allocate_node_id(self) -> Tuple[str, str]:
+        """Reserve the next sequential node ID, e.g. ("node_5", "pos_5")."""
+        return self.allocate_node_ids(1)[0]
+
+    def allocate_node_ids(self, count: int) -> List[Tuple[str, str]]:
+        """Reserve count consecutive node IDs in one step (e.g. for a paste)."""
+        start = self._next_id
+        self._next_id += count
+        return [(f"node_{num}", f"pos_{num}") for num in range(start, start + count)]
+
+    def get_node(self, node_id: str) -> Optional[Dict]:
+        return self.nodes.get(node_id)
+
+    def edit_node(self, node_id: str, layout_only: bool = False) -> Optional[Dict]:
+        """
+        Like get_node, for callers that mutate the node in place.
+
+        layout_only promises that only layout keys (position) will change.
+        """
+        node = self.nodes.get(node_id)
+        if node is not None:
+            if not layout_only:
+                self.logic_changed = True
+            if self._journal is not None:
+                self._record("node", node_id, copy.deepcopy(node))
+            if node_id not in self._touched:
+                self._touched[node_id] = copy.deepcopy(node)
+        return node
+
+    def has_node(self, node_id: str) -> bool:
+        return node_id in self.nodes
+
+    def add_node(self, node: Dict) -> bool:
+        """Insert a node; False if its nodeId is missing or already taken."""
+        node_id = node.get("nodeId")
+        if node_id is None or node_id in self.nodes:
+            return False
+        self.nodes[node_id] = node
+        self.logic_changed = True
+        self._record("node", node_id, None)
+        self._touched.setdefault(node_id, None)
+        match = NODE_ID_RE.fullmatch(str(node_id))
+        if match:
+            self._next_id = max(self._next_id, int(match.group(1)) + 1)
+        return True
+
+    def remove_node(self, node_id: str) -> Optional[List[Dict]]:
+        """Delete a node and every connection touching it; None if not found."""
+        node = self.nodes.pop(node_id, None)
+        if node is None:
+            return None
+        self._record("node", node_id, node)
+        self.logic_changed = True
+        if node_id not in self._touched:
+            self._touched[node_id] = copy.deepcopy(node)
+        keys = set()
+        for ports in (self._out.pop(node_id, {}), self._in.pop(node_id, {})):
+            for port_keys in ports.values():
+                keys.update(port_keys)
+        return [conn for conn in (self.remove_connection(k) for k in keys) if conn is not None]
+
+    # -------------------------
+    # CONNECTIONS
+    # -------------------------
+    def has_connection(self, key: ConnectionKey) -> bool:
+        return key in self.connections
+
+    def add_connection(self, conn: Dict) -> bool:
+        """Insert a connection; False if the same connection already exists."""
+        key = connection_key(conn)
+        if key in self.connections:
+            return False
+        source_id, source_port, target_id, target_port = key
+        self.connections[key] = conn
+        self.logic_changed = True
+        self._record("connection", key, None)
+        # Copies: the live dict may still be changed by the caller
+        self._conn_ops.append(("connection_add", dict(conn)))
+        self._out[source_id][source_port].add(key)
+        self._in[target_id][target_port].add(key)
+        return True
+
+    def remove_connection(self, key: ConnectionKey) -> Optional[Dict]:
+        conn = self.connections.pop(key, None)
+        if conn is None:
+            return None
+        # Copies: the caller gets the live dict back and may change it
+        self._record("connection", key, dict(conn))
+        self.logic_changed = True
+        self._conn_ops.append(("connection_remove", dict(conn)))
+        source_id, source_port, target_id, target_port = key
+        self._discard(self._out, source_id, source_port, key)
+        self._discard(self._in, target_id, target_port, key)
+        return conn
+
+    @staticmethod
+    def _discard(index, node_id, port, key) -> None:
+        ports = index.get(node_id)
+        if not ports:
+            return
+        port_keys = ports.get(port)
+        if port_keys is None:
+            return
+        port_keys.discard(key)
+        if not port_keys:
+            del ports[port]
+        if not ports:
+            del index[node_id]
+
+    def outgoing(self, node_id: str, port: Any = None) -> List[Dict]:
+        """Connections leaving node_id, optionally only from one port."""
+        return self._lookup(self._out, node_id, port)
+
+    def incoming(self, node_id: str, port: Any = None) -> List[Dict]:
+        """Connections arriving at node_id, optionally only at one port."""
+        return self._lookup(self._in, node_id, port)
+
+    def _lookup(self, index, node_id, port) -> List[Dict]:
+        ports = index.get(node_id)
+        if not ports:
+            return []
+        if port is not None:
+            return [self.connections[k] for k in ports.get(port, ())]
+        return [self.connections[k] for keys in ports.values() for k in keys]
@@ -0,0 +1,542 @@
+"""
+Loom Graph Store
+
+In-memory project graphs with write-behind persistence.
+
+Edit handlers mutate the cached document inside edit(), which holds its
+lock and seals the change as one version before releasing it, so edits
+arriving concurrently from several windows apply in order against the
+same in-memory copy and none is lost. flush()/flush_all() write a fresh
+savefile snapshot, and are called before engine runs and on shutdown. How
+edits reach disk in between depends on the "project_storage" setting:
+
+    journal   (default) each edit is appended to the project's journal.jsonl
+              right away; a single writer thread batches the fsyncs and
+              compacts the journal into a new snapshot once it grows past
+              compact_bytes. Loading replays the journal over the snapshot.
+    snapshot  the writer thread coalesces bursts of edits (e.g. one move per
+              animation frame while dragging) into one atomic
+              temp-file-and-rename write of the whole savefile.
+
+transaction() groups several edits: they either all apply, followed by a
+single write, or are all rolled back.
+
+Each committed edit (or transaction) bumps the document's version and is
+kept as a small delta in a bounded ring, so clients can catch up with
+deltas_since() instead of refetching the whole graph. The version is saved
+in the savefile as graphVersion, so it keeps increasing across restarts.
+Edits also carry the ops that revert them, which back undo()/redo().
+
+Snapshots are split into savefile.json (logic) and layout.json (node
+positions, see project_layout.py); a save only rewrites the parts that
+changed, so dragging nodes never rewrites the logic file.
+
+metrics() reports the write queue (documents and edits waiting for disk),
+how many edits each write absorbed, and flush latency percentiles.
+
+subscribe() registers a listener called with (doc, delta) after every
+committed edit, undo or redo, and with (doc, None) when a document is
+(re)loaded from disk; listeners run on the editing thread under doc.lock.
+"""
+
+import atexit
+import copy
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from collections import deque
+from itertools import islice
+from typing import Callable, Dict, List, Optional
+
+from .dispatch_pool import LatencyStats
+from .graph_model import GraphModel
+from .project_journal import ProjectJournal
+from .project_layout import (
+    COMPACT_NODE_THRESHOLD, atomic_write, dumps, layout_part, layout_path, load_project, logic_part
+)
+from .storage_manager import StorageManager
+
+# Deltas kept per document; older versions get a full snapshot instead
+DELTA_RING_SIZE = 1024
+
+# Undoable edits kept per document
+HISTORY_SIZE = 200
+
+
+def _meta_payload(meta: dict) -> dict:
+    return copy.deepcopy({k: v for k, v in meta.items() if k != "graphVersion"})
+
+
+class GraphDocument:
+    """
+    One project's savefile contents, owned by the backend while cached.
+
+    Nodes and connections live in an indexed GraphModel (graph); every other
+    top-level savefile key (projectId, metadata, ...) stays in meta.
+    """
+
+    def __init__(self, path: Path, data: dict, mtime: Optional[float] = None):
+        self.path = Path(path)
+        self.meta = {k: v for k, v in data.items() if k not in ("nodes", "connections")}
+        self.graph = GraphModel.from_json(data)
+        self.lock = threading.RLock()
+        # Serializes writes so an older snapshot never lands after a newer one
+        self.write_lock = threading.Lock()
+        # Which snapshot file (savefile.json / layout.json) is behind memory
+        self.logic_dirty = False
+        self.layout_dirty = False
+        # mtime of the file as we last read or wrote it; detects outside edits
+        self.mtime = mtime
+        self.journal: Optional[ProjectJournal] = None
+
+        self.version = int(self.meta.get("graphVersion", 0) or 0)
+        self.deltas = deque(maxlen=DELTA_RING_SIZE)
+        # Journal-style records ({"v", "kind", "ops", "undo"}) of undoable edits
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self.redo_stack: List[dict] = []
+        self._meta_before: Optional[dict] = None
+
+    @property
+    def dirty(self) -> bool:
+        return self.logic_dirty or self.layout_dirty
+
+    @dirty.setter
+    def dirty(self, value: bool) -> None:
+        self.logic_dirty = self.layout_dirty = value
+
+    def touch_meta(self) -> None:
+        """Call under lock before editing meta in place."""
+        if self._meta_before is None:
+            self._meta_before = _meta_payload(self.meta)
+
+    def seal(self, kind: str = "edit") -> Optional[dict]:
+        """
+        Turn the changes since the last seal into one versioned delta.
+
+        Call under lock. Appends the record to the journal (if any) and, for
+        ordinary edits, to the undo history. Returns the delta, or None if
+        nothing changed.
+        """
+        ops, undo = self.graph.take_changes()
+        logic = self.graph.logic_changed
+        self.graph.logic_changed = False
+        if self._meta_before is not None:
+            logic = True
+            ops.insert(0, {"op": "meta_put", "meta": _meta_payload(self.meta)})
+            undo.append({"op": "meta_put", "meta": self._meta_before})
+            self._meta_before = None
+        if not ops:
+            return None
+
+        self.layout_dirty = True
+        self.logic_dirty = self.logic_dirty or logic
+        self.version += 1
+        self.meta["graphVersion"] = self.version
+        delta = {"version": self.version, "ops": ops}
+        self.deltas.append(delta)
+
+        record = {"v": self.version, "kind": kind, "ops": ops, "undo": undo}
+        if kind == "edit":
+            self.history.append(record)
+            self.redo_stack.clear()
+        if self.journal is not None:
+            self.journal.append(record)
+        return delta
+
+    def apply_ops(self, ops: List[dict]) -> None:
+        """Apply delta/journal ops; changes are tracked like any other edit."""
+        for op in ops:
+            if op.get("op") == "meta_put":
+                self.touch_meta()
+                self.meta = {**copy.deepcopy(op["meta"]), "graphVersion": self.version}
+            else:
+                self.graph.apply_ops([op])
+
+    def replay(self, records: List[dict]) -> None:
+        """Rebuild state and history from journal records newer than the snapshot."""
+        for record in records:
+            self.apply_ops(record.get("ops", []))
+            kind = record.get("kind", "edit")
+            if kind == "edit":
+                self.history.append(record)
+                self.redo_stack.clear()
+            elif kind == "undo" and self.history:
+                self.redo_stack.append(self.history.pop())
+            elif kind == "redo" and self.redo_stack:
+                self.history.append(self.redo_stack.pop())
+            self.version = record.get("v", self.version)
+            self.deltas.append({"version": self.version, "ops": record.get("ops", [])})
+        self.graph.take_changes()
+        self.graph.logic_changed = False
+        self._meta_before = None
+        self.meta["graphVersion"] = self.version
+
+    def undo(self) -> Optional[dict]:
+        """Revert the latest edit as a new version; call under lock."""
+        if not self.history:
+            return None
+        record = self.history.pop()
+        self.apply_ops(record["undo"])
+        self.redo_stack.append(record)
+        return self.seal("undo")
+
+    def redo(self) -> Optional[dict]:
+        """Re-apply the latest undone edit as a new version; call under lock."""
+        if not self.redo_stack:
+            return None
+        record = self.redo_stack.pop()
+        self.apply_ops(record["ops"])
+        self.history.append(record)
+        return self.seal("redo")
+
+    def deltas_since(self, since: int) -> Optional[List[dict]]:
+        """Deltas after version since, or None if the ring no longer reaches back that far."""
+        if since >= self.version:
+            return []
+        oldest = self.deltas[0]["version"] if self.deltas else self.version + 1
+        if since < oldest - 1:
+            return None
+        # Ring versions are consecutive, so the start index is arithmetic
+        return list(islice(self.deltas, since - (oldest - 1), None))
+
+    def to_json(self) -> dict:
+        """The savefile schema; call under lock. Items are shared, not copied."""
+        return {**self.meta, **self.graph.to_json()}
+
+
+class GraphStore:
+    """
+    Cache of GraphDocuments keyed by savefile path.
+
+    Args:
+        debounce: Snapshot mode; quiet period after the last edit before writing
+        max_delay: Snapshot mode; upper bound between the first unsaved edit
+            and its write, so a continuous drag still gets persisted
+        sync_interval: Journal mode; how long appends may wait for an fsync
+        compact_bytes: Journal mode; journal size that triggers a new snapshot
+    """
+
+    def __init__(self, debounce: float = 0.5, max_delay: float = 2.0,
+                 sync_interval: float = 0.2, compact_bytes: int = 256 * 1024):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.sync_interval = sync_interval
+        self.compact_bytes = compact_bytes
+
+        self._docs: Dict[str, GraphDocument] = {}
+        self._docs_lock = threading.Lock()
+
+        # path -> (first dirty time, write deadline)
+        self._pending: Dict[str, tuple] = {}
+        # path -> edits scheduled since the last write/sync of that document
+        self._queued_edits: Dict[str, int] = {}
+        self._written_edits = 0
+        self._flushes = 0
+        # Per flush kind: time spent writing, and how long the oldest edit waited
+        self.flush_stats = LatencyStats()
+        self._cond = threading.Condition()
+        self._writer: Optional[threading.Thread] = None
+        self._listeners: List[Callable[[GraphDocument, Optional[dict]], None]] = []
+
+    @staticmethod
+    def storage_mode() -> str:
+        try:
+            return StorageManager.get_settings().get("project_storage", "journal")
+        except Exception:
+            return "journal"
+
+    # -------------------------
+    # LOAD
+    # -------------------------
+    def get(self, path: Path) -> Optional[GraphDocument]:
+        """Return the cached document for a savefile, loading it on first use."""
+        path = Path(path)
+        key = str(path)
+
+        with self._docs_lock:
+            doc = self._docs.get(key)
+
+        if doc is not None:
+            # Reload if the file was changed behind our back and we hold no edits
+            try:
+                mtime = path.stat().st_mtime
+            except OSError:
+                mtime = None
+            with doc.lock:
+                if doc.dirty or doc.graph.in_transaction or mtime is None or mtime == doc.mtime:
+                    return doc
+
+        if not path.exists():
+            return None
+
+        try:
+            data, legacy = load_project(path)
+            mtime = path.stat().st_mtime
+        except Exception as e:
+            print(f"[GRAPH STORE] Error loading {path}: {e}")
+            return None
+
+        doc = GraphDocument(path, data, mtime)
+        if legacy:
+            # Positions still inside savefile.json; the next save splits them out
+            doc.dirty = True
+        if self.storage_mode() == "journal":
+            doc.journal = ProjectJournal(path.parent)
+            records = doc.journal.read_since(doc.version)
+            if records:
+                doc.replay(records)
+                doc.dirty = True  # snapshot is behind; the next flush compacts
+                print(f"[GRAPH STORE] Replayed {len(records)} journal records for {path.parent.name}")
+
+        with self._docs_lock:
+            previous = self._docs.get(key)
+            if previous is not None:
+                # Changed on disk: clients must not apply deltas across the reload
+                doc.version = max(doc.version, previous.version + 1)
+                doc.meta["graphVersion"] = doc.version
+                if previous.journal is not None:
+                    previous.journal.close()
+            self._docs[key] = doc
+        self._notify(doc, None)
+        return doc
+
+    def invalidate(self, path: Path) -> None:
+        """Forget a document without writing it (e.g. the project was deleted)."""
+        key = str(Path(path))
+        with self._cond:
+            self._pending.pop(key, None)
+            self._queued_edits.pop(key, None)
+        with self._docs_lock:
+            doc = self._docs.pop(key, None)
+        if doc is not None and doc.journal is not None:
+            doc.journal.close()
+
+    # -------------------------
+    # WRITE-BEHIND
+    # -------------------------
+    def mark_dirty(self, doc: GraphDocument) -> None:
+        """Record the pending changes as one edit and schedule persistence."""
+        with doc.lock:
+            if doc.graph.in_transaction:
+                return  # sealed and scheduled once when the transaction commits
+            delta = doc.seal()
+            if delta is None:
+                return
+            self._notify(doc, delta)
+        self._schedule(doc)
+
+    def undo(self, doc: GraphDocument) -> Optional[dict]:
+        """Revert doc's latest edit; returns the resulting delta or None."""
+        return self._step(doc, doc.undo)
+
+    def redo(self, doc: GraphDocument) -> Optional[dict]:
+        """Re-apply doc's latest undone edit; returns the resulting delta or None."""
+        return self._step(doc, doc.redo)
+
+    def _step(self, doc: GraphDocument, action) -> Optional[dict]:
+        with doc.lock:
+            if doc.graph.in_transaction:
+                return None
+            delta = action()
+            if delta is not None:
+                self._notify(doc, delta)
+        if delta is not None:
+            self._schedule(doc)
+        return delta
+
+    # -------------------------
+    # LISTENERS
+    # -------------------------
+    def subscribe(self, callback: Callable[[GraphDocument, Optional[dict]], None]) -> None:
+        """Call callback(doc, delta) on every committed change, (doc, None) on load."""
+        self._listeners.append(callback)
+
+    def _notify(self, doc: GraphDocument, delta: Optional[dict]) -> None:
+        for callback in list(self._listeners):
+            try:
+                callback(doc, delta)
+            except Exception as e:
+                print(f"[GRAPH STORE] Listener failed for {doc.path.parent.name}: {e}")
+
+    def _schedule(self, doc: GraphDocument) -> None:
+        now = time.monotonic()
+        key = str(doc.path)
+        with self._cond:
+            if doc.journal is not None:
+                # Appends are already written; only the fsync is batched
+                first, deadline = self._pending.get(key, (now, now + self.sync_interval))
+            else:
+                first = self._pending.get(key, (now, None))[0]
+                deadline = min(first + self.max_delay, now + self.debounce)
+            self._pending[key] = (first, deadline)
+            self._queued_edits[key] = self._queued_edits.get(key, 0) + 1
+            self._ensure_writer()
+            self._cond.notify()
+
+    @contextmanager
+    def edit(self, doc: GraphDocument):
+        """Hold doc's lock for one edit and seal it before anyone else can edit."""
+        with doc.lock:
+            yield doc
+            self.mark_dirty(doc)
+
+    @contextmanager
+    def transaction(self, doc: GraphDocument):
+        """
+        Hold doc's lock across several edits and apply them atomically.
+
+        Any exception raised inside the block rolls the graph back to its
+        state at entry and propagates; otherwise one write is scheduled.
+        """
+        with doc.lock:
+            if doc.graph.in_transaction:
+                # Nested: joins the enclosing transaction, which commits or rolls back
+                yield doc
+                return
+            doc.graph.begin()
+            try:
+                yield doc
+            except BaseException:
+                doc.graph.rollback()
+                raise
+            if doc.graph.commit():
+                self.mark_dirty(doc)
+
+    def _ensure_writer(self) -> None:
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._run_writer, name="graph-writer", daemon=True)
+            self._writer.start()
+
+    def _run_writer(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                now = time.monotonic()
+                due = [k for k, (_, deadline) in self._pending.items() if deadline <= now]
+                if not due:
+                    next_deadline = min(d for _, d in self._pending.values())
+                    self._cond.wait(next_deadline - now)
+                    continue
+                due = [(key, self._pending.pop(key)[0]) for key in due]
+
+            for key, first in due:
+                with self._docs_lock:
+                    doc = self._docs.get(key)
+                if doc is None:
+                    continue
+                if doc.journal is None:
+                    self._write(doc, first)
+                    continue
+                started = time.monotonic()
+                try:
+                    doc.journal.sync()
+                except Exception as e:
+                    print(f"[GRAPH STORE] Error syncing journal for {doc.path}: {e}")
+                self._record_flush("journal_sync", key, started, first)
+                if doc.journal.size() >= self.compact_bytes:
+                    self._write(doc, first)
+
+    def _record_flush(self, kind: str, key: str, started: float, first: Optional[float]) -> None:
+        done = time.monotonic()
+        with self._cond:
+            self._written_edits += self._queued_edits.pop(key, 0)
+            self._flushes += 1
+        waited = (started - first) * 1000 if first is not None else 0.0
+        self.flush_stats.record(kind, (done - started) * 1000, waited)
+
+    def metrics(self) -> dict:
+        with self._cond:
+            pending_docs = len(self._pending)
+            queued = sum(self._queued_edits.values())
+            written, flushes = self._written_edits, self._flushes
+        return {
+            "pendingDocuments": pending_docs,
+            "queuedEdits": queued,
+            "flushes": flushes,
+            "editsPerFlush": round(written / flushes, 2) if flushes else 0.0,
+            "flushLatency": self.flush_stats.snapshot(),
+        }
+
+    def _write(self, doc: GraphDocument, first: Optional[float] = None) -> bool:
+        """
+        Atomically write the snapshot files that are behind; compacts the journal.
+
+        A layout-only change rewrites layout.json and leaves savefile.json alone.
+        first is when the oldest unwritten edit was scheduled, for metrics.
+        """
+        with doc.write_lock:
+            with doc.lock:
+                if not doc.dirty:
+                    return True
+                write_logic, write_layout = doc.logic_dirty, doc.layout_dirty
+                data = doc.to_json()
+                compact = len(doc.graph) >= COMPACT_NODE_THRESHOLD
+                logic_text = dumps(logic_part(data), compact) if write_logic else None
+                layout_text = dumps(layout_part(data), compact) if write_layout else None
+                version = doc.version
+                doc.dirty = False
+
+            started = time.monotonic()
+            # The journal is about to be cut; the snapshot must be durable first
+            durable = doc.journal is not None
+            try:
+                if layout_text is not None:
+                    atomic_write(layout_path(doc.path), layout_text, durable)
+                    write_layout = False
+                if logic_text is not None:
+                    atomic_write(doc.path, logic_text, durable)
+                    write_logic = False
+                    with doc.lock:
+                        doc.mtime = doc.path.stat().st_mtime
+                if doc.journal is not None:
+                    doc.journal.truncate_through(version)
+                self._record_flush("compact" if durable else "snapshot", str(doc.path), started, first)
+                return True
+            except Exception as e:
+                print(f"[GRAPH STORE] Error saving {doc.path}: {e}")
+                with doc.lock:
+                    doc.logic_dirty = doc.logic_dirty or write_logic
+                    doc.layout_dirty = doc.layout_dirty or write_layout
+                # The caller already took it off the queue; without this the
+                # edits would wait in memory for the next edit or exit
+                self._retry(doc, first)
+                return False
+
+    def _retry(self, doc: GraphDocument, first: Optional[float]) -> None:
+        """Queue a failed write again after one debounce, keeping its first-edit time."""
+        now = time.monotonic()
+        key = str(doc.path)
+        with self._cond:
+            if key in self._pending:
+                return  # a newer edit already rescheduled it
+            self._pending[key] = (first if first is not None else now, now + self.debounce)
+            self._ensure_writer()
+            self._cond.notify()
+
+    def flush(self, path: Path) -> bool:
+        """Bring one savefile up to date now if it has pending edits."""
+        key = str(Path(path))
+        with self._cond:
+            first = self._pending.pop(key, (None,))[0]
+        with self._docs_lock:
+            doc = self._docs.get(key)
+        return self._write(doc, first) if doc is not None else True
+
+    def flush_all(self) -> bool:
+        """Bring every savefile up to date (before engine runs / shutdown)."""
+        with self._cond:
+            firsts = {key: first for key, (first, _) in self._pending.items()}
+            self._pending.clear()
+        with self._docs_lock:
+            docs = list(self._docs.values())
+        ok = True
+        for doc in docs:
+            ok = self._write(doc, firsts.get(str(doc.path))) and ok
+        return ok
+
+
+# Module-level singleton shared by handlers, ProjectManager and ExecutionManager
+graph_store = GraphStore()
+atexit.register(graph_store.flush_all)
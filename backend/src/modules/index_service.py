@@ -1,84 +1,77 @@
-import json
+import asyncio
 from pathlib import Path
-from .node_parser import NodeParser  # FIXED IMPORT
+from .node_indexer import NodeIndexer, NodeBankWatcher
+from .graph_analysis import graph_analyzer
+from .graph_store import graph_store
+from .project_catalog import project_catalog
+from .node_registry import node_registry
+from .node_usage import node_usage
+from .spatial_index import spatial_indexes
 
 class IndexService:
     def __init__(self, project_base: Path, node_bank_path: Path, signal_hub):
         self.project_base = Path(project_base)
         self.node_bank_path = Path(node_bank_path)
 
-        self.project_index_path = self.project_base / "projectindex.json"
         self.node_index_path = self.node_bank_path / "nodeindex.json"
+        self.node_indexer = NodeIndexer(self.node_bank_path, self.node_index_path)
+        self.watcher = NodeBankWatcher(self.node_indexer, self._refresh_nodes_sync)
+        self.signal_hub = signal_hub
+        self._nodes_indexed = False
+
+        # Keep the script -> (project, nodeIds) index, graph checks and the
+        # viewport grid in step with edits
+        graph_store.subscribe(node_usage.on_graph_change)
+        graph_store.subscribe(graph_analyzer.on_graph_change)
+        graph_store.subscribe(spatial_indexes.on_graph_change)
 
         # 🔥 register listeners ONCE at startup
         signal_hub.on_async("hot_reload_all", self.hot_reload_all)
         signal_hub.on_async("project_hot_reload", self.refresh_projects)
         signal_hub.on_async("node_hot_reload", self.refresh_nodes)
+        signal_hub.on("node_index_update_required", lambda _p=None: self._refresh_nodes_sync())
+
+    def start_watching(self):
+        """Refresh the node index whenever a nodebank file changes on disk."""
+        self.watcher.start()
 
     # -------------------------
     # HOT RELOAD
     # -------------------------
     async def hot_reload_all(self, _payload=None):
         print("[INDEX] 🔥 Hot reload ALL")
-        await self.refresh_projects()
+        # The catalog is kept current by ProjectManager; only build it if new
+        await asyncio.to_thread(project_catalog.ensure_built, self.project_base)
         await self.refresh_nodes()
 
     # -------------------------
-    # PROJECT INDEX
+    # PROJECT CATALOG
     # -------------------------
     async def refresh_projects(self, _payload=None):
+        """Rebuild the catalog from every savefile (on demand only)."""
         print("[INDEX] Reloading projects...")
-        index = []
-
-        if not self.project_base.exists():
-            return
-
-        for folder in self.project_base.iterdir():
-            if not folder.is_dir():
-                continue
-
-            savefile = folder / "savefile.json"
-            if not savefile.exists():
-                continue
-
-            try:
-                with open(savefile, "r", encoding="utf-8-sig") as f:
-                    data = json.load(f)
-                    index.append({
-                        "projectId": data.get("projectId"),
-                        "projectName": data.get("projectName"),
-                        "lastModified": data.get("metadata", {}).get("lastModified", ""),
-                        "projectPath": str(savefile)
-                    })
-            except Exception as e:
-                print(f"[INDEX ERROR] {folder.name}: {e}")
-
-        with open(self.project_index_path, "w", encoding="utf-8") as f:
-            json.dump(index, f, indent=4)
-
-        print(f"[INDEX] Projects indexed")
-
-        #print(f"[INDEX] Projects indexed: {len(index)}")
+        count = await asyncio.to_thread(project_catalog.rebuild, self.project_base)
+        print(f"[INDEX] Projects indexed: {count}")
 
     # -------------------------
     # NODE INDEX
     # -------------------------
     async def refresh_nodes(self, _payload=None):
-        print("[INDEX] Reloading nodes...")
-        all_nodes = []
-
-        for folder_name in ("builtin", "custom"):
-            folder_path = self.node_bank_path / folder_name
-            if not folder_path.exists():
-                continue
-
-            for py_file in folder_path.glob("*.py"):
-                try:
-                    all_nodes.extend(NodeParser.parse_python_file(py_file))
-                except Exception as e:
-                    print(f"[NODE ERROR] {py_file.name}: {e}")
-
-        with open(self.node_index_path, "w", encoding="utf-8") as f:
-            json.dump(all_nodes, f, indent=4)
-        print(f"[INDEX] Projects indexed")
-        #print(f"[INDEX] Nodes indexed: {len(all_nodes)}")
+        # Stat/hash/parse work stays off the event loop
+        await asyncio.to_thread(self._refresh_nodes_sync)
+
+    def _refresh_nodes_sync(self):
+        nodes, parsed = self.node_indexer.refresh()
+        if parsed or not node_registry.loaded or nodes != node_registry.all():
+            node_registry.replace(nodes)
+        print(f"[INDEX] Nodes indexed: {len(nodes)} ({parsed} files re-parsed)")
+
+        changed = self.node_indexer.changed_paths
+        first_refresh, self._nodes_indexed = not self._nodes_indexed, True
+        # Nothing compiled in this process predates the first refresh
+        if changed and not first_refresh:
+            # Only the projects running a changed script need re-validating
+            affected = node_usage.affected_by(changed)
+            if affected:
+                print(f"[INDEX] Changed node scripts affect {len(affected)} project(s)")
+                self.signal_hub.emit("node_scripts_changed", {"scripts": changed, "projects": affected})
@@ -2,20 +2,29 @@
 Loom Log Manager
 
 Manages execution logs for displaying in the frontend UI.
-Logs are stored per-project in logs.json files.
+Logs are stored per-project in a segmented LogStore ({project}/logs/):
+rotating append-only JSON Lines segments with a sparse timestamp index,
+older segments gzip-compressed. See log_store.py.
 """
 
 import json
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+
+from .log_store import LogStore, entry_timestamp, normalize_timestamp
+
+LOG_DIR_NAME = "logs"
+# Pre-segment formats, still readable for old projects
+LOG_FILE_NAME = "logs.jsonl"
+LEGACY_LOG_FILE_NAME = "logs.json"
 
 
 class LogManager:
     """
     Manages execution logs for frontend display.
     
-    Logs are stored per-project in {project}/logs.json and cleared on each execution start.
+    Logs are stored per-project in {project}/logs/ and cleared on each execution start.
     """
     
     def __init__(self, project_base_path: Path):
@@ -27,39 +36,78 @@ class LogManager:
         """
         self.project_base_path = Path(project_base_path)
         self.state_file = self.project_base_path / "state.json"
+        self._stores: Dict[str, LogStore] = {}
     
-    def _get_project_name(self, project_id: str) -> Optional[str]:
-        """
-        Get project name from state.json.
-        
-        Args:
-            project_id: Project ID
-            
-        Returns:
-            Project name or None if not found
-        """
+    def _get_active_project(self) -> Optional[Dict]:
+        """Read the active project from state.json."""
         if not self.state_file.exists():
             return None
         
         try:
-            with open(self.state_file, "r", encoding="utf-8") as f:
-                state = json.load(f)
-                # Check if this is the active project
-                if state.get("projectId") == project_id:
-                    return state.get("projectName")
+            with open(self.state_file, "r", encoding="utf-8-sig") as f:
+                return json.load(f)
         except:
-            pass
+            return None
+    
+    def _get_project_folder(self, project_id: Optional[str] = None) -> Optional[Path]:
+        """
+        Get the folder of a project. Only the active project is resolvable;
+        project_id=None means the active one.
+        """
+        state = self._get_active_project()
+        if not state or not state.get("projectId"):
+            return None
+        if project_id and state.get("projectId") != project_id:
+            return None
         
-        return None
+        if state.get("projectPath"):
+            folder = Path(state["projectPath"]).parent
+        elif state.get("projectName"):
+            folder = self.project_base_path / state["projectName"]
+        else:
+            return None
+        return folder if folder.exists() else None
     
-    def _get_log_file(self, project_id: str) -> Optional[Path]:
-        """Get path to log file for a project."""
-        project_name = self._get_project_name(project_id)
-        if project_name:
-            project_folder = self.project_base_path / project_name
-            if project_folder.exists():
-                return project_folder / "logs.json"
-        return None
+    def get_store(self, project_id: Optional[str] = None) -> Optional[LogStore]:
+        """Get (and cache) the log store for a project."""
+        folder = self._get_project_folder(project_id)
+        if not folder:
+            return None
+        key = str(folder)
+        if key not in self._stores:
+            self._stores[key] = LogStore(folder / LOG_DIR_NAME)
+        return self._stores[key]
+
+    @staticmethod
+    def read_log_file(log_file: Path) -> List[Dict]:
+        """
+        Read a JSON Lines log file into the array shape the frontend expects.
+
+        Falls back to a legacy logs.json array in the same folder. A torn
+        last line (engine flush in progress) is skipped.
+        """
+        log_file = Path(log_file)
+        if not log_file.exists():
+            legacy = log_file.with_name(LEGACY_LOG_FILE_NAME)
+            if legacy.exists():
+                try:
+                    with open(legacy, "r", encoding="utf-8") as f:
+                        return json.load(f)
+                except Exception:
+                    return []
+            return []
+
+        logs = []
+        with open(log_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    logs.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return logs
     
     def clear_logs(self, project_id: str) -> None:
         """
@@ -68,11 +116,16 @@ class LogManager:
         Args:
             project_id: Project ID
         """
-        log_file = self._get_log_file(project_id)
-        if log_file:
+        store = self.get_store(project_id)
+        if store:
             try:
-                log_file.write_text("[]", encoding="utf-8")
-                #print(f"[LogManager] Cleared logs: {log_file}")
+                store.clear()
+                folder = store.log_dir.parent
+                for name in (LOG_FILE_NAME, LEGACY_LOG_FILE_NAME):
+                    legacy = folder / name
+                    if legacy.exists():
+                        legacy.unlink()
+                #print(f"[LogManager] Cleared logs: {store.log_dir}")
                 print("")
             except Exception as e:
                 print(f"[LogManager ERROR] Failed to clear logs: {e}")
@@ -88,53 +141,74 @@ class LogManager:
             message: Log message
             level: Log level (info, warning, error)
         """
-        log_file = self._get_log_file(project_id)
-        if not log_file:
+        store = self.get_store(project_id)
+        if not store:
             print(f"[LogManager WARNING] Could not find log file for project {project_id}")
             return
         
-        # Load existing logs
-        logs = []
-        if log_file.exists():
-            try:
-                with open(log_file, "r", encoding="utf-8") as f:
-                    logs = json.load(f)
-            except:
-                logs = []
-        
-        # Add new log entry
+        # Same shape and timestamp format as the engine's node logger
         log_entry = {
-            "time": datetime.now(timezone.utc).isoformat(),
-            "msg": message,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="microseconds").replace("+00:00", "Z"),
+            "message": message,
             "level": level
         }
         
-        logs.append(log_entry)
-        
-        # Save logs
         try:
-            with open(log_file, "w", encoding="utf-8") as f:
-                json.dump(logs, f, indent=2)
+            store.append(log_entry)
         except Exception as e:
             print(f"[LogManager ERROR] Failed to save logs: {e}")
     
-    def get_logs(self, project_id: str) -> List[Dict]:
+    def get_logs(self, project_id: Optional[str] = None, since: Optional[str] = None,
+                 limit: Optional[int] = None, level: Optional[str] = None,
+                 node_id: Optional[str] = None) -> List[Dict]:
         """
-        Get all logs for the specified project.
+        Get logs for the specified project (default: the active one).
         
         Args:
             project_id: Project ID
+            since: ISO timestamp; only entries strictly after it
+            limit: Max entries (first after `since`, or the most recent without it)
+            level: Only entries with this level
+            node_id: Only entries from this node
             
         Returns:
-            List of log entries
+            List of log entries, oldest first
         """
-        log_file = self._get_log_file(project_id)
-        if not log_file or not log_file.exists():
-            return []
+        return self.get_logs_page(project_id, since=since, limit=limit, level=level, node_id=node_id)[0]
+
+    def get_logs_page(self, project_id: Optional[str] = None, cursor: Optional[str] = None,
+                      since: Optional[str] = None, limit: Optional[int] = None,
+                      level: Optional[str] = None, node_id: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Like get_logs, plus a cursor for polling.
+
+        Args:
+            cursor: From the previous page; continue right after it
+
+        Returns:
+            (log entries oldest first, cursor for the next call). Old
+            whole-file logs have no cursor; poll those with `since`.
+        """
+        store = self.get_store(project_id)
+        if not store:
+            return [], None
         
         try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                return json.load(f)
+            if store.exists():
+                return store.query_page(cursor=cursor, since=since, limit=limit, level=level, node_id=node_id)
+            
+            # Old project: whole-file formats, filtered in memory
+            since = normalize_timestamp(since) if since else None
+            logs = self.read_log_file(store.log_dir.parent / LOG_FILE_NAME)
+            logs = [
+                e for e in logs
+                if (since is None or entry_timestamp(e) > since)
+                and (level is None or e.get("level") == level)
+                and (node_id is None or e.get("nodeId") == node_id)
+            ]
+            if limit is not None:
+                logs = logs[:limit] if since is not None else logs[-limit:]
+            return logs, None
         except Exception as e:
             print(f"[LogManager ERROR] Failed to load logs: {e}")
-            return []
+            return [], None
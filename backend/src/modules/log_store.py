@@ -0,0 +1,347 @@
+"""
+Loom Log Store
+
+Segmented, append-only execution log storage.
+
+Layout ({project}/logs/):
+    seg_000001.jsonl.gz   closed segment, gzip-compressed
+    seg_000001.idx        sparse index: one [timestamp, byte offset] per N entries
+    seg_000002.jsonl      active segment, JSON Lines
+    seg_000002.idx
+
+Queries seek through the sparse index instead of loading whole files, so
+polling costs roughly the number of new lines. Pollers page with the
+cursor query_page() returns: the segment and byte offset just past the
+last entry read, plus that entry's timestamp to detect a cleared store.
+Timestamps are compared in one fixed-width form (normalize_timestamp).
+"""
+
+import bisect
+import gzip
+import json
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Iterator
+
+SEGMENT_RE = re.compile(r"^seg_(\d{6})\.jsonl(\.gz)?$")
+
+
+def normalize_timestamp(ts: str) -> str:
+    """
+    UTC ISO timestamp in fixed-width form (microseconds, 'Z'), so timestamps
+    order correctly as strings. isoformat() drops a zero fraction, and older
+    entries use '+00:00' or no suffix.
+    """
+    if not ts:
+        return ""
+    if ts.endswith("Z"):
+        ts = ts[:-1]
+    elif ts.endswith("+00:00"):
+        ts = ts[:-6]
+    head, _, fraction = ts.partition(".")
+    return f"{head}.{fraction[:6].ljust(6, '0')}Z"
+
+
+def entry_timestamp(entry: Dict) -> str:
+    """Sort key for an entry; node logger writes 'timestamp', older entries 'time'."""
+    return normalize_timestamp(entry.get("timestamp") or entry.get("time") or "")
+
+
+def _make_cursor(num: int, offset: int, timestamp: str) -> str:
+    return f"{num}:{offset}:{timestamp}"
+
+
+def _parse_cursor(cursor: str) -> Optional[Tuple[int, int, str]]:
+    try:
+        num, offset, timestamp = cursor.split(":", 2)
+        return int(num), int(offset), timestamp
+    except (AttributeError, ValueError):
+        return None
+
+
+class LogStore:
+    """
+    Rotating segment store for one project's logs.
+
+    Writers and readers may live in different processes (engine writes,
+    backend reads); everything a reader needs is on disk.
+    """
+
+    def __init__(self, log_dir: Path, max_segment_bytes: int = 1024 * 1024, index_every: int = 64):
+        self.log_dir = Path(log_dir)
+        self.max_segment_bytes = max_segment_bytes
+        self.index_every = index_every
+
+        self._lock = threading.Lock()
+        self._since_index = 0
+        # (segment, end offset) after this process's last append
+        self._last_write: Optional[Tuple[int, int]] = None
+        # idx path -> ((size, mtime, inode), [timestamps], [offsets]); reader-side cache
+        self._index_cache: Dict[str, Tuple[Tuple[int, int, int], List[str], List[int]]] = {}
+
+    # -------------------------
+    # PATHS
+    # -------------------------
+    def _segment_path(self, num: int, compressed: bool = False) -> Path:
+        return self.log_dir / f"seg_{num:06d}.jsonl{'.gz' if compressed else ''}"
+
+    def _index_path(self, num: int) -> Path:
+        return self.log_dir / f"seg_{num:06d}.idx"
+
+    def _segments(self) -> List[Tuple[int, Path]]:
+        """All segments, oldest first. A segment mid-compression is listed once."""
+        if not self.log_dir.exists():
+            return []
+        found: Dict[int, Path] = {}
+        for name in os.listdir(self.log_dir):
+            m = SEGMENT_RE.match(name)
+            if not m:
+                continue
+            num = int(m.group(1))
+            # Prefer the plain file while its .gz is still being written
+            if num not in found or not m.group(2):
+                found[num] = self.log_dir / name
+        return sorted(found.items())
+
+    def exists(self) -> bool:
+        return bool(self._segments())
+
+    # -------------------------
+    # WRITE
+    # -------------------------
+    def _active_segment(self) -> int:
+        """
+        Segment to append to. Read from disk on every append, so a clear() or
+        rotation by the other process (engine vs backend) is never missed.
+        """
+        segments = self._segments()
+        if not segments:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+            return 1
+        num, path = segments[-1]
+        if path.name.endswith(".gz"):
+            return num + 1
+        try:
+            full = path.stat().st_size >= self.max_segment_bytes
+        except OSError:
+            full = True  # compressed since listing
+        # A full plain segment is rotated and waiting for compression
+        return num + 1 if full else num
+
+    def append(self, entry: Dict) -> None:
+        self.append_many([entry])
+
+    def append_many(self, entries: List[Dict]) -> None:
+        if not entries:
+            return
+        with self._lock:
+            num = self._active_segment()
+            seg_path = self._segment_path(num)
+
+            index_records = []
+            chunks = []
+            with open(seg_path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                if self._last_write != (num, offset):
+                    # Someone else wrote or rotated since; index the next entry
+                    self._since_index = self.index_every
+                for entry in entries:
+                    line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+                    if self._since_index >= self.index_every or offset == 0:
+                        index_records.append(json.dumps([entry_timestamp(entry), offset]))
+                        self._since_index = 0
+                    chunks.append(line)
+                    offset += len(line)
+                    self._since_index += 1
+                f.write(b"".join(chunks))
+            self._last_write = (num, offset)
+
+            if index_records:
+                with open(self._index_path(num), "a", encoding="utf-8") as f:
+                    f.write("\n".join(index_records) + "\n")
+
+            if offset >= self.max_segment_bytes:
+                self._rotate(num)
+
+    def _rotate(self, num: int) -> None:
+        threading.Thread(target=self._compress, args=(num,), daemon=True).start()
+
+    def _compress(self, num: int) -> None:
+        src = self._segment_path(num)
+        dst = self._segment_path(num, compressed=True)
+        tmp = dst.with_name(dst.name + ".tmp")
+        try:
+            with open(src, "rb") as fin, gzip.open(tmp, "wb", compresslevel=6) as fout:
+                shutil.copyfileobj(fin, fout)
+            os.replace(tmp, dst)
+            src.unlink()
+        except Exception as e:
+            print(f"[LogStore ERROR] Failed to compress {src.name}: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            if self.log_dir.exists():
+                shutil.rmtree(self.log_dir, ignore_errors=True)
+            self._last_write = None
+            self._index_cache.clear()
+
+    # -------------------------
+    # READ
+    # -------------------------
+    def _load_index(self, num: int) -> Tuple[List[str], List[int]]:
+        idx_path = self._index_path(num)
+        try:
+            st = idx_path.stat()
+        except OSError:
+            return [], []
+        # Size alone can match again after the other process clears and rewrites
+        signature = (st.st_size, st.st_mtime_ns, st.st_ino)
+        cached = self._index_cache.get(str(idx_path))
+        if cached and cached[0] == signature:
+            return cached[1], cached[2]
+
+        stamps, offsets = [], []
+        with open(idx_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    ts, off = json.loads(line)
+                except (ValueError, TypeError):
+                    continue  # torn write
+                stamps.append(normalize_timestamp(ts))
+                offsets.append(off)
+        self._index_cache[str(idx_path)] = (signature, stamps, offsets)
+        return stamps, offsets
+
+    def _iter_segment(self, path: Path, offset: int = 0) -> Iterator[Tuple[Dict, int]]:
+        """(entry, offset just past its line) from offset on."""
+        opener = gzip.open if path.name.endswith(".gz") else open
+        try:
+            with opener(path, "rb") as f:
+                if offset:
+                    f.seek(offset)
+                position = offset
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break  # torn last line, writer still flushing
+                    position += len(raw)
+                    try:
+                        yield json.loads(raw), position
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            # Compressed between listing and opening; retry the .gz copy
+            m = SEGMENT_RE.match(path.name)
+            if m and not m.group(2):
+                yield from self._iter_segment(self._segment_path(int(m.group(1)), compressed=True), offset)
+
+    def _cursor_valid(self, num: int, offset: int, timestamp: str) -> bool:
+        """False once the segment was cleared and rewritten under the cursor."""
+        stamps, _ = self._load_index(num)
+        if stamps and stamps[0] > timestamp:
+            return False  # segment now starts after the cursor's entry
+        if offset == 0:
+            return True
+        for path in (self._segment_path(num), self._segment_path(num, compressed=True)):
+            opener = gzip.open if path.name.endswith(".gz") else open
+            try:
+                with opener(path, "rb") as f:
+                    f.seek(offset - 1)
+                    return f.read(1) == b"\n"
+            except FileNotFoundError:
+                continue
+            except (OSError, EOFError):
+                return False
+        return False
+
+    def query(self, since: Optional[str] = None, limit: Optional[int] = None,
+              level: Optional[str] = None, node_id: Optional[str] = None) -> List[Dict]:
+        """Entries only; see query_page."""
+        return self.query_page(since=since, limit=limit, level=level, node_id=node_id)[0]
+
+    def query_page(self, cursor: Optional[str] = None, since: Optional[str] = None,
+                   limit: Optional[int] = None, level: Optional[str] = None,
+                   node_id: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Return (entries matching all given filters oldest first, next cursor).
+
+        cursor:  from a previous call; continue right after the last entry it
+                 read. Exact even when entries share a timestamp. A cursor
+                 into a cleared store falls back to its timestamp as `since`
+        since:   only entries with a timestamp strictly after this ISO string;
+                 seeks via the sparse index to skip everything older
+        limit:   after cursor/since, the first `limit` matches; without,
+                 the most recent `limit` matches
+        level:   exact level match (info, warning, error)
+        node_id: exact nodeId match
+
+        The next cursor points past the last entry read (matching or not), or
+        is the given cursor when nothing new was read.
+        """
+        segments = self._segments()
+        live = {str(self._index_path(num)) for num, _ in segments}
+        for stale in [key for key in self._index_cache if key not in live]:
+            del self._index_cache[stale]
+        if not segments:
+            return [], cursor
+
+        position = _parse_cursor(cursor) if cursor else None
+        if position is not None and not self._cursor_valid(*position):
+            since, position, cursor = position[2], None, None
+        since = normalize_timestamp(since) if since else None
+
+        def matches(entry):
+            if since is not None and entry_timestamp(entry) <= since:
+                return False
+            if level is not None and entry.get("level") != level:
+                return False
+            if node_id is not None and entry.get("nodeId") != node_id:
+                return False
+            return True
+
+        if position is None and since is None and limit is not None:
+            # Tail: walk segments newest-first until enough matches are found
+            tail: List[Dict] = []
+            next_cursor = None
+            for num, path in reversed(segments):
+                hits = []
+                for entry, end in self._iter_segment(path):
+                    if next_cursor is None or num == next_cursor[0]:
+                        next_cursor = (num, end, entry_timestamp(entry))
+                    if matches(entry):
+                        hits.append(entry)
+                tail = hits + tail
+                if len(tail) >= limit:
+                    break
+            return (tail[-limit:] if limit else []), (_make_cursor(*next_cursor) if next_cursor else None)
+
+        start, offset = 0, 0
+        if position is not None:
+            num, offset, _ = position
+            start = next((i for i, (n, _) in enumerate(segments) if n >= num), len(segments))
+            if start < len(segments) and segments[start][0] != num:
+                offset = 0  # cursor's segment is gone; the next one is all new
+        elif since is not None:
+            # Newest segment whose first indexed timestamp is <= since;
+            # polling callers hit the last segment straight away
+            for i in range(len(segments) - 1, -1, -1):
+                stamps, _ = self._load_index(segments[i][0])
+                if stamps and stamps[0] <= since:
+                    start = i
+                    break
+            stamps, offsets = self._load_index(segments[start][0])
+            pos = bisect.bisect_right(stamps, since) - 1
+            if pos >= 0:
+                offset = offsets[pos]
+
+        results: List[Dict] = []
+        for i, (num, path) in enumerate(segments[start:]):
+            for entry, end in self._iter_segment(path, offset if i == 0 else 0):
+                cursor = _make_cursor(num, end, entry_timestamp(entry))
+                if matches(entry):
+                    results.append(entry)
+                    if limit is not None and len(results) >= limit:
+                        return results, cursor
+        return results, cursor
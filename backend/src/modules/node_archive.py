@@ -0,0 +1,82 @@
+"""
+Loom Node Archives
+
+A node library packaged as one .zip file, dropped into nodebank/builtin or
+nodebank/custom next to loose .py files.
+
+The archive holds the node scripts and a manifest.json listing their node
+templates, written by pack(). Indexing an archive is one open and one
+member read; archives without a manifest still work, with every script
+parsed from memory. Templates from an archive carry "archive" (the .zip
+path) and "archiveMember" (the script inside it), and the engine imports
+them through zipimport instead of one file per node.
+"""
+
+import io
+import json
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional
+
+from .node_parser import NodeParser
+
+ARCHIVE_SUFFIX = ".zip"
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _with_location(template: Dict, archive: Path, member: str) -> Dict:
+    template = dict(template)
+    template["archive"] = str(archive)
+    template["archiveMember"] = member
+    # Display/debug path; the loader goes through archive + archiveMember
+    template["scriptPath"] = f"{archive}/{member}"
+    return template
+
+
+def read_archive(archive_path: Path, data: Optional[bytes] = None) -> List[Dict]:
+    """Node templates of an archive (already read into data, if given), from its manifest when it has one."""
+    archive_path = Path(archive_path)
+    source = archive_path if data is None else io.BytesIO(data)
+    with zipfile.ZipFile(source) as archive:
+        names = archive.namelist()
+        if MANIFEST_NAME in names:
+            manifest = json.loads(archive.read(MANIFEST_NAME).decode("utf-8"))
+            if manifest.get("version") == MANIFEST_VERSION:
+                return [_with_location(t, archive_path, t["archiveMember"]) for t in manifest.get("nodes", [])]
+            print(f"[NODE ARCHIVE] {archive_path.name}: unsupported manifest, parsing scripts")
+
+        templates = []
+        for member in sorted(n for n in names if n.endswith(".py")):
+            try:
+                source_text = archive.read(member).decode("utf-8")
+            except UnicodeDecodeError as e:
+                print(f"[NODE ERROR] {archive_path.name}/{member}: {e}")
+                continue
+            for template in NodeParser.parse_source(source_text, PurePosixPath(member)):
+                templates.append(_with_location(template, archive_path, member))
+        return templates
+
+
+def pack(folder: Path, archive_path: Path) -> int:
+    """
+    Zip every .py file under folder into archive_path with a manifest.
+
+    Returns the number of node templates in the manifest.
+    """
+    folder = Path(folder)
+    archive_path = Path(archive_path)
+    nodes = []
+    tmp = archive_path.with_name(archive_path.name + ".tmp")
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for script in sorted(folder.rglob("*.py")):
+            member = script.relative_to(folder).as_posix()
+            source = script.read_text(encoding="utf-8")
+            archive.writestr(member, source)
+            for template in NodeParser.parse_source(source, PurePosixPath(member)):
+                template["archiveMember"] = member
+                template.pop("scriptPath", None)
+                nodes.append(template)
+        archive.writestr(MANIFEST_NAME, json.dumps({"version": MANIFEST_VERSION, "nodes": nodes}))
+    tmp.replace(archive_path)
+    return len(nodes)
@@ -0,0 +1,244 @@
+"""
+Loom Node Indexer
+
+Builds nodebank/nodeindex.json incrementally.
+
+Every indexed .py file is remembered in nodeindex.cache.json by path with
+its fingerprint (mtime, size, content hash) and the node templates parsed
+from it. A refresh stats each file and only reads files whose mtime or size
+moved; only files whose hash changed are parsed again. Large batches of
+changed files are parsed across a thread pool. So a refresh costs
+O(changed files) parses, and nodeindex.json is rewritten only when the
+templates actually changed. A .zip node archive (node_archive.py) counts as
+one file whose templates come from its manifest.
+
+NodeBankWatcher polls the bank folders and triggers a refresh when a file
+is added, removed or modified.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .node_archive import ARCHIVE_SUFFIX, read_archive
+from .node_parser import NodeParser
+
+CACHE_FILE_NAME = "nodeindex.cache.json"
+NODE_FOLDERS = ("builtin", "custom")
+
+# Changed files needed before parsing moves to a thread pool
+PARALLEL_THRESHOLD = 64
+
+# Bump when NodeParser output changes so every cached entry is re-parsed
+CACHE_VERSION = 3
+
+
+def _hash(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _parse_file(path_str: str) -> Tuple[str, Optional[str], List[Dict]]:
+    """(path, content hash, templates); runs in pool threads."""
+    path = Path(path_str)
+    try:
+        data = path.read_bytes()
+    except OSError as e:
+        print(f"[NODE ERROR] {path.name}: {e}")
+        return path_str, None, []
+    if path.suffix == ARCHIVE_SUFFIX:
+        try:
+            return path_str, _hash(data), read_archive(path, data)
+        except Exception as e:
+            print(f"[NODE ERROR] {path.name}: {e}")
+            return path_str, _hash(data), []
+    try:
+        source = data.decode("utf-8")
+    except UnicodeDecodeError as e:
+        print(f"[NODE ERROR] {path.name}: {e}")
+        return path_str, _hash(data), []
+    return path_str, _hash(data), NodeParser.parse_source(source, path)
+
+
+class NodeIndexer:
+    """
+    Args:
+        node_bank_path: Folder holding builtin/ and custom/
+        index_path: nodeindex.json to maintain
+    """
+
+    def __init__(self, node_bank_path: Path, index_path: Path):
+        self.node_bank_path = Path(node_bank_path)
+        self.index_path = Path(index_path)
+        self.cache_path = self.node_bank_path / CACHE_FILE_NAME
+        self._lock = threading.Lock()
+        # path -> {"mtime": ns, "size": bytes, "hash": sha1, "nodes": [...]}
+        self._entries: Optional[Dict[str, Dict]] = None
+        # Files re-parsed or removed by the last refresh()
+        self.changed_paths: List[str] = []
+
+    # -------------------------
+    # CACHE
+    # -------------------------
+    def _load_cache(self) -> Dict[str, Dict]:
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+            if cache.get("version") == CACHE_VERSION:
+                return cache.get("files", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[INDEX] Ignoring unreadable node cache: {e}")
+        return {}
+
+    def _save_cache(self) -> None:
+        self._write_json(self.cache_path, {"version": CACHE_VERSION, "files": self._entries},
+                         indent=None)
+
+    @staticmethod
+    def _write_json(path: Path, data, indent: Optional[int] = 4) -> None:
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent)
+        os.replace(tmp, path)
+
+    # -------------------------
+    # SCAN
+    # -------------------------
+    def scan(self) -> Dict[str, Tuple[int, int]]:
+        """path -> (mtime_ns, size) of every node file and archive, in index order."""
+        files = {}
+        for folder_name in NODE_FOLDERS:
+            folder = self.node_bank_path / folder_name
+            try:
+                entries = sorted(os.scandir(folder), key=lambda e: e.name)
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.name.endswith((".py", ARCHIVE_SUFFIX)) or not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                files[entry.path] = (st.st_mtime_ns, st.st_size)
+        return files
+
+    def refresh(self) -> Tuple[List[Dict], int]:
+        """
+        Bring nodeindex.json up to date.
+
+        Returns (all node templates, number of files re-parsed).
+        """
+        with self._lock:
+            if self._entries is None:
+                self._entries = self._load_cache()
+
+            files = self.scan()
+            entries = self._entries
+            removed = [path for path in entries if path not in files]
+            for path in removed:
+                del entries[path]
+
+            # mtime/size unchanged: trust the cached entry without reading the file
+            suspects = [
+                path for path, (mtime, size) in files.items()
+                if path not in entries
+                or entries[path]["mtime"] != mtime or entries[path]["size"] != size
+            ]
+
+            changed = list(removed)
+            for path, digest, nodes in self._read_changed(suspects, entries):
+                mtime, size = files[path]
+                if nodes is None:
+                    # Touched but identical content
+                    entries[path].update(mtime=mtime, size=size)
+                    continue
+                entries[path] = {"mtime": mtime, "size": size, "hash": digest, "nodes": nodes}
+                changed.append(path)
+            parsed = len(changed) - len(removed)
+            self.changed_paths = changed
+
+            if removed or suspects:
+                self._save_cache()
+            all_nodes = [node for path in files for node in entries[path]["nodes"]]
+            if removed or parsed or not self.index_path.exists():
+                self._write_json(self.index_path, all_nodes)
+            return all_nodes, parsed
+
+    def _read_changed(self, paths: List[str], entries: Dict[str, Dict]):
+        """
+        Yield (path, hash, templates) for paths, or (path, hash, None) when a
+        file's content still matches its cached hash.
+        """
+        to_parse = []
+        for path in paths:
+            cached = entries.get(path)
+            if cached is None:
+                to_parse.append(path)
+                continue
+            try:
+                data = Path(path).read_bytes()
+            except OSError:
+                to_parse.append(path)
+                continue
+            digest = _hash(data)
+            if digest == cached.get("hash"):
+                yield path, digest, None
+            else:
+                to_parse.append(path)
+
+        if len(to_parse) >= PARALLEL_THRESHOLD:
+            # Threads, not processes: spawn-based workers (Windows builds)
+            # re-import the backend entry point and rerun its startup
+            workers = min(os.cpu_count() or 1, 8)
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="node-index") as pool:
+                yield from pool.map(_parse_file, to_parse)
+        else:
+            for path in to_parse:
+                yield _parse_file(path)
+
+
+class NodeBankWatcher:
+    """
+    Poll a NodeIndexer's folders and call on_change() when any node file was
+    added, removed or modified. Polling costs one stat per file, no reads.
+
+    Args:
+        indexer: Provides scan()
+        on_change: Called on the watcher thread
+        interval: Seconds between polls
+    """
+
+    def __init__(self, indexer: NodeIndexer, on_change: Callable[[], None], interval: float = 2.0):
+        self.indexer = indexer
+        self.on_change = on_change
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="nodebank-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        last = self.indexer.scan()
+        while not self._stop.wait(self.interval):
+            current = self.indexer.scan()
+            if current == last:
+                continue
+            last = current
+            try:
+                self.on_change()
+            except Exception as e:
+                print(f"[INDEX] Node refresh after file change failed: {e}")
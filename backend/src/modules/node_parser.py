@@ -1,15 +1,64 @@
 import ast
 from pathlib import Path
 
+def header_comment(source: str) -> str:
+    """The comment block at the top of a node file, without the '#' markers."""
+    lines = []
+    for line in source.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            if lines:
+                break
+            continue
+        if not stripped.startswith("#"):
+            break
+        lines.append(stripped.lstrip("#").strip())
+    return "\n".join(line for line in lines if line)
+
+
+def annotation_name(annotation) -> str:
+    """Source text of a parameter or return annotation, or None."""
+    if annotation is None:
+        return None
+    try:
+        return ast.unparse(annotation)
+    except Exception:
+        return None
+
+
+def literal_defaults(args: ast.arguments) -> dict:
+    """name -> default for positional parameters whose default is a literal."""
+    defaults = {}
+    positional = args.args[len(args.args) - len(args.defaults):] if args.defaults else []
+    for arg, default in zip(positional, args.defaults):
+        try:
+            defaults[arg.arg] = ast.literal_eval(default)
+        except (ValueError, TypeError, SyntaxError):
+            # Computed defaults stay in the function; the engine reads them from the signature
+            continue
+    return defaults
+
+
 class NodeParser:
     @staticmethod
     def parse_python_file(file_path: Path):
-        nodes_found = []
         try:
             with open(file_path, "r", encoding="utf-8") as f:
-                tree = ast.parse(f.read())
+                source = f.read()
+        except Exception as e:
+            print(f"[PARSER ERROR] {file_path.name}: {e}")
+            return []
+        return NodeParser.parse_source(source, file_path)
+
+    @staticmethod
+    def parse_source(source: str, file_path: Path):
+        """Node templates defined in source, the contents of file_path."""
+        nodes_found = []
+        try:
+            tree = ast.parse(source)
 
             file_stem = file_path.stem
+            header = header_comment(source)
 
             for node in ast.walk(tree):
                 if isinstance(node, ast.FunctionDef) and node.name.endswith("_node"):
@@ -17,6 +66,7 @@ class NodeParser:
                     unique_id = node.name if node.name == file_stem else f"{file_stem}_{node.name}"
 
                     inputs = [arg.arg for arg in node.args.args]
+                    input_types = [annotation_name(arg.annotation) for arg in node.args.args]
 
                     outputs = []
                     for sub_node in ast.walk(node):
@@ -52,9 +102,13 @@ class NodeParser:
                         "type": "script_node",
                         "scriptPath": str(file_path),
                         "entryFunction": node.name,
+                        "description": ast.get_docstring(node) or header,
                         "dynamic": {
                             "inputs": inputs,
-                            "outputs": outputs
+                            "outputs": outputs,
+                            "inputTypes": input_types,
+                            "defaults": literal_defaults(node.args),
+                            "returnType": annotation_name(node.returns)
                         }
                     })
 
@@ -0,0 +1,95 @@
+"""
+Loom Node Registry
+
+The node template index (nodebank/nodeindex.json) held in memory.
+
+IndexService replaces the contents after every node index refresh, so
+graph handlers and /sync/node_index never read the file. Templates are
+looked up by case-insensitive display name, by nodeId or by script and
+entry function in O(1), and
+searched through a trigram index (node_search.py) kept in step with them.
+Templates are shared: callers must copy anything they intend to modify.
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .node_search import NodeSearchIndex
+
+
+def normalize_name(name: str) -> str:
+    return (name or "").strip().lower()
+
+
+class NodeRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._templates: List[Dict] = []
+        self._by_name: Dict[str, Dict] = {}
+        self._by_id: Dict[str, Dict] = {}
+        self._by_script: Dict[Tuple[str, str], Dict] = {}
+        self.loaded = False
+        # Bumped on every replace() so clients can tell the index changed
+        self.version = 0
+        self.search_index = NodeSearchIndex()
+
+    def replace(self, templates: List[Dict]) -> None:
+        """Swap in a freshly built index; readers never see a half-built one."""
+        by_name, by_id, by_script = {}, {}, {}
+        for template in templates:
+            # First template with a given name wins, as with the old linear scan
+            by_name.setdefault(normalize_name(template.get("name", "")), template)
+            if template.get("nodeId") is not None:
+                by_id.setdefault(template["nodeId"], template)
+            by_script.setdefault((template.get("scriptPath"), template.get("entryFunction")), template)
+        with self._lock:
+            self._templates = list(templates)
+            self._by_name, self._by_id, self._by_script = by_name, by_id, by_script
+            self.loaded = True
+            self.version += 1
+        # Only templates that changed since the last replace are re-indexed
+        self.search_index.update(templates)
+
+    def ensure_loaded(self, index_path: Path) -> None:
+        """Fill from nodeindex.json if no refresh has populated the registry yet."""
+        if self.loaded:
+            return
+        try:
+            with open(index_path, "r", encoding="utf-8-sig") as f:
+                templates = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"[NODE REGISTRY] Error loading {index_path}: {e}")
+            return
+        with self._lock:
+            if self.loaded:
+                return
+        self.replace(templates or [])
+
+    def find(self, name_or_id: str) -> Optional[Dict]:
+        """Template by display name (case-insensitive) or, failing that, by nodeId."""
+        template = self._by_name.get(normalize_name(name_or_id))
+        if template is None:
+            template = self._by_id.get(name_or_id)
+        return template
+
+    def find_script(self, script_path: str, entry_function: str) -> Optional[Dict]:
+        """Template a graph node was built from, by its scriptPath and entryFunction."""
+        return self._by_script.get((script_path, entry_function))
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict], int]:
+        """Ranked page of templates matching query, and the total match count."""
+        return self.search_index.search(query, limit, offset)
+
+    def all(self) -> List[Dict]:
+        return self._templates
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+
+# Module-level singleton filled by IndexService, read by graph handlers
+node_registry = NodeRegistry()
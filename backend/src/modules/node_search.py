@@ -0,0 +1,234 @@
+"""
+Loom Node Search
+
+Trigram index over the node library for the sidebar search box.
+
+Each template is indexed by its display name, nodeId, entry function,
+input and output names, and description (docstring or header comment),
+each field with its own weight. Queries of three or more characters look up
+the query's trigrams; shorter ones use a sorted term list for prefix
+matches. Either way only templates sharing something with the query are
+scored, so a search costs roughly O(matches) rather than O(library).
+
+update() diffs a new template list against the indexed one and only
+re-indexes the templates that were added, removed or changed.
+"""
+
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+
+# Field weights for scoring
+FIELD_WEIGHTS = {
+    "name": 4.0,
+    "nodeId": 2.0,
+    "entryFunction": 2.0,
+    "ports": 1.5,
+    "description": 0.5,
+}
+
+# Share of the query's trigram weight a template must contain to be a
+# candidate; trigrams are weighted by rarity (see _trigram_candidates)
+MIN_TRIGRAM_OVERLAP = 0.6
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_WORD_RE.findall((text or "").lower()))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigrams of each word, padded so word starts and ends count."""
+    grams = set()
+    for word in _WORD_RE.findall((text or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _fields(template: Dict) -> Dict[str, str]:
+    dynamic = template.get("dynamic") or {}
+    ports = list(dynamic.get("inputs") or []) + list(dynamic.get("outputs") or [])
+    return {
+        "name": _normalize(template.get("name", "")),
+        "nodeId": _normalize(template.get("nodeId", "")),
+        "entryFunction": _normalize(template.get("entryFunction", "")),
+        "ports": _normalize(" ".join(str(p) for p in ports)),
+        "description": _normalize(template.get("description", "")),
+    }
+
+
+class NodeSearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key (nodeId) -> template / normalized fields
+        self._templates: Dict[str, Dict] = {}
+        self._fields: Dict[str, Dict[str, str]] = {}
+        # key -> ((text, weight), ...) for scoring, fields that are not empty
+        self._weighted: Dict[str, Tuple[Tuple[str, float], ...]] = {}
+        # trigram -> key -> best field weight containing it
+        self._grams: Dict[str, Dict[str, float]] = defaultdict(dict)
+        # word -> keys, plus the words sorted for prefix lookups
+        self._words: Dict[str, Set[str]] = defaultdict(set)
+        self._sorted_words: List[str] = []
+
+    @staticmethod
+    def _key(template: Dict) -> str:
+        return str(template.get("nodeId") or template.get("name"))
+
+    # -------------------------
+    # INDEXING
+    # -------------------------
+    def update(self, templates: List[Dict]) -> int:
+        """Re-index what changed since the last update; returns templates touched."""
+        incoming = {}
+        for template in templates:
+            incoming.setdefault(self._key(template), template)
+
+        with self._lock:
+            touched = 0
+            for key in [k for k in self._templates if k not in incoming]:
+                self._remove(key)
+                touched += 1
+            for key, template in incoming.items():
+                current = self._templates.get(key)
+                # Unchanged files hand back the very same dicts
+                if current is template or current == template:
+                    continue
+                if current is not None:
+                    self._remove(key)
+                self._add(key, template)
+                touched += 1
+            if touched:
+                self._sorted_words = sorted(self._words)
+            return touched
+
+    def _add(self, key: str, template: Dict) -> None:
+        fields = _fields(template)
+        self._templates[key] = template
+        self._fields[key] = fields
+        self._weighted[key] = tuple((text, FIELD_WEIGHTS[field]) for field, text in fields.items() if text)
+        for field, text in fields.items():
+            weight = FIELD_WEIGHTS[field]
+            for gram in trigrams(text):
+                postings = self._grams[gram]
+                if postings.get(key, 0) < weight:
+                    postings[key] = weight
+            for word in text.split():
+                self._words[word].add(key)
+
+    def _remove(self, key: str) -> None:
+        self._templates.pop(key, None)
+        self._weighted.pop(key, None)
+        fields = self._fields.pop(key, {})
+        for text in fields.values():
+            for gram in trigrams(text):
+                postings = self._grams.get(gram)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self._grams[gram]
+            for word in text.split():
+                keys = self._words.get(word)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._words[word]
+
+    # -------------------------
+    # QUERIES
+    # -------------------------
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict], int]:
+        """(one page of templates, best match first; total number of matches)."""
+        query = _normalize(query)
+        if not query:
+            return [], 0
+
+        offset = max(0, offset)
+        grams = trigrams(query)
+        with self._lock:
+            candidates = self._prefix_candidates(query) | self._trigram_candidates(query, grams)
+            gram_postings = [self._grams[gram] for gram in grams if gram in self._grams]
+            scored = [(self._score(key, query, gram_postings, len(grams)), key) for key in candidates]
+            # Only the requested page needs ordering
+            top = heapq.nsmallest(offset + limit, scored,
+                                  key=lambda item: (-item[0], self._fields[item[1]]["name"]))
+            page = top[offset:]
+            return [{**self._templates[key], "score": round(score, 3)} for score, key in page], len(scored)
+
+    def _prefix_candidates(self, query: str) -> Set[str]:
+        """Templates with a word starting with the query's last word."""
+        prefix = query.split()[-1]
+        keys = set()
+        start = bisect.bisect_left(self._sorted_words, prefix)
+        for word in self._sorted_words[start:]:
+            if not word.startswith(prefix):
+                break
+            keys |= self._words[word]
+        return keys
+
+    def _trigram_candidates(self, query: str, grams: Set[str]) -> Set[str]:
+        """
+        Templates holding at least MIN_TRIGRAM_OVERLAP of the query's trigram
+        weight, each trigram weighted by its rarity (IDF), so the padded edge
+        trigrams most words share barely count.
+        """
+        if len(query) < 3 or not grams:
+            return set()
+        total_docs = len(self._templates) + 1
+        weighted = []
+        for gram in grams:
+            keys = self._grams.get(gram)
+            # Trigrams no template has (typos) cannot be matched; leave them out
+            if keys:
+                weighted.append((math.log(total_docs / len(keys)), keys))
+        weighted.sort(key=lambda item: -item[0])
+        total = sum(weight for weight, _ in weighted)
+        needed = total * MIN_TRIGRAM_OVERLAP
+        if needed <= 0:
+            return set()
+        # Pigeonhole: a key missing from every list in the rarest prefix whose
+        # weight exceeds total - needed cannot reach needed, so only those
+        # (short) lists are walked for seeds
+        seeds, covered = set(), 0.0
+        for weight, keys in weighted:
+            seeds.update(keys)
+            covered += weight
+            if covered > total - needed:
+                break
+        matches = set()
+        for key in seeds:
+            mass = 0.0
+            for weight, keys in weighted:
+                if key in keys:
+                    mass += weight
+            if mass >= needed:
+                matches.add(key)
+        return matches
+
+    def _score(self, key: str, query: str, gram_postings: List[Dict[str, float]], gram_count: int) -> float:
+        score = 0.0
+        for text, weight in self._weighted[key]:
+            position = text.find(query)
+            if position < 0:
+                continue
+            if position == 0:
+                score += (10 if len(text) == len(query) else 6) * weight
+            elif text[position - 1] == " ":
+                score += 4 * weight  # starts a later word
+            else:
+                score += 2 * weight
+        if gram_count:
+            shared = 0.0
+            for postings in gram_postings:
+                shared += postings.get(key, 0)
+            score += shared / gram_count
+        return score
+
+    def __len__(self) -> int:
+        return len(self._templates)
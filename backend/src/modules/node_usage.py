@@ -0,0 +1,87 @@
+"""
+Loom Node Usage
+
+Reverse index from node scripts to the projects and nodes that run them.
+
+The rows live in the project catalog's node_usage table. NodeUsageIndex
+listens to the graph store: a loaded document replaces its project's rows,
+and each committed edit upserts or drops only the nodes it put or removed.
+Node moves and input edits do not change what a node runs, so they are
+filtered out in memory and never reach SQLite. IndexService asks
+affected_by() which projects use the scripts a refresh re-parsed.
+"""
+
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .graph_store import GraphDocument
+from .project_catalog import ProjectCatalog, project_catalog, usage_key
+
+
+class NodeUsageIndex:
+    """
+    Args:
+        catalog: ProjectCatalog holding the node_usage table
+    """
+
+    def __init__(self, catalog: ProjectCatalog):
+        self.catalog = catalog
+        self._lock = threading.Lock()
+        # (projectId, nodeId) -> usage_key, as last written
+        self._known: Dict[Tuple[str, str], tuple] = {}
+
+    def on_graph_change(self, doc: GraphDocument, delta: Optional[dict]) -> None:
+        """GraphStore listener; called under doc.lock."""
+        project_id = doc.meta.get("projectId")
+        if not project_id:
+            return
+        if delta is None:
+            self._load(project_id, doc.graph.to_json().get("nodes") or [])
+            return
+
+        put, removed = [], []
+        with self._lock:
+            for op in delta.get("ops", []):
+                kind = op.get("op")
+                if kind == "node_put":
+                    node = op["node"]
+                    key = (project_id, node.get("nodeId"))
+                    if self._known.get(key) != usage_key(node):
+                        self._known[key] = usage_key(node)
+                        put.append(node)
+                elif kind == "node_remove":
+                    if self._known.pop((project_id, op.get("nodeId")), None) is not None:
+                        removed.append(op["nodeId"])
+        if put or removed:
+            self.catalog.update_usage(project_id, put, removed)
+
+    def _load(self, project_id: str, nodes: List[Dict]) -> None:
+        with self._lock:
+            current = {(project_id, n.get("nodeId")): usage_key(n) for n in nodes if n.get("nodeId")}
+            previous = {k: v for k, v in self._known.items() if k[0] == project_id}
+            if previous == current:
+                return
+            for key in previous:
+                del self._known[key]
+            self._known.update(current)
+        self.catalog.set_usage(project_id, nodes)
+
+    # -------------------------
+    # QUERIES
+    # -------------------------
+    def users(self, script_path: Optional[str] = None, entry_function: Optional[str] = None,
+              name: Optional[str] = None) -> Dict[str, List[str]]:
+        """projectId -> nodeIds of the nodes matching every given filter."""
+        return self.catalog.usage(script_path, entry_function, name)
+
+    def affected_by(self, script_paths: Iterable[str]) -> Dict[str, List[str]]:
+        """projectId -> nodeIds using any of script_paths (files or node archives)."""
+        affected: Dict[str, List[str]] = {}
+        for path in script_paths:
+            for project_id, node_ids in self.catalog.usage(script_path=path).items():
+                affected.setdefault(project_id, []).extend(node_ids)
+        return affected
+
+
+# Module-level singleton; IndexService subscribes it to the graph store
+node_usage = NodeUsageIndex(project_catalog)
@@ -0,0 +1,297 @@
+"""
+Loom Project Catalog
+
+Project metadata in one SQLite table (userdata/projects.db), so listing
+projects never opens their savefiles.
+
+ProjectManager updates a row in the same step as it creates, edits or
+deletes a project; each change is its own transaction. rebuild() rescans the
+savefiles and is only run on demand (the reload_projects command, or once
+when the catalog is first created or its schema changed). Listing is sorted
+and paginated in SQL, and lookups by projectId or projectName use indexes.
+
+A second table, node_usage, maps each graph node to the script, entry
+function and name it runs, so the projects using a node script are one
+indexed query away (see node_usage.py, which keeps it current).
+"""
+
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .storage_manager import StorageManager
+
+CATALOG_FILE_NAME = "projects.db"
+
+# Columns that list() may sort by
+SORT_COLUMNS = ("projectName", "lastModified", "createdAt", "author")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    projectId     TEXT PRIMARY KEY,
+    projectName   TEXT NOT NULL,
+    projectPath   TEXT NOT NULL,
+    description   TEXT,
+    author        TEXT,
+    createdAt     TEXT,
+    lastModified  TEXT
+);
+CREATE INDEX IF NOT EXISTS projects_name ON projects (projectName);
+CREATE INDEX IF NOT EXISTS projects_modified ON projects (lastModified);
+CREATE TABLE IF NOT EXISTS node_usage (
+    projectId      TEXT NOT NULL,
+    nodeId         TEXT NOT NULL,
+    scriptPath     TEXT,
+    entryFunction  TEXT,
+    name           TEXT,
+    PRIMARY KEY (projectId, nodeId)
+);
+CREATE INDEX IF NOT EXISTS node_usage_script ON node_usage (scriptPath);
+CREATE INDEX IF NOT EXISTS node_usage_entry ON node_usage (entryFunction);
+CREATE INDEX IF NOT EXISTS node_usage_name ON node_usage (name);
+"""
+
+# Bump when the schema gains data that rebuild() has to backfill
+SCHEMA_VERSION = 2
+
+_COLUMNS = ("projectId", "projectName", "projectPath", "description", "author", "createdAt", "lastModified")
+
+_USAGE_COLUMNS = ("projectId", "nodeId", "scriptPath", "entryFunction", "name")
+_INSERT_USAGE = (
+    f"INSERT OR REPLACE INTO node_usage ({', '.join(_USAGE_COLUMNS)}) "
+    f"VALUES ({', '.join('?' for _ in _USAGE_COLUMNS)})"
+)
+
+
+def catalog_row(data: Dict, savefile_path: Optional[Path] = None) -> Dict:
+    """Catalog fields of a savefile's contents."""
+    metadata = data.get("metadata") or {}
+    return {
+        "projectId": data.get("projectId"),
+        "projectName": data.get("projectName"),
+        "projectPath": str(savefile_path) if savefile_path else data.get("projectPath"),
+        "description": metadata.get("description"),
+        "author": metadata.get("author"),
+        "createdAt": metadata.get("createdAt"),
+        "lastModified": metadata.get("lastModified", ""),
+    }
+
+
+def usage_key(node: Dict) -> tuple:
+    """(scriptPath, entryFunction, name) a graph node runs."""
+    return (node.get("scriptPath"), node.get("entryFunction"), node.get("name"))
+
+
+class ProjectCatalog:
+    """
+    Args:
+        db_path: SQLite file; defaults to userdata/projects.db
+    """
+
+    def __init__(self, db_path: Optional[Path] = None):
+        self._db_path = Path(db_path) if db_path else None
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+        # True when the database was new (or older than SCHEMA_VERSION) when opened
+        self.created = False
+
+    @property
+    def db_path(self) -> Path:
+        return self._db_path or StorageManager.USERDATA_DIR / CATALOG_FILE_NAME
+
+    def _connection(self) -> sqlite3.Connection:
+        """Call under lock. Opened on first use so importing has no side effects."""
+        if self._conn is None:
+            path = self.db_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.created = not path.exists()
+            conn = sqlite3.connect(str(path), check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                # Tables added since the file was made are empty until rebuilt
+                self.created = True
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # -------------------------
+    # WRITES
+    # -------------------------
+    def upsert(self, data: Dict, savefile_path: Optional[Path] = None) -> None:
+        """Insert or replace a project's row from its savefile contents."""
+        row = catalog_row(data, savefile_path)
+        if not row["projectId"]:
+            return
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    f"INSERT OR REPLACE INTO projects ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                    [row[c] for c in _COLUMNS],
+                )
+
+    def delete(self, project_id: str) -> bool:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM node_usage WHERE projectId = ?", (project_id,))
+                return conn.execute("DELETE FROM projects WHERE projectId = ?", (project_id,)).rowcount > 0
+
+    def delete_by_name(self, project_name: str) -> bool:
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "DELETE FROM node_usage WHERE projectId IN "
+                    "(SELECT projectId FROM projects WHERE projectName = ?)", (project_name,)
+                )
+                return conn.execute("DELETE FROM projects WHERE projectName = ?", (project_name,)).rowcount > 0
+
+    def rebuild(self, project_base: Path) -> int:
+        """Replace every row by scanning project_base/*/savefile.json; returns the count."""
+        rows, usage = [], []
+        project_base = Path(project_base)
+        if project_base.exists():
+            for folder in sorted(project_base.iterdir()):
+                savefile = folder / "savefile.json"
+                if not folder.is_dir() or not savefile.exists():
+                    continue
+                try:
+                    with open(savefile, "r", encoding="utf-8-sig") as f:
+                        data = json.load(f)
+                    row = catalog_row(data, savefile)
+                except Exception as e:
+                    print(f"[CATALOG ERROR] {folder.name}: {e}")
+                    continue
+                if row["projectId"]:
+                    rows.append([row[c] for c in _COLUMNS])
+                    usage.extend((row["projectId"], node.get("nodeId"), *usage_key(node))
+                                 for node in data.get("nodes") or [] if node.get("nodeId"))
+
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM projects")
+                conn.execute("DELETE FROM node_usage")
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO projects ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in _COLUMNS)})",
+                    rows,
+                )
+                conn.executemany(_INSERT_USAGE, usage)
+        return len(rows)
+
+    def set_usage(self, project_id: str, nodes: List[Dict]) -> None:
+        """Replace a project's node_usage rows with its current nodes."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM node_usage WHERE projectId = ?", (project_id,))
+                conn.executemany(_INSERT_USAGE, [
+                    (project_id, node["nodeId"], *usage_key(node)) for node in nodes if node.get("nodeId")
+                ])
+
+    def update_usage(self, project_id: str, put: List[Dict], removed: List[str]) -> None:
+        """Upsert the rows of changed nodes and drop those of removed ones, in one transaction."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany(
+                    "DELETE FROM node_usage WHERE projectId = ? AND nodeId = ?",
+                    [(project_id, node_id) for node_id in removed],
+                )
+                conn.executemany(_INSERT_USAGE, [
+                    (project_id, node["nodeId"], *usage_key(node)) for node in put if node.get("nodeId")
+                ])
+
+    def ensure_built(self, project_base: Path) -> None:
+        """Fill a newly created catalog from the existing project folders."""
+        with self._lock:
+            self._connection()
+            if not self.created:
+                return
+            self.created = False
+        count = self.rebuild(project_base)
+        print(f"[CATALOG] Built project catalog ({count} projects)")
+
+    # -------------------------
+    # READS
+    # -------------------------
+    def get(self, project_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT * FROM projects WHERE projectId = ?", (project_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def get_by_name(self, project_name: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT * FROM projects WHERE projectName = ?", (project_name,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM projects").fetchone()[0]
+
+    def list(self, sort: str = "projectName", descending: bool = False,
+             limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """One page of projects; sort must be one of SORT_COLUMNS."""
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort projects by '{sort}'")
+        order = "DESC" if descending else "ASC"
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT * FROM projects ORDER BY {sort} {order}, projectId LIMIT ? OFFSET ?",
+                (limit if limit is not None else -1, max(0, offset or 0)),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def usage(self, script_path: Optional[str] = None, entry_function: Optional[str] = None,
+              name: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        projectId -> nodeIds of the nodes matching every given filter.
+
+        script_path also matches scripts inside a node archive at that path.
+        """
+        clauses, params = [], []
+        if script_path:
+            # "<archive>/" up to (not including) "<archive>0": members of an archive, via the index
+            clauses.append("(scriptPath = ? OR (scriptPath >= ? AND scriptPath < ?))")
+            params += [script_path, script_path + "/", script_path + "0"]
+        if entry_function:
+            clauses.append("entryFunction = ?")
+            params.append(entry_function)
+        if name:
+            clauses.append("name = ?")
+            params.append(name)
+        if not clauses:
+            raise ValueError("Node usage needs a scriptPath, entryFunction or name")
+
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT projectId, nodeId FROM node_usage WHERE {' AND '.join(clauses)} "
+                f"ORDER BY projectId, nodeId",
+                params,
+            ).fetchall()
+        result: Dict[str, List[str]] = {}
+        for row in rows:
+            result.setdefault(row["projectId"], []).append(row["nodeId"])
+        return result
+
+
+# Module-level singleton shared by ProjectManager, IndexService and handlers
+project_catalog = ProjectCatalog()
@@ -0,0 +1,112 @@
+"""
+Loom Project Journal
+
+Append-only record of graph edits, kept next to a project's savefile.
+
+Layout ({project}/):
+    savefile.json    snapshot, carries the graphVersion it was taken at
+    journal.jsonl    one record per committed edit after older snapshots:
+                     {"v": version, "kind": "edit" | "undo" | "redo",
+                      "ops": [...], "undo": [...]}
+
+Appends are written straight to the OS (cheap, survives a process crash);
+sync() does the fsync and is batched by the graph store's writer thread.
+Loading replays the records newer than the snapshot; compaction writes a
+fresh snapshot and drops the records it covers.
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+JOURNAL_FILE_NAME = "journal.jsonl"
+
+
+class ProjectJournal:
+    def __init__(self, project_dir: Path):
+        self.path = Path(project_dir) / JOURNAL_FILE_NAME
+        self._lock = threading.Lock()
+        self._file = None
+        self._unsynced = False
+
+    def _handle(self):
+        if self._file is None or self._file.closed:
+            self._file = open(self.path, "ab")
+        return self._file
+
+    def size(self) -> int:
+        try:
+            return self.path.stat().st_size
+        except OSError:
+            return 0
+
+    def append(self, record: Dict) -> None:
+        line = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with self._lock:
+            f = self._handle()
+            f.write(line)
+            f.flush()
+            self._unsynced = True
+
+    def sync(self) -> None:
+        """fsync everything appended so far."""
+        with self._lock:
+            if self._unsynced and self._file is not None and not self._file.closed:
+                os.fsync(self._file.fileno())
+            self._unsynced = False
+
+    def read_since(self, version: int) -> List[Dict]:
+        """Records with v > version, oldest first. A torn last line is ignored."""
+        if not self.path.exists():
+            return []
+        records = []
+        with self._lock, open(self.path, "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    continue
+                if record.get("v", 0) > version:
+                    records.append(record)
+        return records
+
+    def truncate_through(self, version: int) -> None:
+        """Drop records covered by a snapshot taken at version (after it is on disk)."""
+        with self._lock:
+            if self._file is not None and not self._file.closed:
+                self._file.close()
+            self._unsynced = False
+            if not self.path.exists():
+                return
+
+            keep = []
+            with open(self.path, "rb") as f:
+                for raw in f:
+                    if not raw.endswith(b"\n"):
+                        break
+                    try:
+                        if json.loads(raw).get("v", 0) > version:
+                            keep.append(raw)
+                    except ValueError:
+                        continue
+
+            if not keep:
+                self.path.unlink()
+                return
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "wb") as f:
+                f.write(b"".join(keep))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+    def close(self) -> None:
+        self.sync()
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,103 @@
+"""
+Loom Project Layout
+
+A project is stored as two files next to each other:
+
+    savefile.json   logic: metadata, nodes (inputs, outputs, scriptPath, ...)
+                    and connections. This is all the engine reads.
+    layout.json     canvas layout only:
+                    {"graphVersion": N, "nodes": {nodeId: {"positionId", "position"}}}
+
+Older projects keep positions inside savefile.json; load_project() merges
+either form into the single in-memory shape the handlers and frontend use,
+and the next save splits it (see GraphStore._write).
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+LAYOUT_FILE_NAME = "layout.json"
+LAYOUT_KEYS = ("positionId", "position")
+
+# Graphs at least this big are written without indentation
+COMPACT_NODE_THRESHOLD = 2000
+
+
+def layout_path(savefile_path: Path) -> Path:
+    return Path(savefile_path).with_name(LAYOUT_FILE_NAME)
+
+
+def dumps(data: Dict, compact: bool = False) -> str:
+    if compact:
+        return json.dumps(data, separators=(",", ":"))
+    return json.dumps(data, indent=4)
+
+
+def logic_part(data: Dict) -> Dict:
+    """The savefile.json contents: data without layout keys on its nodes."""
+    nodes = [
+        {k: v for k, v in node.items() if k not in LAYOUT_KEYS}
+        for node in data.get("nodes", [])
+    ]
+    return {**data, "nodes": nodes}
+
+
+def layout_part(data: Dict) -> Dict:
+    """The layout.json contents for data."""
+    return {
+        "graphVersion": data.get("graphVersion", 0),
+        "nodes": {
+            node["nodeId"]: {k: node[k] for k in LAYOUT_KEYS if k in node}
+            for node in data.get("nodes", [])
+            if node.get("nodeId") is not None
+        },
+    }
+
+
+def load_project(savefile_path: Path) -> Tuple[Dict, bool]:
+    """
+    Read savefile.json and merge layout.json into its nodes.
+
+    Returns (data, legacy) where legacy means positions were still stored
+    in savefile.json and the project should be re-saved in the split form.
+    Either file may be indented or compact.
+    """
+    with open(savefile_path, "r", encoding="utf-8-sig") as f:
+        data = json.load(f)
+
+    nodes = data.get("nodes", []) or []
+    legacy = any("position" in node for node in nodes)
+
+    layout = _read_layout(layout_path(savefile_path))
+    if layout:
+        positions = layout.get("nodes", {})
+        for node in nodes:
+            node.update(positions.get(node.get("nodeId"), {}))
+        # A layout-only save leaves savefile.json at an older version
+        data["graphVersion"] = max(data.get("graphVersion", 0) or 0, layout.get("graphVersion", 0) or 0)
+
+    return data, legacy
+
+
+def _read_layout(path: Path) -> Optional[Dict]:
+    if not path.exists():
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"[LAYOUT] Ignoring unreadable {path}: {e}")
+        return None
+
+
+def atomic_write(path: Path, text: str, durable: bool = False) -> None:
+    """Temp-file-and-rename write; durable also fsyncs before the rename."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        if durable:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp, path)
@@ -1,8 +1,12 @@
 import json
+import copy
 import shutil
 import datetime
 from pathlib import Path
 from .storage_manager import StorageManager
+from .graph_store import graph_store
+from .project_catalog import project_catalog
+from .snapshot_store import snapshot_store
 
 class ProjectManager:
     def __init__(self, base_path="userdata", signal_hub=None):
@@ -22,6 +26,16 @@ class ProjectManager:
             self.signal_hub.on("project_update_request", lambda p: self.update_project(**p))
             self.signal_hub.on("project_delete_request", lambda p: self.delete_project(p.get("projectName")))
             self.signal_hub.on("project_change_request", lambda p: self.change_project(p.get("projectId")))
+            self.signal_hub.on("project_snapshot_request", lambda p: self.snapshot_project(
+                project_id=(p or {}).get("projectId"), label=(p or {}).get("label")
+            ))
+            self.signal_hub.on("project_snapshot_list_request", lambda p: self.list_snapshots((p or {}).get("projectId")))
+            self.signal_hub.on("project_snapshot_restore_request", lambda p: self.restore_snapshot(
+                (p or {}).get("snapshotId"), project_id=(p or {}).get("projectId")
+            ))
+
+            # Snapshot record hashes follow graph edits (only the instance wired to the hub subscribes)
+            snapshot_store.subscribe(graph_store)
 
     # ===== State Management =====
 
@@ -49,7 +63,7 @@ class ProjectManager:
     # ===== Project Operations =====
 
     def init_project(self, project_name=None, description=None, author="author"):
-        folder_count = len([d for d in self.base_path.iterdir() if d.is_dir()]) + 1
+        folder_count = project_catalog.count() + 1
         project_name = project_name or f"Project_{folder_count}"
         
         project_path = self.base_path / project_name
@@ -79,22 +93,8 @@ class ProjectManager:
             with open(savefile_path, "w", encoding="utf-8-sig") as f:
                 json.dump(project_data, f, indent=4)
 
-            # 3. 🔑 UPDATE FOLDER INDEX FIRST (so change_project can find it)
-            index_path = self.base_path / "folderindex.json"
-            index = []
-            if index_path.exists():
-                with open(index_path, "r", encoding="utf-8") as f:
-                    index = json.load(f)
-            
-            # Add new project to index
-            index.append({
-                "projectId": project_id,
-                "projectName": project_name,
-                "projectPath": str(savefile_path)
-            })
-            
-            with open(index_path, "w", encoding="utf-8") as f:
-                json.dump(index, f, indent=4)
+            # 3. 🔑 UPDATE CATALOG FIRST (so change_project can find it)
+            project_catalog.upsert(project_data, savefile_path)
 
             # 4. Now call change_project (it can find the project in index)
             full_loaded_data = self.change_project(project_id)
@@ -115,39 +115,59 @@ class ProjectManager:
         if not savefile_path.exists(): 
             return {"status": "error", "message": "Project not found"}
 
-        with open(savefile_path, "r", encoding="utf-8-sig") as f:
-            data = json.load(f)
-
-        # 1. Handle Project-level Metadata updates
-        if project_updates:
-            if "projectName" in project_updates:
-                data["projectName"] = project_updates["projectName"]
-            if "description" in project_updates:
-                data["metadata"]["description"] = project_updates["description"]
-            if "author" in project_updates:
-                data["metadata"]["author"] = project_updates["author"]
-
-        # 2. Handle Node/Connection entity updates
-        elif entity_type and entity_id:
-            key = "nodes" if entity_type == "node" else "connections"
-            id_key = "nodeId" if entity_type == "node" else "connectionId"
-            
-            found = False
-            for item in data[key]:
-                if item.get(id_key) == entity_id:
-                    item.update(updates or {})
-                    found = True
-                    break
-            
-            if not found:
-                new_item = {id_key: entity_id}
-                new_item.update(updates or {})
-                data[key].append(new_item)
+        # Edit the cached graph so pending handler edits are not overwritten
+        doc = graph_store.get(savefile_path)
+        if not doc:
+            return {"status": "error", "message": "Failed to load project graph"}
+
+        with graph_store.edit(doc):
+            doc.touch_meta()
+            meta = doc.meta
+            graph = doc.graph
+
+            # 1. Handle Project-level Metadata updates
+            if project_updates:
+                if "projectName" in project_updates:
+                    meta["projectName"] = project_updates["projectName"]
+                if "description" in project_updates:
+                    meta["metadata"]["description"] = project_updates["description"]
+                if "author" in project_updates:
+                    meta["metadata"]["author"] = project_updates["author"]
+
+            # 2. Handle Node/Connection entity updates
+            elif entity_type == "node" and entity_id:
+                node = graph.edit_node(entity_id)
+                if node is not None:
+                    # nodeId is the index key; it cannot be changed in place
+                    node.update({k: v for k, v in (updates or {}).items() if k != "nodeId"})
+                else:
+                    new_item = {"nodeId": entity_id}
+                    new_item.update(updates or {})
+                    new_item["nodeId"] = entity_id
+                    graph.add_node(new_item)
+
+            elif entity_type and entity_id:
+                # Connections are indexed by their endpoints; re-insert on change
+                existing = next(
+                    (key for key, c in graph.connections.items() if c.get("connectionId") == entity_id),
+                    None
+                )
+                removed = graph.remove_connection(existing) if existing else None
+                # A new dict: the removed one is what the journal and undo recorded
+                item = {**(removed or {"connectionId": entity_id}), **(updates or {})}
+                if not graph.add_connection(item):
+                    if removed is not None:
+                        graph.add_connection(removed)
+                    return {"status": "error",
+                            "message": f"Connection '{entity_id}' would duplicate an existing connection"}
+
+            meta["metadata"]["lastModified"] = datetime.datetime.utcnow().isoformat() + "Z"
+            data = copy.deepcopy(doc.to_json())
 
-        data["metadata"]["lastModified"] = datetime.datetime.utcnow().isoformat() + "Z"
+        # Explicit project updates are rare; persist them right away
+        graph_store.flush(savefile_path)
 
-        with open(savefile_path, "w", encoding="utf-8-sig") as f:
-            json.dump(data, f, indent=4)
+        project_catalog.upsert(data, savefile_path)
 
         # If we just updated the active project, sync the state
         current = self.read_current()
@@ -160,22 +180,17 @@ class ProjectManager:
         return {"status": "success", "data": data}
 
     def change_project(self, project_id: str):
-        """Switches the active project based on ID (searches via index)."""
-        index_path = self.base_path / "folderindex.json"
-        if not index_path.exists(): return
-        
-        with open(index_path, "r", encoding="utf-8") as f:
-            index = json.load(f)
-            
-        project_meta = next((p for p in index if p["projectId"] == project_id), None)
+        """Switches the active project based on ID (looked up in the catalog)."""
+        project_meta = project_catalog.get(project_id)
         if project_meta:
             # Read full file to get the nodes/connections
             full_path = Path(project_meta["projectPath"])
-            if full_path.exists():
-                with open(full_path, "r", encoding="utf-8-sig") as f:
-                    full_data = json.load(f)
-                    self.write_current(full_data)
-                    return full_data
+            doc = graph_store.get(full_path)
+            if doc:
+                with doc.lock:
+                    full_data = copy.deepcopy(doc.to_json())
+                self.write_current(full_data)
+                return full_data
         return None
 
     def delete_project(self, project_name: str):
@@ -185,7 +200,9 @@ class ProjectManager:
 
         project_path = self.base_path / project_name
         if project_path.exists():
+            graph_store.invalidate(project_path / "savefile.json")
             shutil.rmtree(project_path)
+            project_catalog.delete_by_name(project_name)
             
             # Check if deleted project was active, if so clear state
             current = self.read_current()
@@ -203,4 +220,53 @@ class ProjectManager:
             
             return {"status": "ok", "message": f"Project {project_name} deleted"}
         
-        return {"status": "error", "message": "Project folder not found"}
\ No newline at end of file
+        return {"status": "error", "message": "Project folder not found"}
+
+    # ===== Snapshots =====
+
+    def _snapshot_target(self, project_id=None):
+        """(projectId, graph document) of project_id, or of the active project."""
+        if not project_id:
+            project_id = (self.read_current() or {}).get("projectId")
+        project_meta = project_catalog.get(project_id) if project_id else None
+        if not project_meta:
+            return project_id, None
+        return project_id, graph_store.get(Path(project_meta["projectPath"]))
+
+    def snapshot_project(self, project_id=None, label=None):
+        """Record a restore point; stores only node records not stored before."""
+        project_id, doc = self._snapshot_target(project_id)
+        if not doc:
+            return {"status": "error", "message": "Project not found"}
+        try:
+            snapshot = snapshot_store.take(doc, label)
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+        stats = snapshot["stats"]
+        print(f"[PROJECT] Snapshot {snapshot['snapshotId']} of {project_id}: "
+              f"{stats['newObjects']} new objects, {stats['bytesWritten']} bytes")
+        return {"status": "ok", "snapshot": snapshot}
+
+    def list_snapshots(self, project_id=None):
+        """Restore points of a project (default: the active one), newest first."""
+        if not project_id:
+            project_id = (self.read_current() or {}).get("projectId")
+        if not project_id:
+            return {"status": "error", "message": "No current project selected"}
+        return {"status": "ok", "projectId": project_id, "snapshots": snapshot_store.list(project_id)}
+
+    def restore_snapshot(self, snapshot_id, project_id=None):
+        """Bring the graph back to a snapshot as one undoable edit."""
+        project_id, doc = self._snapshot_target(project_id)
+        if not doc:
+            return {"status": "error", "message": "Project not found"}
+        manifest = snapshot_store.load_manifest(project_id, snapshot_id)
+        if not manifest:
+            return {"status": "error", "message": f"Snapshot '{snapshot_id}' not found"}
+        try:
+            changes = snapshot_store.restore(graph_store, doc, manifest)
+        except Exception as e:
+            return {"status": "error", "message": f"Restore failed: {e}"}
+        with doc.lock:
+            version = doc.version
+        return {"status": "ok", "snapshotId": snapshot_id, "version": version, **changes}
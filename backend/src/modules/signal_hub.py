@@ -107,6 +107,17 @@ class SignalHub:
         # Signal name -> list of (async_handler, metadata) tuples
         self._async_listeners: Dict[str, List[tuple]] = {}
         self._enable_logging = enable_logging
+        # Event loop that async handlers run on when emitted from worker threads
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Set the event loop used for async handlers emitted off-loop.
+        
+        Sync handlers run on dispatcher worker threads, where there is no
+        running loop; emit_concurrent() schedules onto this one instead.
+        """
+        self._loop = loop
     
     def on(self, signal_name: str, handler: Callable[[Any], None]) -> None:
         """
@@ -293,13 +304,17 @@ class SignalHub:
         # Fire async handlers in background
         async_handlers = self._async_listeners.get(signal_name, [])
         if async_handlers:
-            # Create task in the event loop
+            coro = self._execute_async_handlers(signal_name, async_handlers, payload)
             try:
-                loop = asyncio.get_event_loop()
-                loop.create_task(self._execute_async_handlers(signal_name, async_handlers, payload))
+                # Called on the loop thread: create a task directly
+                asyncio.get_running_loop().create_task(coro)
             except RuntimeError:
-                # No event loop running, log warning
-                logger.warning(f"Cannot emit async handlers for '{signal_name}': no event loop running")
+                if self._loop is not None and not self._loop.is_closed():
+                    # Called from a worker thread: hand over to the bound loop
+                    asyncio.run_coroutine_threadsafe(coro, self._loop)
+                else:
+                    coro.close()
+                    logger.warning(f"Cannot emit async handlers for '{signal_name}': no event loop running")
     
     async def _execute_async_handlers(self, signal_name: str, handlers: List[tuple], payload: Any) -> None:
         """Helper to execute async handlers with error handling."""
@@ -320,6 +335,36 @@ class SignalHub:
         tasks = [safe_call(handler, metadata) for handler, metadata in handlers]
         await asyncio.gather(*tasks, return_exceptions=True)
     
+    async def call_async(self, signal_name: str, payload: Any = None) -> List[Any]:
+        """
+        Await only the async handlers for a signal and return their results.
+        
+        Used by the dispatcher, which runs the sync handlers on its worker
+        pool and awaits async ones natively on the event loop. A handler that
+        raises is logged and skipped, as in emit().
+        """
+        results = []
+        for handler, metadata in self._async_listeners.get(signal_name, []):
+            try:
+                results.append(await handler(payload))
+            except Exception as e:
+                handler_name = metadata.get("name", "unknown")
+                logger.error(f"Error in async handler '{handler_name}' for signal '{signal_name}': {e}")
+                if signal_name != "handler_error":
+                    self.emit("handler_error", {
+                        "signal": signal_name,
+                        "handler": handler_name,
+                        "error": str(e),
+                        "async": True
+                    })
+        return results
+    
+    def has_sync_handlers(self, signal_name: str) -> bool:
+        return bool(self._listeners.get(signal_name))
+    
+    def has_async_handlers(self, signal_name: str) -> bool:
+        return bool(self._async_listeners.get(signal_name))
+    
     def registered_signals(self) -> List[str]:
         """
         Return list of all signal names that have registered handlers.
@@ -0,0 +1,277 @@
+"""
+Loom Snapshot Store
+
+Project restore points kept as manifests over a content-addressed object
+store, so a snapshot costs the nodes that changed since the last one.
+
+A graph is split into records: one per node and one per source node's
+outgoing connections. Each record is serialized canonically, hashed
+(SHA-256) and stored once, zlib-compressed, in userdata/objects/ab/cdef...;
+identical records in any snapshot of any project share the object. A
+snapshot is a manifest of (id, hash) pairs in
+userdata/snapshots/<projectId>/<snapshotId>.json.
+
+Record hashes are cached per document and dropped by the graph store's
+change events for exactly the nodes and connection groups an edit
+touched, so taking a snapshot serializes and writes only those. Restoring
+diffs the manifest against the same cache and streams back only the
+objects that differ, applied as one undoable graph transaction.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+import uuid
+import zlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .graph_model import connection_key
+from .graph_store import GraphDocument, GraphStore
+from .storage_manager import StorageManager
+
+OBJECTS_DIR_NAME = "objects"
+SNAPSHOTS_DIR_NAME = "snapshots"
+MANIFEST_VERSION = 1
+
+
+def _encode(record) -> bytes:
+    return json.dumps(record, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class SnapshotStore:
+    """
+    Args:
+        root: Folder holding objects/ and snapshots/; defaults to userdata
+    """
+
+    def __init__(self, root: Optional[Path] = None):
+        self._root = Path(root) if root else None
+        self._lock = threading.Lock()
+        # Hashes known to be on disk, to skip the existence check
+        self._stored: set = set()
+        # str(savefile path) -> nodeId -> hash of the node record
+        self._node_hashes: Dict[str, Dict[str, str]] = {}
+        # str(savefile path) -> sourceNodeId -> hash of its outgoing connections
+        self._group_hashes: Dict[str, Dict[str, str]] = {}
+
+    @property
+    def root(self) -> Path:
+        return self._root or StorageManager.USERDATA_DIR
+
+    # -------------------------
+    # OBJECTS
+    # -------------------------
+    def _object_path(self, digest: str) -> Path:
+        return self.root / OBJECTS_DIR_NAME / digest[:2] / digest[2:]
+
+    def put_object(self, data: bytes) -> Tuple[str, int]:
+        """Store data once; returns (hash, bytes written, 0 if already stored)."""
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self._stored:
+            return digest, 0
+        path = self._object_path(digest)
+        written = 0
+        if not path.exists():
+            compressed = zlib.compress(data)
+            _atomic_write(path, compressed)
+            written = len(compressed)
+        with self._lock:
+            self._stored.add(digest)
+        return digest, written
+
+    def get_object(self, digest: str):
+        with open(self._object_path(digest), "rb") as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    def stream_objects(self, digests: List[str]) -> Iterator:
+        """Decoded records one at a time, so a restore never holds the whole graph twice."""
+        for digest in digests:
+            yield self.get_object(digest)
+
+    # -------------------------
+    # HASH CACHE
+    # -------------------------
+    def subscribe(self, store: GraphStore) -> None:
+        store.subscribe(self.on_graph_change)
+
+    def on_graph_change(self, doc: GraphDocument, delta: Optional[dict]) -> None:
+        """GraphStore listener; called under doc.lock."""
+        key = str(doc.path)
+        with self._lock:
+            if delta is None:
+                self._node_hashes.pop(key, None)
+                self._group_hashes.pop(key, None)
+                return
+            nodes = self._node_hashes.get(key)
+            groups = self._group_hashes.get(key)
+            for op in delta.get("ops", []):
+                kind = op.get("op")
+                if kind == "node_put" and nodes is not None:
+                    nodes.pop(op["node"].get("nodeId"), None)
+                elif kind == "node_remove" and nodes is not None:
+                    nodes.pop(op.get("nodeId"), None)
+                elif kind in ("connection_add", "connection_remove") and groups is not None:
+                    groups.pop(op["connection"].get("sourceNodeId"), None)
+
+    def _records(self, doc: GraphDocument) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]], List[bytes]]:
+        """
+        (node (id, hash) pairs, connection group (source, hash) pairs, records
+        to store). Call under doc.lock; only uncached records are serialized.
+        """
+        key = str(doc.path)
+        with self._lock:
+            node_cache = self._node_hashes.setdefault(key, {})
+            group_cache = self._group_hashes.setdefault(key, {})
+        pending = []
+
+        nodes = []
+        for node_id, node in doc.graph.nodes.items():
+            digest = node_cache.get(node_id)
+            if digest is None:
+                data = _encode(node)
+                digest = hashlib.sha256(data).hexdigest()
+                node_cache[node_id] = digest
+                if digest not in self._stored:
+                    pending.append(data)
+            elif digest not in self._stored:
+                # Hashed by a restore, never written
+                pending.append(_encode(node))
+            nodes.append((node_id, digest))
+
+        groups: Dict[str, List[Dict]] = {}
+        for conn in doc.graph.connections.values():
+            groups.setdefault(conn.get("sourceNodeId"), []).append(conn)
+        connections = []
+        for source, conns in groups.items():
+            digest = group_cache.get(source)
+            if digest is None:
+                data = _encode(conns)
+                digest = hashlib.sha256(data).hexdigest()
+                group_cache[source] = digest
+                if digest not in self._stored:
+                    pending.append(data)
+            elif digest not in self._stored:
+                pending.append(_encode(conns))
+            connections.append((source, digest))
+        # Groups that no longer exist must not linger in the cache
+        for source in [s for s in group_cache if s not in groups]:
+            del group_cache[source]
+        return nodes, connections, pending
+
+    # -------------------------
+    # SNAPSHOTS
+    # -------------------------
+    def _manifest_dir(self, project_id: str) -> Path:
+        return self.root / SNAPSHOTS_DIR_NAME / project_id
+
+    def take(self, doc: GraphDocument, label: Optional[str] = None) -> Dict:
+        """Snapshot doc; returns the manifest summary."""
+        with doc.lock:
+            project_id = doc.meta.get("projectId")
+            if not project_id:
+                raise ValueError("Project has no projectId")
+            nodes, connections, pending = self._records(doc)
+            version = doc.version
+
+        # Objects are written outside the document lock; edits carry on meanwhile
+        new_objects, written = 0, 0
+        for data in pending:
+            _, size = self.put_object(data)
+            if size:
+                new_objects += 1
+                written += size
+
+        snapshot_id = datetime.datetime.utcnow().strftime("%Y%m%dT%H%M%S") + "_" + uuid.uuid4().hex[:6]
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "snapshotId": snapshot_id,
+            "projectId": project_id,
+            "label": label,
+            "createdAt": datetime.datetime.utcnow().isoformat() + "Z",
+            "graphVersion": version,
+            "nodes": nodes,
+            "connections": connections,
+            "stats": {"nodes": len(nodes), "newObjects": new_objects, "bytesWritten": written},
+        }
+        _atomic_write(self._manifest_dir(project_id) / f"{snapshot_id}.json",
+                      json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+        return self._summary(manifest)
+
+    @staticmethod
+    def _summary(manifest: Dict) -> Dict:
+        return {k: v for k, v in manifest.items() if k not in ("nodes", "connections", "version")}
+
+    def load_manifest(self, project_id: str, snapshot_id: str) -> Optional[Dict]:
+        # Snapshot IDs come from clients; keep them inside the project's folder
+        if not snapshot_id or Path(snapshot_id).name != snapshot_id:
+            return None
+        try:
+            with open(self._manifest_dir(project_id) / f"{snapshot_id}.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def list(self, project_id: str) -> List[Dict]:
+        """Snapshot summaries of a project, newest first."""
+        folder = self._manifest_dir(project_id)
+        if not folder.exists():
+            return []
+        summaries = []
+        for path in sorted(folder.glob("*.json"), reverse=True):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    summaries.append(self._summary(json.load(f)))
+            except Exception as e:
+                print(f"[SNAPSHOT] Skipping unreadable manifest {path.name}: {e}")
+        return summaries
+
+    def restore(self, store: GraphStore, doc: GraphDocument, manifest: Dict) -> Dict:
+        """Bring doc's graph back to manifest, touching only what differs."""
+        with store.transaction(doc):
+            nodes, connections, _ = self._records(doc)
+            current_nodes, current_groups = dict(nodes), dict(connections)
+            target_nodes = dict(manifest["nodes"])
+            target_groups = dict(manifest["connections"])
+            graph = doc.graph
+
+            removed = [n for n in current_nodes if n not in target_nodes]
+            for node_id in removed:
+                graph.remove_node(node_id)
+
+            changed = [n for n, digest in manifest["nodes"] if current_nodes.get(n) != digest]
+            for node in self.stream_objects([target_nodes[n] for n in changed]):
+                current = graph.edit_node(node.get("nodeId"))
+                if current is None:
+                    graph.add_node(node)
+                else:
+                    current.clear()
+                    current.update(node)
+
+            # Removing nodes above may have dropped connections of other groups
+            sources = set(target_groups) | set(current_groups)
+            stale = [s for s in sources if target_groups.get(s) != current_groups.get(s) or s in removed]
+            for source in stale:
+                for conn in graph.outgoing(source):
+                    graph.remove_connection(connection_key(conn))
+            restore_groups = [s for s in stale if s in target_groups]
+            for conns in self.stream_objects([target_groups[s] for s in restore_groups]):
+                for conn in conns:
+                    graph.add_connection(conn)
+
+        return {"nodesRemoved": len(removed), "nodesRestored": len(changed),
+                "connectionGroupsRestored": len(restore_groups)}
+
+
+# Module-level singleton used by ProjectManager
+snapshot_store = SnapshotStore()
@@ -0,0 +1,217 @@
+"""
+Loom Spatial Index
+
+Uniform grid over node positions, so the canvas can load only what is in
+view.
+
+Each cached document gets a GridIndex that the graph store keeps current:
+a load builds it, and every committed delta re-buckets only the nodes it
+put or removed, so a drag costs O(1) per frame. query() visits the cells
+overlapping a rectangle and returns the nodes inside it (the viewport
+handler adds the connections with an endpoint among them); the cost
+follows what is visible, not the size of the graph. When a viewport holds more nodes than
+the caller can draw, clusters() summarizes them per cell (count, bounds,
+centroid), doubling the cell size until the summary fits.
+"""
+
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from .graph_model import GraphModel
+from .graph_store import GraphDocument
+
+# Canvas units per grid cell
+CELL_SIZE = 512.0
+
+# Rough node footprint, so nodes overlapping the viewport edge still count
+NODE_WIDTH = 220.0
+NODE_HEIGHT = 120.0
+
+Cell = Tuple[int, int]
+
+
+def _position(node: Dict) -> Optional[Tuple[float, float]]:
+    position = node.get("position") or {}
+    try:
+        return float(position["x"]), float(position["y"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class GridIndex:
+    """
+    Args:
+        graph: The document's GraphModel (read, never modified)
+        cell_size: Canvas units per cell
+    """
+
+    def __init__(self, graph: GraphModel, cell_size: float = CELL_SIZE):
+        self.graph = graph
+        self.cell_size = cell_size
+        self.cells: Dict[Cell, Set[str]] = defaultdict(set)
+        # nodeId -> (x, y, cell)
+        self.points: Dict[str, Tuple[float, float, Cell]] = {}
+        for node_id, node in graph.nodes.items():
+            self.put(node_id, node)
+
+    def _cell(self, x: float, y: float) -> Cell:
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    # -------------------------
+    # UPDATES
+    # -------------------------
+    def put(self, node_id: str, node: Dict) -> None:
+        point = _position(node)
+        previous = self.points.get(node_id)
+        if point is None:
+            self.remove(node_id)
+            return
+        x, y = point
+        cell = self._cell(x, y)
+        if previous is not None:
+            if previous[2] == cell:
+                self.points[node_id] = (x, y, cell)
+                return
+            self._discard(node_id, previous[2])
+        self.points[node_id] = (x, y, cell)
+        self.cells[cell].add(node_id)
+
+    def remove(self, node_id: str) -> None:
+        previous = self.points.pop(node_id, None)
+        if previous is not None:
+            self._discard(node_id, previous[2])
+
+    def _discard(self, node_id: str, cell: Cell) -> None:
+        members = self.cells.get(cell)
+        if members is not None:
+            members.discard(node_id)
+            if not members:
+                del self.cells[cell]
+
+    def apply(self, ops: List[Dict]) -> None:
+        for op in ops:
+            kind = op.get("op")
+            if kind == "node_put":
+                node = op["node"]
+                self.put(node.get("nodeId"), node)
+            elif kind == "node_remove":
+                self.remove(op.get("nodeId"))
+
+    # -------------------------
+    # QUERIES
+    # -------------------------
+    def _cells_in(self, x0: float, y0: float, x1: float, y1: float):
+        cx0, cy0 = self._cell(x0, y0)
+        cx1, cy1 = self._cell(x1, y1)
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self.cells):
+            # Viewport wider than the occupied area: walk occupied cells instead
+            for (cx, cy), members in self.cells.items():
+                if cx0 <= cx <= cx1 and cy0 <= cy <= cy1:
+                    yield members
+            return
+        for cx in range(cx0, cx1 + 1):
+            for cy in range(cy0, cy1 + 1):
+                members = self.cells.get((cx, cy))
+                if members:
+                    yield members
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> List[str]:
+        """nodeIds whose footprint overlaps the rectangle."""
+        # A node at (x, y) covers (x, y) .. (x + NODE_WIDTH, y + NODE_HEIGHT)
+        qx0, qy0 = x0 - NODE_WIDTH, y0 - NODE_HEIGHT
+        found = []
+        for members in self._cells_in(qx0, qy0, x1, y1):
+            for node_id in members:
+                x, y, _ = self.points[node_id]
+                if qx0 <= x <= x1 and qy0 <= y <= y1:
+                    found.append(node_id)
+        return found
+
+    def clusters(self, node_ids: List[str], max_clusters: int) -> Tuple[float, List[Dict]]:
+        """(cell size used, per-cell summaries of node_ids), at most max_clusters of them."""
+        # One pass over the nodes into per-cell aggregates; coarser levels merge aggregates
+        groups: Dict[Cell, List[float]] = {}
+        for node_id in node_ids:
+            x, y, cell = self.points[node_id]
+            agg = groups.get(cell)
+            if agg is None:
+                groups[cell] = [1, x, y, x, y, x, y]
+                continue
+            agg[0] += 1
+            agg[1] = min(agg[1], x)
+            agg[2] = min(agg[2], y)
+            agg[3] = max(agg[3], x)
+            agg[4] = max(agg[4], y)
+            agg[5] += x
+            agg[6] += y
+
+        size = self.cell_size
+        while len(groups) > max(1, max_clusters):
+            size *= 2
+            merged: Dict[Cell, List[float]] = {}
+            for (cx, cy), agg in groups.items():
+                cell = (cx // 2, cy // 2)
+                into = merged.get(cell)
+                if into is None:
+                    merged[cell] = list(agg)
+                    continue
+                into[0] += agg[0]
+                into[1] = min(into[1], agg[1])
+                into[2] = min(into[2], agg[2])
+                into[3] = max(into[3], agg[3])
+                into[4] = max(into[4], agg[4])
+                into[5] += agg[5]
+                into[6] += agg[6]
+            groups = merged
+
+        return size, [
+            {
+                "cell": [cx, cy],
+                "count": int(count),
+                "bounds": {"x0": x0, "y0": y0, "x1": x1, "y1": y1},
+                "center": {"x": sx / count, "y": sy / count},
+            }
+            for (cx, cy), (count, x0, y0, x1, y1, sx, sy) in groups.items()
+        ]
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+
+class SpatialIndexes:
+    """GridIndex per document, fed by the graph store's change events."""
+
+    def __init__(self, cell_size: float = CELL_SIZE):
+        self.cell_size = cell_size
+        self._lock = threading.Lock()
+        # str(savefile path) -> index of the cached document
+        self._indexes: Dict[str, GridIndex] = {}
+
+    def on_graph_change(self, doc: GraphDocument, delta: Optional[dict]) -> None:
+        """GraphStore listener; called under doc.lock."""
+        with self._lock:
+            index = self._indexes.get(str(doc.path))
+        if delta is None or index is None or index.graph is not doc.graph:
+            self._build(doc)
+        else:
+            index.apply(delta.get("ops", []))
+
+    def _build(self, doc: GraphDocument) -> GridIndex:
+        index = GridIndex(doc.graph, self.cell_size)
+        with self._lock:
+            self._indexes[str(doc.path)] = index
+        return index
+
+    def get(self, doc: GraphDocument) -> GridIndex:
+        """Index of doc; call under doc.lock."""
+        with self._lock:
+            index = self._indexes.get(str(doc.path))
+        if index is None or index.graph is not doc.graph:
+            index = self._build(doc)
+        return index
+
+
+# Module-level singleton; IndexService subscribes it to the graph store
+spatial_indexes = SpatialIndexes()
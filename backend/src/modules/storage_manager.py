@@ -1,23 +1,46 @@
+import copy
 import json
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+# Cached files are re-validated (one stat) at most this often, in seconds
+FRESHNESS_INTERVAL = 1.0
+
 
 class StorageManager:
-    """Handles global engine limits and state tracking."""
+    """
+    Handles global engine limits and state tracking.
+
+    settings.json and state.json are parsed once and served from memory.
+    Writes go through to disk atomically (temp file and rename) and update
+    the cache directly; a file changed by another process is picked up the
+    next time its freshness check (mtime, size and inode) runs. Consumers in
+    this process can subscribe() to "settings" or "state" changes.
+    """
     # Adjusting root to find 'userdata' relative to this script
     BASE_DIR = Path(__file__).parent.parent.parent.parent
     USERDATA_DIR = BASE_DIR / "userdata"
     SETTINGS_PATH = USERDATA_DIR / "settings.json"
     STATE_PATH = USERDATA_DIR / "state.json"
 
+    # str(path) -> (stat signature, parsed data, time of last check)
+    _cache: Dict[str, Tuple[Optional[Tuple[int, int, int]], Dict[str, Any], float]] = {}
+    _lock = threading.RLock()
+    _subscribers: Dict[str, List[Callable[[Dict[str, Any]], None]]] = {"settings": [], "state": []}
+
     @staticmethod
     def init_storage():
         StorageManager.USERDATA_DIR.mkdir(parents=True, exist_ok=True)
-        
+
         if not StorageManager.SETTINGS_PATH.exists():
             defaults = {
-                "max_venv_count": 3,
-                "auto_clean": True
+                "venv_budget_bytes": 2 * 1024 ** 3,
+                "auto_clean": True,
+                # "journal": append edits to journal.jsonl; "snapshot": rewrite savefile.json
+                "project_storage": "journal"
             }
             StorageManager.save_settings(defaults)
 
@@ -31,24 +54,94 @@ class StorageManager:
             }
             StorageManager.save_state(initial_state)
 
+    # -------------------------
+    # CACHE
+    # -------------------------
+    @staticmethod
+    def _signature(path: Path) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    @staticmethod
+    def _read(path: Path, kind: str) -> Dict[str, Any]:
+        """Parsed contents of path, from memory unless the file changed on disk."""
+        key = str(path)
+        now = time.monotonic()
+        with StorageManager._lock:
+            cached = StorageManager._cache.get(key)
+            if cached is not None and now - cached[2] < FRESHNESS_INTERVAL:
+                return copy.deepcopy(cached[1])
+
+            signature = StorageManager._signature(path)
+            if signature is None:
+                # Deleted behind our back: recreate the defaults
+                StorageManager.init_storage()
+                signature = StorageManager._signature(path)
+                cached = StorageManager._cache.get(key)
+            if cached is not None and cached[0] == signature:
+                StorageManager._cache[key] = (signature, cached[1], now)
+                return copy.deepcopy(cached[1])
+
+            with open(path, "r", encoding="utf-8-sig") as f:
+                data = json.load(f)
+            StorageManager._cache[key] = (signature, data, now)
+            changed = cached is not None
+        if changed:
+            StorageManager._publish(kind, data)
+        return copy.deepcopy(data)
+
+    @staticmethod
+    def _write(path: Path, kind: str, data: Dict[str, Any]):
+        data = copy.deepcopy(data)
+        with StorageManager._lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=4)
+            os.replace(tmp, path)
+            StorageManager._cache[str(path)] = (StorageManager._signature(path), data, time.monotonic())
+        StorageManager._publish(kind, data)
+
+    @staticmethod
+    def invalidate():
+        """Drop cached contents (e.g. after the paths were redirected)."""
+        with StorageManager._lock:
+            StorageManager._cache.clear()
+
+    # -------------------------
+    # SUBSCRIPTIONS
+    # -------------------------
+    @staticmethod
+    def subscribe(kind: str, callback: Callable[[Dict[str, Any]], None]):
+        """Call callback(data) whenever "settings" or "state" changes."""
+        StorageManager._subscribers[kind].append(callback)
+
+    @staticmethod
+    def _publish(kind: str, data: Dict[str, Any]):
+        for callback in list(StorageManager._subscribers.get(kind, [])):
+            try:
+                callback(copy.deepcopy(data))
+            except Exception as e:
+                print(f"[STORAGE] {kind} subscriber failed: {e}")
+
+    # -------------------------
+    # SETTINGS / STATE
+    # -------------------------
     @staticmethod
     def get_settings() -> Dict[str, Any]:
-        StorageManager.init_storage()
-        with open(StorageManager.SETTINGS_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return StorageManager._read(StorageManager.SETTINGS_PATH, "settings")
 
     @staticmethod
     def save_settings(data: Dict[str, Any]):
-        with open(StorageManager.SETTINGS_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        StorageManager._write(StorageManager.SETTINGS_PATH, "settings", data)
 
     @staticmethod
     def get_state() -> Dict[str, Any]:
-        StorageManager.init_storage()
-        with open(StorageManager.STATE_PATH, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return StorageManager._read(StorageManager.STATE_PATH, "state")
 
     @staticmethod
     def save_state(data: Dict[str, Any]):
-        with open(StorageManager.STATE_PATH, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
\ No newline at end of file
+        StorageManager._write(StorageManager.STATE_PATH, "state", data)
@@ -1,4 +1,5 @@
 import asyncio
+import inspect
 import sys
 from collections import defaultdict, deque
 from datetime import datetime, timezone
@@ -6,16 +7,19 @@ from typing import Dict, Any, Tuple, Optional
 
 from executor.engine.engine_signal import EngineSignalHub
 from executor.engine.node_loader import NodeLoader
+from executor.engine.port_types import compile_converter, signature_ports
+from executor.engine.run_context import RunContext
 from executor.utils.node_logger import init_logger
 
 
 class ExecutionManager:
     def __init__(self, nodes, connections, signal_hub: Optional[EngineSignalHub] = None,
-                 ws_client=None):
+                 ws_client=None, context: Optional[RunContext] = None):
         self.nodes: Dict[str, dict] = {}
         self.connections = connections
         self.signal_hub = signal_hub
         self.ws_client = ws_client  # Optional EngineWSClient
+        self.context = context  # Per-run paths, log sink and settings
 
         # Optional log manager passed from main_engine
         self.log_manager = None
@@ -30,44 +34,6 @@ class ExecutionManager:
         self.incoming_count = defaultdict(int)
         self.outgoing = defaultdict(list)
 
-    def _parse_value(self, value: Any, value_type: str = None) -> Any:
-        """Convert string values to appropriate types based on type hint"""
-        if value is None:
-            return None
-
-        # If already correct type, return as-is
-        if not isinstance(value, str):
-            return value
-
-        # Try to infer or use explicit type
-        if value_type:
-            try:
-                if value_type in ("number", "float"):
-                    return float(value)
-                elif value_type in ("integer", "int"):
-                    return int(value)
-                elif value_type == "boolean":
-                    return value.lower() in ("true", "1", "yes")
-                elif value_type == "string":
-                    return str(value)
-            except (ValueError, AttributeError):
-                pass
-
-        # Auto-detect numeric types
-        try:
-            if '.' not in value:
-                return int(value)
-            return float(value)
-        except (ValueError, AttributeError):
-            pass
-
-        # Boolean check
-        if value.lower() in ("true", "false"):
-            return value.lower() == "true"
-
-        # Default to string
-        return value
-
     async def initialize_async(self, nodes: list, nodebank_path=None, project_path=None,
                                log_manager=None, project_id=None):
         """
@@ -75,22 +41,21 @@ class ExecutionManager:
         """
         self.log_manager = log_manager
         self.project_id = project_id
+        if self.context is not None:
+            self.project_id = project_id or self.context.project_id
 
         # Load all node functions
-        loader = NodeLoader(nodebank_path=nodebank_path, signal_hub=self.signal_hub)
+        loader = NodeLoader(nodebank_path=nodebank_path, signal_hub=self.signal_hub,
+                            context=self.context)
         self.functions = await loader.preload_nodes_async(nodes)
 
         # Store node definitions
         for node in nodes:
             self.nodes[node["nodeId"]] = node
 
-        # Pre-fill input buckets with defaults (WITH TYPE CONVERSION)
+        # Pre-fill input buckets with literal values, converted once per port
         for node_id, node in self.nodes.items():
-            for i, inp in enumerate(node.get("input", [])):
-                raw_value = inp.get("value", None)
-                value_type = inp.get("type", None)
-                parsed_value = self._parse_value(raw_value, value_type)
-                self.input_buckets[(node_id, i)] = parsed_value
+            self._prefill_inputs(node_id, node)
 
         # Build graph connections
         for conn in self.connections:
@@ -106,6 +71,23 @@ class ExecutionManager:
             if self.incoming_count[node_id] == 0:
                 self.ready_queue.append(node_id)
 
+    def _prefill_inputs(self, node_id: str, node: dict) -> None:
+        """Convert each input port's literal value with the port's compiled converter."""
+        inputs = node.get("input", [])
+        # Nodes saved before annotations were indexed fall back to the signature
+        declared = signature_ports(self.functions[node_id]) if node_id in self.functions else []
+        for i, inp in enumerate(inputs):
+            sig_type, sig_default = declared[i] if i < len(declared) else (None, inspect.Parameter.empty)
+            converter = compile_converter(inp.get("type") or sig_type)
+
+            raw_value = inp.get("value")
+            if raw_value is None:
+                if "default" in inp:
+                    raw_value = inp["default"]
+                elif sig_default is not inspect.Parameter.empty:
+                    raw_value = sig_default
+            self.input_buckets[(node_id, i)] = converter(raw_value)
+
     async def run_async(self):
         remaining_inbound = self.incoming_count.copy()
 
@@ -120,8 +102,11 @@ class ExecutionManager:
                 sys.stdout.flush()
                 continue
 
-            # --- Init node logger ---
-            init_logger(node_id=node_id)
+            # --- Init node logger (sink comes from the run context, no file I/O) ---
+            if self.context is not None:
+                init_logger(node_id=node_id, sink=self.context.log_sink)
+            else:
+                init_logger(node_id=node_id)
 
             # --- Gather inputs ---
             inputs = []
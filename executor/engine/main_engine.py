@@ -19,11 +19,13 @@ sys.path.insert(0, str(ROOT_DIR))
 from executor.engine.engine_signal import EngineSignalHub
 from executor.engine.execution_manager import ExecutionManager
 from executor.engine.venv_handlers import VenvManager
+from executor.engine.run_context import RunContext
 
 # Import backend modules for state and logging
 try:
     sys.path.insert(0, str(ROOT_DIR / "backend" / "src"))
-    from modules.engine_state_manager import EngineStateManager
+    # State changes go to the backend as stdout lines, not to engine_state.json
+    from modules.engine_state_manager import report_engine_state
     from modules.log_manager import LogManager
     HAS_BACKEND_MODULES = True
 except ImportError:
@@ -83,39 +85,44 @@ async def main_async(ws_service_proc=None):
     sys.stdout.flush()
     await ws_client.send("engine_start", {"projectId": project_id})
 
-    # 1. Venv/handover DISABLED — run directly in the current interpreter.
-    # Install project requirements inline if they exist.
+    # 1. Project deps: shared cached venv for requirements.txt, linked into the
+    # project folder. No interpreter handover — the engine keeps running here
+    # with the venv's packages put on sys.path.
     req_file = project_path / "requirements.txt"
     if req_file.exists():
-        print(f"[ENGINE] Installing project deps...")
-        sys.stdout.flush()
-        import subprocess as _sp
-        _sp.run(
-            [sys.executable, "-m", "pip", "install", "-r", str(req_file)],
-            check=False, capture_output=True
-        )
-        print("[ENGINE] Deps ready.")
+        venv_mgr = VenvManager(project_path, ws_client=ws_client)
+        try:
+            await venv_mgr.ensure_venv_async()
+            venv_mgr.activate()
+            print("[ENGINE] Deps ready.")
+        except Exception as e:
+            print(f"[ENGINE ERROR] Project venv unavailable, running without it: {e}")
         sys.stdout.flush()
 
 
     # 3. Execution Phase (Inside Venv)
-    engine_state_mgr = None
     log_manager = None
 
     if HAS_BACKEND_MODULES:
         try:
-            engine_state_mgr = EngineStateManager()
             log_manager = LogManager(project_base_path=USERDATA_PATH)
-            engine_state_mgr.set_engine_state("initializing", project_id=project_id)
+            report_engine_state("initializing", project_id=project_id)
             if project_id:
                 log_manager.clear_logs(project_id)
         except Exception as e:
             print(f"[ENGINE WARNING] Failed to initialize state/logging: {e}")
 
+    # Resolved once for the whole run (logs were cleared above, so the sink starts fresh)
+    context = RunContext.create(
+        current,
+        userdata_path=USERDATA_PATH,
+        nodebank_path=os.getenv("NODEBANK_PATH", "nodebank"),
+    )
+
     debug_mode = os.getenv("DEBUG", "False").lower() == "true"
     signal_hub = EngineSignalHub(enable_logging=debug_mode)
 
-    with graph_path.open("r", encoding="utf-8-sig") as f:
+    with context.graph_path.open("r", encoding="utf-8-sig") as f:
         graph = json.load(f)
 
     exec_mgr = ExecutionManager(
@@ -123,27 +130,25 @@ async def main_async(ws_service_proc=None):
         connections=graph.get("connections", []),
         signal_hub=signal_hub,
         ws_client=ws_client,
+        context=context,
     )
 
     await exec_mgr.initialize_async(
         nodes=graph.get("nodes", []),
-        nodebank_path=os.getenv("NODEBANK_PATH", "nodebank"),
-        project_path=project_path,
         log_manager=log_manager,
-        project_id=project_id
     )
 
     # Set state to running before execution
-    if engine_state_mgr:
-        engine_state_mgr.set_engine_state("running", project_id=project_id)
+    if HAS_BACKEND_MODULES:
+        report_engine_state("running", project_id=project_id)
 
-    print("[ENGINE] Running graph...")
+    print(f"[ENGINE] Running graph (run {context.run_id})...")
     sys.stdout.flush()
     await exec_mgr.run_async()
 
     # Execution completed successfully
-    if engine_state_mgr:
-        engine_state_mgr.set_engine_state("idle", project_id=project_id)
+    if HAS_BACKEND_MODULES:
+        report_engine_state("idle", project_id=project_id)
 
     print("[ENGINE] Execution completed successfully")
     sys.stdout.flush()
@@ -153,7 +158,6 @@ async def main_async(ws_service_proc=None):
 
 def main():
     project_id = None
-    engine_state_mgr = None
     log_manager = None
     ws_service_proc = None
 
@@ -173,7 +177,6 @@ def main():
                 current = read_current()
                 if current:
                     project_id = current.get("projectId")
-                    engine_state_mgr = EngineStateManager()
                     log_manager = LogManager(project_base_path=USERDATA_PATH)
             except:
                 pass
@@ -182,8 +185,8 @@ def main():
     except KeyboardInterrupt:
         if log_manager and project_id:
             log_manager.append_log(project_id, "Execution interrupted by user")
-        if engine_state_mgr:
-            engine_state_mgr.set_engine_state("idle", project_id=project_id)
+        if HAS_BACKEND_MODULES:
+            report_engine_state("idle", project_id=project_id)
         print("\n[ENGINE] Interrupted by user")
         sys.exit(0)
     except Exception as e:
@@ -192,8 +195,8 @@ def main():
         if log_manager and project_id:
             log_manager.append_log(project_id, f"ERROR: {error_msg}")
 
-        if engine_state_mgr:
-            engine_state_mgr.set_engine_state(
+        if HAS_BACKEND_MODULES:
+            report_engine_state(
                 "error",
                 project_id=project_id,
                 error={"message": error_msg, "timestamp": datetime.now(timezone.utc).isoformat()}
@@ -214,6 +217,10 @@ def main():
             pass
         sys.exit(1)
     finally:
+        # Flush buffered node logs before the process goes away
+        from executor.utils.node_logger import close_logger
+        close_logger()
+
         if ws_service_proc and ws_service_proc.poll() is None:
             ws_service_proc.terminate()
             print("[ENGINE] WS service stopped")
@@ -1,12 +1,16 @@
 import os
 import json
 import importlib.util
+import zipimport
 import asyncio
 import inspect
 from pathlib import Path
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, TYPE_CHECKING
 from executor.engine.engine_signal import EngineSignalHub
 
+if TYPE_CHECKING:
+    from executor.engine.run_context import RunContext
+
 CURRENT_PATH = Path(__file__).parent.parent.parent / "userdata" / "state.json"
 
 def read_current():
@@ -16,20 +20,22 @@ def read_current():
         return json.load(f)
 
 class NodeLoader:
-    def __init__(self, nodebank_path=None, signal_hub: Optional[EngineSignalHub] = None):
-        current = read_current()
-        if current and not nodebank_path:
-            nodebank_path = Path(current["projectPath"]).parent / "nodebank"
+    def __init__(self, nodebank_path=None, signal_hub: Optional[EngineSignalHub] = None,
+                 context: Optional["RunContext"] = None):
+        if context is not None:
+            nodebank_path = nodebank_path or context.nodebank_path
+        elif not nodebank_path:
+            current = read_current()
+            if current:
+                nodebank_path = Path(current["projectPath"]).parent / "nodebank"
 
         self.nodebank_path = Path(nodebank_path or os.getenv("NODEBANK_PATH", "nodebank"))
         self.loaded_nodes: Dict[str, Any] = {}
         self.signal_hub = signal_hub
         self._module_cache: Dict[str, Any] = {}
+        self._importers: Dict[str, zipimport.zipimporter] = {}
 
-    def load_node_function(self, node: dict):
-        node_id = node.get("nodeId")
-        node_name = node.get("name")
-
+    def _load_script_module(self, node: dict, node_id, node_name):
         # Resolve script path
         if "scriptPath" in node:
             script_path = Path(node["scriptPath"])
@@ -50,12 +56,46 @@ class NodeLoader:
             module = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(module)
             self._module_cache[cache_key] = module
+        return module
+
+    def _load_archive_module(self, archive: str, member: str):
+        """Import member (e.g. "math/add_node.py") from a .zip node archive."""
+        cache_key = f"{archive}/{member}"
+        if cache_key in self._module_cache:
+            return self._module_cache[cache_key]
+
+        folder, _, file_name = member.rpartition("/")
+        importer_path = f"{archive}/{folder}" if folder else archive
+        # One zipimporter per archive folder; the archive's directory is read once
+        importer = self._importers.get(importer_path)
+        if importer is None:
+            if not Path(archive).exists():
+                raise FileNotFoundError(f"Node archive not found: {archive}")
+            importer = zipimport.zipimporter(importer_path)
+            self._importers[importer_path] = importer
+
+        spec = importer.find_spec(file_name[:-len(".py")])
+        if spec is None:
+            raise FileNotFoundError(f"Node script not found: {cache_key}")
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        self._module_cache[cache_key] = module
+        return module
+
+    def load_node_function(self, node: dict):
+        node_id = node.get("nodeId")
+        node_name = node.get("name")
+
+        if node.get("archive"):
+            module = self._load_archive_module(node["archive"], node["archiveMember"])
+        else:
+            module = self._load_script_module(node, node_id, node_name)
 
         # Resolve function
         entry_fn = node.get("entryFunction", node_name)
         func = getattr(module, entry_fn, None)
         if func is None:
-            raise AttributeError(f"Function '{entry_fn}' not found in {script_path}")
+            raise AttributeError(f"Function '{entry_fn}' not found in {getattr(module, '__file__', node_name)}")
 
         # 🔑 NEW: Function metadata
         sig = inspect.signature(func)
@@ -0,0 +1,118 @@
+"""
+port_types.py — Loom Engine Port Converters
+-------------------------------------------
+One converter per input port, compiled when the execution plan is built.
+
+A port's type comes from the node's saved input ("type", copied from the
+parameter annotation in nodeindex.json when the node was created) or, for
+nodes saved before annotations were indexed, from the loaded function's
+signature. Converters are picked once per port, so a literal value is
+converted exactly once and nothing at run time branches on type names.
+Ports without a type keep the old behaviour of guessing from the string.
+"""
+
+import inspect
+import json
+from typing import Any, Callable, Optional
+
+Converter = Callable[[Any], Any]
+
+_TRUE_STRINGS = ("true", "1", "yes")
+
+
+def _to_int(value: Any) -> Any:
+    # "3.7" raises and is passed through unchanged, never truncated to 3
+    return int(value) if isinstance(value, str) else value
+
+
+def _to_float(value: Any) -> Any:
+    return float(value) if isinstance(value, str) else value
+
+
+def _to_bool(value: Any) -> Any:
+    return value.strip().lower() in _TRUE_STRINGS if isinstance(value, str) else value
+
+
+def _to_str(value: Any) -> Any:
+    return value if isinstance(value, str) else str(value)
+
+
+def _to_json(value: Any) -> Any:
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def _guess(value: Any) -> Any:
+    """Untyped port: int, float, bool or the string itself."""
+    if not isinstance(value, str):
+        return value
+    try:
+        if "." not in value:
+            return int(value)
+        return float(value)
+    except ValueError:
+        pass
+    lowered = value.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    return value
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+# Annotation / frontend type name -> converter
+_CONVERTERS = {
+    "int": _to_int, "integer": _to_int,
+    "float": _to_float, "number": _to_float,
+    "bool": _to_bool, "boolean": _to_bool,
+    "str": _to_str, "string": _to_str,
+    "dict": _to_json, "list": _to_json, "tuple": _to_json,
+    "any": _identity, "object": _identity,
+}
+
+
+def type_name(annotation: Any) -> Optional[str]:
+    """Normalized name of an annotation object or annotation string."""
+    if annotation is None or annotation is inspect.Parameter.empty:
+        return None
+    if not isinstance(annotation, str):
+        annotation = getattr(annotation, "__name__", None) or str(annotation)
+    name = annotation.strip().lower()
+    # typing.Dict[str, int] / dict[str, int] / Optional[int] -> outer name
+    if name.startswith("optional[") and name.endswith("]"):
+        name = name[len("optional["):-1]
+    name = name.split("[", 1)[0].rsplit(".", 1)[-1]
+    return name or None
+
+
+def compile_converter(declared_type: Optional[str]) -> Converter:
+    """Converter for a port of declared_type (None: guess from the value)."""
+    name = type_name(declared_type)
+    if name is None:
+        return _guess
+    # Unknown classes (custom types) are passed through untouched
+    base = _CONVERTERS.get(name, _identity)
+
+    def convert(value: Any) -> Any:
+        if value is None:
+            return None
+        try:
+            return base(value)
+        except (ValueError, TypeError, AttributeError):
+            return value
+
+    return convert
+
+
+def signature_ports(func: Callable) -> list:
+    """[(annotation name, default or inspect.Parameter.empty), ...] of func's positional parameters."""
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return []
+    return [
+        (type_name(p.annotation), p.default)
+        for p in parameters
+        if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)
+    ]
@@ -0,0 +1,75 @@
+"""
+run_context.py — Loom Engine Run Context
+----------------------------------------
+Everything a single engine run needs to know about its project, resolved
+once in main_async and handed explicitly to the loader, logger and
+execution manager. Nothing on the per-node path re-reads state.json.
+"""
+
+import json
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional, Any
+
+from executor.utils.node_logger import LogSink, LOG_FILE_NAME
+
+try:
+    from backend.src.modules.log_store import LogStore
+    HAS_LOG_STORE = True
+except ImportError:
+    HAS_LOG_STORE = False
+
+LOG_DIR_NAME = "logs"
+
+
+def load_settings(userdata_path: Path) -> Mapping[str, Any]:
+    """Read userdata/settings.json once; a missing or broken file means defaults."""
+    settings_path = Path(userdata_path) / "settings.json"
+    try:
+        with open(settings_path, "r", encoding="utf-8") as f:
+            return MappingProxyType(json.load(f))
+    except Exception:
+        return MappingProxyType({})
+
+
+@dataclass(frozen=True)
+class RunContext:
+    run_id: str
+    project_id: Optional[str]
+    project_name: Optional[str]
+    graph_path: Path
+    project_path: Path
+    nodebank_path: Path
+    log_path: Path  # segment directory, or a plain logs.jsonl without the backend
+    log_sink: LogSink = field(repr=False)
+    settings: Mapping[str, Any] = field(default_factory=lambda: MappingProxyType({}))
+
+    @classmethod
+    def create(cls, current: dict, userdata_path: Path, nodebank_path) -> "RunContext":
+        """
+        Build the context from the active project (state.json contents).
+
+        Opens the log sink, so logs must already be cleared for this run.
+        """
+        graph_path = Path(current["projectPath"])
+        project_path = graph_path.parent
+        if HAS_LOG_STORE:
+            log_path = project_path / LOG_DIR_NAME
+            log_sink = LogSink(store=LogStore(log_path))
+        else:
+            log_path = project_path / LOG_FILE_NAME
+            log_sink = LogSink(log_path)
+
+        return cls(
+            run_id=uuid.uuid4().hex[:12],
+            project_id=current.get("projectId"),
+            project_name=current.get("projectName"),
+            graph_path=graph_path,
+            project_path=project_path,
+            nodebank_path=Path(nodebank_path),
+            log_path=log_path,
+            log_sink=log_sink,
+            settings=load_settings(userdata_path),
+        )
@@ -2,20 +2,42 @@ from __future__ import annotations
 import subprocess
 import sys
 import os
+import shutil
+import site
 import asyncio
+import hashlib
 from pathlib import Path
 from typing import Optional, TYPE_CHECKING
 
+from executor.utils.venv_layout import VENV_KEY_FILE, remove_venv
+
 if TYPE_CHECKING:
     from executor.engine.engine_signal import EngineSignalHub
     from executor.engine.ws_client import EngineWSClient
 
+ROOT_DIR = Path(__file__).parent.parent.parent
+USERDATA_PATH = ROOT_DIR / "userdata"
+
+# Shared, content-addressed venvs: userdata/venv_cache/<requirements hash>/
+VENV_CACHE_PATH = USERDATA_PATH / "venv_cache"
+# Optional local wheels; when present, installs run offline against it
+WHEELHOUSE_PATH = USERDATA_PATH / "wheelhouse"
+
+
+def _link_or_copy(src, dst):
+    """copytree copy_function: hardlink when possible, fall back to a real copy."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
 
 class VenvManager:
     def __init__(self, project_path: Path, signal_hub: Optional['EngineSignalHub'] = None,
                  ws_client: Optional['EngineWSClient'] = None):
         self.project_path = project_path.resolve()
         self.venv_path = self.project_path / "venv"
+        self.req_file = self.project_path / "requirements.txt"
         self.ws_client = ws_client
 
         if os.name == "nt":
@@ -26,48 +48,173 @@ class VenvManager:
         self.signal_hub = signal_hub
 
     def get_python(self) -> Path:
-        return self.python_executable.resolve()
+        # Not resolved: venv/bin/python is itself a symlink to the base interpreter
+        return self.python_executable
 
+    def site_packages(self) -> Path:
+        if os.name == "nt":
+            return self.venv_path / "Lib" / "site-packages"
+        return self.venv_path / "lib" / f"python{sys.version_info[0]}.{sys.version_info[1]}" / "site-packages"
+
+    def activate(self) -> None:
+        """
+        Put the venv's packages on sys.path of the running engine, ahead of
+        the engine's own, so node scripts import the project's versions.
+
+        The cached venv is built from this interpreter, so its packages are
+        binary compatible; there is no handover to the venv's python.
+        """
+        before = list(sys.path)
+        site.addsitedir(str(self.site_packages()))  # also runs the venv's .pth files
+        added = [p for p in sys.path if p not in before]
+        sys.path[:] = added + before
+
+    # -------------------------
+    # CACHE KEY
+    # -------------------------
+    def requirements_key(self) -> str:
+        """
+        Hash of the normalized requirements plus interpreter version/platform.
+
+        Comments, blank lines, ordering and case do not change the key, so
+        projects with the same dependencies share one cached venv.
+        """
+        lines = []
+        if self.req_file.exists():
+            for raw in self.req_file.read_text(encoding="utf-8-sig").splitlines():
+                line = raw.split("#", 1)[0].strip().lower()
+                if line:
+                    lines.append(line)
+
+        h = hashlib.sha256()
+        h.update(f"{sys.platform}-{sys.version_info[0]}.{sys.version_info[1]}\n".encode())
+        h.update("\n".join(sorted(set(lines))).encode())
+        return h.hexdigest()[:16]
+
+    @staticmethod
+    def _is_built(venv_dir: Path, key: str) -> bool:
+        marker = venv_dir / VENV_KEY_FILE
+        try:
+            return marker.read_text(encoding="utf-8").strip() == key
+        except OSError:
+            return False
+
+    # -------------------------
+    # BOOTSTRAP
+    # -------------------------
     async def ensure_venv_async(self, timeout: int = 300) -> None:
-        """Creates venv if missing and installs requirements if changed."""
-        if not self.venv_path.exists():
-            await self._create_venv_async()
+        """
+        Make sure the project venv matches its requirements.
+
+        The venv is built once per requirements hash in the shared cache and
+        then materialized into the project folder as a symlink (or a hardlink
+        clone where symlinks are unavailable).
+        """
+        key = self.requirements_key()
+
+        # Fast path: project venv already points at the right cached build
+        if self._is_built(self.venv_path, key):
+            if self.signal_hub:
+                self.signal_hub.emit("venv_ready", {"path": str(self.venv_path), "key": key})
+            return
 
-        # Always check for requirements updates on bootstrap
-        await asyncio.wait_for(self._install_requirements_async(), timeout=timeout)
+        cache_venv = VENV_CACHE_PATH / key
+        if not self._is_built(cache_venv, key):
+            await asyncio.wait_for(self._build_cached_venv_async(cache_venv, key), timeout=timeout)
 
-    async def _create_venv_async(self) -> None:
+        self._materialize(cache_venv)
+
+        if self.signal_hub:
+            self.signal_hub.emit("venv_ready", {"path": str(self.venv_path), "key": key})
+
+    async def _build_cached_venv_async(self, cache_venv: Path, key: str) -> None:
+        # Leftover from an interrupted build
+        if cache_venv.exists():
+            shutil.rmtree(cache_venv, ignore_errors=True)
+        cache_venv.parent.mkdir(parents=True, exist_ok=True)
+
+        try:
+            await self._create_venv_async(cache_venv)
+            await self._install_requirements_async(cache_venv)
+        except BaseException:
+            # Failed, timed out or cancelled: never leave a build that looks reusable
+            shutil.rmtree(cache_venv, ignore_errors=True)
+            raise
+
+        (cache_venv / VENV_KEY_FILE).write_text(key, encoding="utf-8")
+
+    def _materialize(self, cache_venv: Path) -> None:
+        """Point project/venv at the cached build (symlink, else hardlink clone)."""
+        remove_venv(self.venv_path)
+
+        try:
+            os.symlink(cache_venv, self.venv_path, target_is_directory=True)
+            print(f"[ENGINE] Linked venv -> {cache_venv.name}")
+        except OSError:
+            shutil.copytree(cache_venv, self.venv_path, symlinks=True, copy_function=_link_or_copy)
+            print(f"[ENGINE] Cloned venv from cache {cache_venv.name}")
+        sys.stdout.flush()
+
+    async def _create_venv_async(self, venv_path: Path) -> None:
         if self.signal_hub:
-            self.signal_hub.emit("venv_creation_started", {"path": str(self.venv_path)})
+            self.signal_hub.emit("venv_creation_started", {"path": str(venv_path)})
 
-        print(f"[ENGINE] Creating venv at {self.venv_path}...")
+        print(f"[ENGINE] Creating venv at {venv_path}...")
         sys.stdout.flush()
         if self.ws_client:
-            await self.ws_client.send("venv_create", {"path": str(self.venv_path)})
+            await self.ws_client.send("venv_create", {"path": str(venv_path)})
 
-        process = await asyncio.create_subprocess_exec(
-            sys.executable, "-m", "venv", str(self.venv_path)
-        )
-        await process.wait()
+        # No requirements means pip is never needed inside the venv
+        args = [sys.executable, "-m", "venv", str(venv_path)]
+        if not self.req_file.exists():
+            args.append("--without-pip")
+
+        process = await asyncio.create_subprocess_exec(*args)
+        if await process.wait() != 0:
+            raise RuntimeError(f"python -m venv exited with code {process.returncode}")
         print(f"[ENGINE] Venv created.")
         sys.stdout.flush()
 
-    async def _install_requirements_async(self) -> None:
-        """Installs from requirements.txt if it exists."""
-        req_file = self.project_path / "requirements.txt"
-        if not req_file.exists():
+        if self.signal_hub:
+            self.signal_hub.emit("venv_creation_completed", {"path": str(venv_path)})
+
+    async def _install_requirements_async(self, venv_path: Path) -> None:
+        """Installs from requirements.txt if it exists, preferring the local wheelhouse."""
+        if not self.req_file.exists():
             return
 
         if self.signal_hub:
-            self.signal_hub.emit("venv_install_started", {"file": str(req_file)})
+            self.signal_hub.emit("venv_install_started", {"file": str(self.req_file)})
 
-        print(f"[ENGINE] Installing dependencies from {req_file}...")
+        print(f"[ENGINE] Installing dependencies from {self.req_file}...")
         sys.stdout.flush()
         if self.ws_client:
-            await self.ws_client.send("venv_install", {"file": str(req_file)})
+            await self.ws_client.send("venv_install", {"file": str(self.req_file)})
+
+        if os.name == "nt":
+            python = venv_path / "Scripts" / "python.exe"
+        else:
+            python = venv_path / "bin" / "python"
 
+        base_args = [str(python), "-m", "pip", "install", "--disable-pip-version-check",
+                     "-r", str(self.req_file)]
+
+        if WHEELHOUSE_PATH.is_dir() and any(WHEELHOUSE_PATH.iterdir()):
+            offline_args = base_args + ["--no-index", "--find-links", str(WHEELHOUSE_PATH)]
+            if await self._run_pip_async(offline_args) == 0:
+                self._install_completed()
+                return
+            print("[ENGINE] Wheelhouse incomplete, falling back to package index...")
+            sys.stdout.flush()
+
+        code = await self._run_pip_async(base_args)
+        if code != 0:
+            raise RuntimeError(f"pip install exited with code {code}")
+        self._install_completed()
+
+    async def _run_pip_async(self, args: list) -> int:
         process = await asyncio.create_subprocess_exec(
-            str(self.get_python()), "-m", "pip", "install", "-r", str(req_file),
+            *args,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.STDOUT
         )
@@ -85,6 +232,10 @@ class VenvManager:
                 if self.ws_client:
                     await self.ws_client.send("dep_progress", {"line": line_str})
 
-        await process.wait()
+        return await process.wait()
+
+    def _install_completed(self) -> None:
         print(f"[ENGINE] Dependencies installed.")
-        sys.stdout.flush()
\ No newline at end of file
+        sys.stdout.flush()
+        if self.signal_hub:
+            self.signal_hub.emit("venv_install_completed", {"file": str(self.req_file)})
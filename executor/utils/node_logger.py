@@ -1,77 +1,161 @@
 import json
+import atexit
+import threading
 from pathlib import Path
 from datetime import datetime
-import os
+from typing import List
 
-# Global log file path
-_LOG_FILE_PATH = None
+# JSON Lines: one entry per line, appended, never rewritten
+LOG_FILE_NAME = "logs.jsonl"
+
+# Global sink and node context
+_SINK = None
 _CURRENT_NODE_ID = None
 
+
+class LogSink:
+    """
+    Buffered append-only log writer.
+
+    Entries collect in memory and are flushed by a background thread when the
+    buffer reaches max_buffer entries or every flush_interval seconds,
+    whichever comes first. Each flush is a single append, either to a JSON
+    Lines file or to a segmented store (anything with append_many), so the
+    cost of a log line does not depend on how large the log already is.
+    """
+
+    def __init__(self, log_file_path: Path = None, max_buffer: int = 256, flush_interval: float = 0.25,
+                 store=None):
+        self.path = Path(log_file_path) if log_file_path else None
+        self.store = store
+        self.max_buffer = max_buffer
+        self.flush_interval = flush_interval
+
+        self._buffer: List[dict] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        if self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+
+    def write(self, entry: dict) -> None:
+        with self._lock:
+            self._buffer.append(entry)
+            full = len(self._buffer) >= self.max_buffer
+        if full:
+            self._wake.set()
+
+    def flush(self) -> None:
+        # Held from the swap to the write, so batches reach disk in the order
+        # they were taken; writers only wait on _lock, never on the write
+        with self._write_lock:
+            with self._lock:
+                if not self._buffer:
+                    return
+                entries, self._buffer = self._buffer, []
+            if self.store is not None:
+                self.store.append_many(entries)
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries))
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[LOG ERROR] {e}")
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join(timeout=2.0)
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"[LOG ERROR] {e}")
+
+
 def get_project_log_path():
     """
-    Finds the project directory from state.json and returns a path for logs.json
+    Finds the project directory from state.json and returns a path for logs.jsonl
     """
     # Adjust this path to where your state.json actually lives relative to this script
     # Based on your previous snippet:
     state_path = Path(__file__).parent.parent.parent / "userdata" / "state.json"
-    
+
     if state_path.exists():
         try:
             with open(state_path, "r", encoding="utf-8-sig") as f:
                 state = json.load(f)
                 # Get the folder containing the savefile.json
                 project_dir = Path(state["projectPath"]).parent
-                return project_dir / "logs.json"
+                return project_dir / LOG_FILE_NAME
         except Exception as e:
             print(f"[Logger] Error reading state.json: {e}")
-    
+
     # Fallback to current working directory if state.json is missing
-    return Path.cwd() / "logs.json"
+    return Path.cwd() / LOG_FILE_NAME
 
-def init_logger(node_id: str, log_file_path: str = None) -> None:
+def init_logger(node_id: str, log_file_path: str = None, sink: LogSink = None) -> None:
     """
-    Initialize the logger. If no path is provided, it finds the project path.
+    Initialize the logger for a node.
+
+    With a sink (from the engine's RunContext) this only switches the current
+    node and does no file-system work. Otherwise the log path comes from
+    log_file_path or the project in state.json, and the sink is reused
+    across nodes as long as the log file stays the same.
     """
-    global _LOG_FILE_PATH, _CURRENT_NODE_ID
+    global _SINK, _CURRENT_NODE_ID
     _CURRENT_NODE_ID = node_id
-    
+
+    if sink is not None:
+        if _SINK is not sink:
+            close_logger()
+            _SINK = sink
+        return
+
     if log_file_path:
-        _LOG_FILE_PATH = Path(log_file_path)
+        path = Path(log_file_path)
     else:
-        _LOG_FILE_PATH = get_project_log_path()
-    
-    # Create log file and parent directories if they don't exist
-    if not _LOG_FILE_PATH.exists():
-        _LOG_FILE_PATH.parent.mkdir(parents=True, exist_ok=True)
-        with open(_LOG_FILE_PATH, "w", encoding="utf-8") as f:
-            json.dump([], f)
-    
+        path = get_project_log_path()
+
+    if _SINK is None or _SINK.path != path:
+        close_logger()
+        _SINK = LogSink(path)
+
     # Logger ready (no need to print per-node)
 
+def close_logger() -> None:
+    """Flush buffered entries and stop the sink. Called at engine exit."""
+    global _SINK
+    if _SINK is not None:
+        _SINK.close()
+        _SINK = None
+
+
+atexit.register(close_logger)
+
+
 def log_print(message: str, level: str = "info") -> None:
-    # ... (Rest of your log_print logic stays the same)
-    if not _LOG_FILE_PATH or not _CURRENT_NODE_ID:
+    if not _SINK or not _CURRENT_NODE_ID:
         print(f"[{level.upper()}] {message}")
         return
 
     try:
-        # Load, append, and save
-        with open(_LOG_FILE_PATH, "r+", encoding="utf-8") as f:
-            try:
-                logs = json.load(f)
-            except json.JSONDecodeError:
-                logs = []
-            
-            log_entry = {
-                "timestamp": datetime.utcnow().isoformat() + "Z",
-                "nodeId": _CURRENT_NODE_ID,
-                "message": str(message),
-                "level": level
-            }
-            logs.append(log_entry)
-            
-            f.seek(0)
-            json.dump(logs, f, indent=2)
-            f.truncate()
+        _SINK.write({
+            "timestamp": datetime.utcnow().isoformat(timespec="microseconds") + "Z",
+            "nodeId": _CURRENT_NODE_ID,
+            "message": str(message),
+            "level": level
+        })
     except Exception as e:
-        print(f"[LOG ERROR] {e}")
\ No newline at end of file
+        print(f"[LOG ERROR] {e}")
@@ -0,0 +1,23 @@
+"""
+On-disk conventions for project venvs, shared by the engine (which builds
+them) and the backend cleaner (which measures and evicts them).
+Standard library only, so either side can import it on its own.
+"""
+
+import shutil
+from pathlib import Path
+
+# Written last into a cached venv; a venv without it is a half-finished build
+VENV_KEY_FILE = ".loom_venv_key"
+
+
+def remove_venv(venv_path: Path) -> bool:
+    """Delete a project venv. Symlinked venvs only lose the link, never the shared cache."""
+    venv_path = Path(venv_path)
+    if venv_path.is_symlink():
+        venv_path.unlink()
+        return True
+    if venv_path.is_dir():
+        shutil.rmtree(venv_path, ignore_errors=True)
+        return True
+    return False
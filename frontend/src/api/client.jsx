@@ -24,4 +24,20 @@ export const request = async (cmd, payload = {}) => {
     console.error("DISPATCH ERROR:", cmd, err);
     return null;
   }
-};
\ No newline at end of file
+};
+
+// Several graph commands ({ cmd, ...payload }) applied as one transaction
+export const requestBatch = async (commands) => {
+  try {
+    const res = await fetch(`${BASE_URL}/dispatch/batch`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ commands }),
+    });
+    if (!res.ok) throw new Error(res.statusText);
+    return await res.json();
+  } catch (err) {
+    console.error("BATCH DISPATCH ERROR:", commands.length, err);
+    return null;
+  }
+};
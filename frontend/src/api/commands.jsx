@@ -1,4 +1,4 @@
-import { request, get } from "./client";
+import { request, requestBatch, get } from "./client";
 
 /* ---------- ENGINE (Actions) ---------- */
 export const runEngine = () => request("run");
@@ -8,7 +8,16 @@ export const forceStop = () => request("force_stop");
 /* ---------- DATA FETCHING (Sync) ---------- */
 // These now use the 'get' helper and the dynamic /sync/ path
 export const getStartupData = () => get("/sync/startup");
+export const listProjects = ({ sort = "projectName", order = "asc", limit, offset = 0 } = {}) =>
+  get(`/sync/projects?sort=${sort}&order=${order}&offset=${offset}${limit != null ? `&limit=${limit}` : ""}`);
 export const loadGraph = () => get("/sync/load_graph");
+// Nodes/connections inside a canvas rectangle; cluster summaries past `limit` nodes
+export const loadViewport = ({ x0, y0, x1, y1 }, limit = 2000) =>
+  get(`/sync/viewport?x0=${x0}&y0=${y0}&x1=${x1}&y1=${y1}&limit=${limit}`);
+// Ops after `version` (from loadGraph or a previous delta); may fall back to a full snapshot
+export const getGraphDelta = (version) => get(`/sync/graph_delta?since=${version}`);
+// Cycles, bad ports, missing scripts and dead nodes of the active graph
+export const getGraphAnalysis = () => get("/sync/graph_analysis");
 
 /* ---------- PROJECT (Actions) ---------- */
 export const initProject = () => request("init");
@@ -17,6 +26,10 @@ export const deleteProject = (projectId) => request("project_delete", { projectI
 export const loadProject = (projectId) => request("project_load", { projectId });
 export const selectProject = (projectId) => request("project_load", { projectId });
 export const openProject = (projectId) => request("project_open", { projectId });
+// Restore points of the active project
+export const snapshotProject = (label) => request("project_snapshot", { label });
+export const listSnapshots = () => get("/sync/snapshots");
+export const restoreSnapshot = (snapshotId) => request("project_restore", { snapshotId });
 
 /* ---------- NODES (Actions) ---------- */
 export const addNode = (type, x, y) =>
@@ -30,6 +43,11 @@ export const deleteNode = (id) =>
 
 // If this is fetching a list, use get, if it's triggering a rebuild, use request
 export const fetchNodeIndex = () => get("/sync/node_index");
+export const searchNodes = (query, limit = 20, offset = 0) =>
+  get(`/sync/node_search?q=${encodeURIComponent(query)}&limit=${limit}&offset=${offset}`);
+// Projects/nodes running a script: { scriptPath, entryFunction, name } (any of them)
+export const getNodeUsage = (filters = {}) =>
+  get(`/sync/node_usage?${new URLSearchParams(Object.entries(filters).filter(([, v]) => v != null))}`);
 
 
 /* ---------- GRAPH NODES (Project Graph) ---------- */
@@ -52,6 +70,24 @@ export const updateGraphNodeInput = (nodeId, inputIndex, value) =>
     value
   });
 
+// One request, one save: positions = [{ nodeId, x, y }, ...]
+export const moveGraphNodes = (positions) =>
+  requestBatch(positions.map(({ nodeId, x, y }) => ({
+    cmd: "graph_node_edit",
+    nodeId,
+    updates: { position: { x, y } }
+  })));
+
+// nodes keep their copied nodeIds; the response's idMap gives the new ones
+export const pasteSubgraph = (nodes, connections, offset = { x: 0, y: 0 }) =>
+  request("graph_subgraph_paste", { nodes, connections, offset });
+
+// Arbitrary graph edits, all-or-nothing
+export const applyGraphBatch = (commands) => requestBatch(commands);
+
+export const undoGraph = () => request("graph_undo");
+export const redoGraph = () => request("graph_redo");
+
 
 /* ---------- CONNECTIONS (Actions) ---------- */
 export const createConnection = (sourceNodeId, sourcePort, targetNodeId, targetPort) => {
@@ -78,7 +114,7 @@ export const updateNodeData = (nodeId, updates) => editGraphNode(nodeId, updates
 
 /* ---------- ENGINE STATE & LOGS ---------- */
 export const getEngineState = () => request("engine_get_state");
-export const getEngineLogs = (projectId) => request("engine_get_logs", { project_id: projectId });
+export const getEngineLogs = (projectId, since, cursor) => request("engine_get_logs", { project_id: projectId, since, cursor });
 
 /* ---------- CUSTOM NODES ---------- */
 export const listCustomNodes = () => request("custom_node_list");
@@ -3,7 +3,7 @@ import { request } from "./client";
 
 // Engine state and logs
 export const getEngineState = () => request("engine_get_state");
-export const getEngineLogs = (projectId) => request("engine_get_logs", { project_id: projectId });
+export const getEngineLogs = (projectId, since, cursor) => request("engine_get_logs", { project_id: projectId, since, cursor });
 
 // Custom nodes
 export const listCustomNodes = () => request("custom_node_list");
@@ -7,6 +7,7 @@ const LogsPanel = ({ isPolling }) => {
     const [isLoading, setIsLoading] = useState(false);
     const logsEndRef = useRef(null);
     const pollingInterval = useRef(null);
+    const lastCursor = useRef(null);
 
     // Auto-scroll to bottom when new logs appear
     const scrollToBottom = () => {
@@ -21,10 +22,15 @@ const LogsPanel = ({ isPolling }) => {
     const fetchLogs = async () => {
         try {
             setIsLoading(true);
-            const response = await getEngineLogs();
-
-            if (response.status === 'ok' && response.logs) {
-                setLogs(response.logs);
+            // Only ask for entries after the last one we read
+            const response = await getEngineLogs(undefined, undefined, lastCursor.current || undefined);
+
+            // /dispatch may report a handler's 'ok' as 'success'
+            if (response.status === 'ok' || response.status === 'success') {
+                lastCursor.current = response.cursor || lastCursor.current;
+                if (response.logs && response.logs.length > 0) {
+                    setLogs((prev) => [...prev, ...response.logs]);
+                }
             }
         } catch (error) {
             console.error('Failed to fetch logs:', error);
@@ -38,6 +44,7 @@ const LogsPanel = ({ isPolling }) => {
         if (isPolling) {
             // Clear logs on new run
             setLogs([]);
+            lastCursor.current = null;
 
             // Initial fetch
             fetchLogs();